@@ -0,0 +1,271 @@
+"""
+Bulk channel import for POST /track/bulk.
+
+Inputs (handles, channel ids, channel URLs) are parsed with youtube.parse_channel_input, then:
+
+  1. one query picks up channels already resolved recently (core.channels),
+  2. the remaining ids go to YouTube in channels.list batches of 50; handles need one forHandle
+     call each. At most `concurrency` calls are in flight and `max_api_calls` are made per import,
+     so a large paste cannot burn through the daily quota,
+  3. core.channels and core.watchlist_channels are written with one multi-row statement each.
+
+Both drivers yield progress dicts, which the apps stream to the client as NDJSON.
+"""
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from app import queries, resolver, youtube
+
+logger = logging.getLogger(__name__)
+
+MAX_INPUTS = 1000
+_SPLIT_RE = re.compile(r"[\s,]+")
+
+
+@dataclass
+class ImportPlan:
+    ids: list[str] = field(default_factory=list)
+    handles: list[str] = field(default_factory=list)  # normalized "@lowercase"
+    invalid: list[str] = field(default_factory=list)
+
+
+def parse_inputs(raw: str) -> ImportPlan:
+    """Split on whitespace/commas and de-duplicate; raises ValueError above MAX_INPUTS entries."""
+    tokens = [t for t in _SPLIT_RE.split(raw or "") if t]
+    if len(tokens) > MAX_INPUTS:
+        raise ValueError(f"at most {MAX_INPUTS} channels per import")
+
+    plan = ImportPlan()
+    seen: set[str] = set()
+    for token in tokens:
+        parsed = youtube.parse_channel_input(token)
+        if "channel_id" in parsed:
+            key = parsed["channel_id"]
+            target = plan.ids
+        elif "handle" in parsed:
+            key = "@" + parsed["handle"].lower()
+            target = plan.handles
+        else:
+            key = token
+            target = plan.invalid
+        if key not in seen:
+            seen.add(key)
+            target.append(key)
+    return plan
+
+
+class _ImportRun:
+    """State of one import, shared by the sync and async drivers."""
+
+    def __init__(self, plan: ImportPlan, max_api_calls: int):
+        self.plan = plan
+        self.max_api_calls = max_api_calls
+        self.found: dict[str, resolver.ResolvedChannel] = {}
+        self._matched: set[str] = set()
+        self.not_found: list[str] = []
+        self.failed: list[str] = []
+        self.skipped: list[str] = []
+        self.api_calls = 0
+
+    def parsed_event(self) -> dict:
+        return {"event": "parsed", "ids": len(self.plan.ids), "handles": len(self.plan.handles), "invalid": self.plan.invalid}
+
+    def lookup_params(self, db_max_age: timedelta) -> tuple:
+        return (self.plan.ids, self.plan.handles, db_max_age)
+
+    def _add(self, resolved: resolver.ResolvedChannel) -> None:
+        r = resolved.result
+        self.found.setdefault(r.channel_id, resolved)
+        self._matched.add(r.channel_id)
+        if r.handle:
+            self._matched.add("@" + r.handle.lstrip("@").lower())
+
+    def take_local(self, rows: list) -> dict:
+        for row in rows:
+            self._add(resolver.from_row(row))
+        return {"event": "local", "resolved": len(self.found)}
+
+    def pending_calls(self) -> list[tuple[str, Any]]:
+        ids = [i for i in self.plan.ids if i not in self._matched]
+        handles = [h for h in self.plan.handles if h not in self._matched]
+        calls: list[tuple[str, Any]] = [
+            ("ids", ids[i : i + youtube.MAX_IDS_PER_CALL]) for i in range(0, len(ids), youtube.MAX_IDS_PER_CALL)
+        ]
+        calls += [("handle", h) for h in handles]
+
+        for _, arg in calls[self.max_api_calls :]:
+            self.skipped.extend(arg if isinstance(arg, list) else [arg])
+        return calls[: self.max_api_calls]
+
+    def take_remote(self, call: tuple[str, Any], items: Optional[list], error: Optional[BaseException]) -> None:
+        kind, arg = call
+        self.api_calls += 1
+        inputs = arg if kind == "ids" else [arg]
+        if error is not None:
+            logger.warning("Bulk import: YouTube %s lookup failed for %d input(s): %s", kind, len(inputs), error)
+            self.failed.extend(inputs)
+            return
+        for item in items or []:
+            resolved = resolver.from_item(item)
+            if resolved is not None:
+                self._add(resolved)
+                if kind == "handle":
+                    # customUrl can differ from the handle that was asked for.
+                    self._matched.add(arg)
+        self.not_found.extend(i for i in inputs if i not in self._matched)
+
+    def progress_event(self, done: int, total: int) -> dict:
+        return {"event": "resolve", "calls_done": done, "calls_total": total, "resolved": len(self.found)}
+
+    def to_write(self) -> tuple[list[tuple], list[str]]:
+        """(channel rows to upsert, channel ids to track). Only fresh YouTube results are re-upserted."""
+        upsert = [
+            queries.channel_row(r.result, r.uploads_playlist_id)
+            for r in self.found.values()
+            if r.source == "youtube"
+        ]
+        track = [cid for cid, r in self.found.items() if r.uploads_playlist_id]
+        return upsert, track
+
+    def done_event(self, tracked: int, newly_tracked: int) -> dict:
+        return {
+            "event": "done",
+            "tracked": tracked,
+            "newly_tracked": newly_tracked,
+            "api_calls": self.api_calls,
+            "not_found": self.not_found,
+            "failed": self.failed,
+            "skipped_quota": self.skipped,
+            "missing_metadata": [cid for cid, r in self.found.items() if not r.uploads_playlist_id],
+            "invalid": self.plan.invalid,
+        }
+
+
+def _write_statements(watchlist_id: str, upsert: list[tuple], track: list[str]) -> list[tuple[str, tuple]]:
+    statements = [(queries.ENSURE_WATCHLIST, (watchlist_id,))]
+    if upsert:
+        statements.append((queries.UPSERT_CHANNELS_BULK, queries.channel_columns(upsert)))
+    statements.append((queries.TRACK_CHANNELS_BULK, (watchlist_id, track)))
+    return statements
+
+
+# --- sync (app.main) -------------------------------------------------------------------------
+
+
+def _call(yt: youtube.YouTubeClient, call: tuple[str, Any]) -> list:
+    kind, arg = call
+    if kind == "ids":
+        return yt.resolve_channels_by_ids(arg)
+    item = yt.resolve_channel_by_handle(arg[1:])
+    return [item] if item else []
+
+
+def import_channels(
+    yt: youtube.YouTubeClient,
+    plan: ImportPlan,
+    *,
+    connection: Callable[[], AbstractContextManager],
+    watchlist_id: str,
+    after_write: Callable[[Any], None],
+    db_max_age: timedelta,
+    concurrency: int = 4,
+    max_api_calls: int = 100,
+) -> Iterator[dict]:
+    run = _ImportRun(plan, max_api_calls)
+    yield run.parsed_event()
+    if not plan.ids and not plan.handles:
+        yield run.done_event(0, 0)
+        return
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(queries.RESOLVED_CHANNELS_BULK, run.lookup_params(db_max_age))
+            rows = cur.fetchall()
+    yield run.take_local(rows)
+
+    calls = run.pending_calls()
+    if calls:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="bulk-import") as pool:
+            futures = {pool.submit(_call, yt, c): c for c in calls}
+            for done, fut in enumerate(as_completed(futures), start=1):
+                error = fut.exception()
+                run.take_remote(futures[fut], None if error else fut.result(), error)
+                yield run.progress_event(done, len(calls))
+
+    upsert, track = run.to_write()
+    newly_tracked = 0
+    if track:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                for sql, params in _write_statements(watchlist_id, upsert, track):
+                    cur.execute(sql, params)
+                newly_tracked = cur.rowcount
+                after_write(cur)
+    yield run.done_event(len(track), newly_tracked)
+
+
+# --- async (app.main_async) ------------------------------------------------------------------
+
+
+async def _acall(yt: youtube.AsyncYouTubeClient, call: tuple[str, Any], sem: asyncio.Semaphore):
+    kind, arg = call
+    async with sem:
+        try:
+            if kind == "ids":
+                return call, await yt.resolve_channels_by_ids(arg), None
+            item = await yt.resolve_channel_by_handle(arg[1:])
+            return call, [item] if item else [], None
+        except Exception as e:
+            return call, None, e
+
+
+async def aimport_channels(
+    yt: youtube.AsyncYouTubeClient,
+    plan: ImportPlan,
+    *,
+    connection: Callable[[], AbstractAsyncContextManager],
+    watchlist_id: str,
+    after_write: Callable[[Any], Awaitable[None]],
+    db_max_age: timedelta,
+    concurrency: int = 4,
+    max_api_calls: int = 100,
+) -> AsyncIterator[dict]:
+    run = _ImportRun(plan, max_api_calls)
+    yield run.parsed_event()
+    if not plan.ids and not plan.handles:
+        yield run.done_event(0, 0)
+        return
+
+    async with connection() as conn:
+        cur = await conn.execute(queries.RESOLVED_CHANNELS_BULK, run.lookup_params(db_max_age))
+        rows = await cur.fetchall()
+    yield run.take_local(rows)
+
+    calls = run.pending_calls()
+    if calls:
+        sem = asyncio.Semaphore(max(1, concurrency))
+        tasks = [asyncio.ensure_future(_acall(yt, c, sem)) for c in calls]
+        try:
+            for done, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+                run.take_remote(*await next_result)
+                yield run.progress_event(done, len(calls))
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    upsert, track = run.to_write()
+    newly_tracked = 0
+    if track:
+        async with connection() as conn:
+            async with conn.cursor() as cur:
+                for sql, params in _write_statements(watchlist_id, upsert, track):
+                    await cur.execute(sql, params)
+                newly_tracked = cur.rowcount
+                await after_write(cur)
+    yield run.done_event(len(track), newly_tracked)
@@ -0,0 +1,125 @@
+"""
+In-process caching primitives for the web app.
+
+- TTLCache: bounded, thread-safe LRU with per-entry expiry and hit/miss counters.
+- DataVersion: per-watchlist version stamps, bumped by write paths and by Postgres NOTIFY
+  (see app/notify_listener.py). Cache keys and ETags embed the stamp, so a bump invalidates
+  everything derived from the old data without having to enumerate keys.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, max_entries: int = 256, ttl_s: float = 300.0, *, clock: Callable[[], float] = time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        expires_at = self._clock() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class DataVersion:
+    """
+    Version stamps per key (watchlist_id) plus a global generation for "everything changed".
+
+    Stamps include a per-process token so ETags from one worker never validate against another
+    worker's (possibly older) state. While `live` is False (no NOTIFY listener connected), stamps
+    also roll over every `fallback_ttl_s` so staleness stays bounded.
+    """
+
+    def __init__(self, *, fallback_ttl_s: float = 60.0, clock: Callable[[], float] = time.time):
+        self._token = uuid.uuid4().hex[:8]
+        self._global = 0
+        self._by_key: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.fallback_ttl_s = fallback_ttl_s
+        self.live = False
+
+    def current(self, key: str) -> str:
+        with self._lock:
+            stamp = f"{self._token}.{self._global}.{self._by_key.get(key, 0)}"
+        if not self.live:
+            stamp += f".t{int(self._clock() // self.fallback_ttl_s)}"
+        return stamp
+
+    def bump(self, key: Optional[str] = None) -> None:
+        """Bump one key, or everything when key is None or '*'."""
+        with self._lock:
+            if key is None or key == "*":
+                self._global += 1
+            else:
+                self._by_key[key] = self._by_key.get(key, 0) + 1
+
+
+def make_etag(*parts: str) -> str:
+    return 'W/"' + "-".join(parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    # Browsers may keep the body but must revalidate; a matching ETag is answered with 304.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
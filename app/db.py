@@ -1,15 +1,22 @@
-import hashlib
 import logging
+import threading
+import time
 from contextlib import contextmanager
-from pathlib import Path
 from typing import Iterable, Iterator, Optional, Sequence
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
+
+from ytb_elt.db.migrate import run_migrations
 
 logger = logging.getLogger(__name__)
 
 
+class PoolTimeout(RuntimeError):
+    """No pooled connection became available within the checkout timeout."""
+
+
 @contextmanager
 def connect(database_url: str) -> Iterator[psycopg2.extensions.connection]:
     conn = psycopg2.connect(database_url)
@@ -19,47 +26,156 @@ def connect(database_url: str) -> Iterator[psycopg2.extensions.connection]:
         conn.close()
 
 
-def _migration_version(path: Path) -> str:
-    content = path.read_bytes()
-    h = hashlib.sha256(content).hexdigest()[:16]
-    return f"{path.name}:{h}"
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 pool for request handlers.
 
+    - checkout blocks (up to checkout_timeout_s) instead of failing when all connections are busy
+    - connections idle for longer than health_check_after_s are pinged before reuse, and replaced if dead
+    - pooled connections are autocommit; anything left in a transaction is rolled back on return
+    - wait time for a connection is tracked for monitoring (see stats())
+    """
 
-def apply_sql_migrations(*, database_url: str, migrations_dir: str) -> list[str]:
-    mig_dir = Path(migrations_dir)
-    if not mig_dir.exists():
-        raise FileNotFoundError(f"migrations_dir not found: {migrations_dir}")
+    def __init__(
+        self,
+        database_url: str,
+        *,
+        minconn: int = 1,
+        maxconn: int = 10,
+        checkout_timeout_s: float = 10.0,
+        health_check_after_s: float = 30.0,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"invalid pool size: min={minconn} max={maxconn}")
+        self.maxconn = maxconn
+        self.checkout_timeout_s = checkout_timeout_s
+        self.health_check_after_s = health_check_after_s
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, database_url)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: dict[int, float] = {}
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout_s):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"no database connection available after {self.checkout_timeout_s:.1f}s")
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        waited = time.monotonic() - started
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total_s += waited
+            self._wait_max_s = max(self._wait_max_s, waited)
+
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            self._checkin(conn, broken=broken)
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def _checkout(self) -> psycopg2.extensions.connection:
+        conn = self._pool.getconn()
+        if not conn.closed and not conn.autocommit:
+            # Before the ping below: run outside autocommit it would leave the connection in a
+            # transaction, and autocommit can't be switched on after that.
+            conn.autocommit = True
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if conn.closed or idle > self.health_check_after_s:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+            except psycopg2.Error:
+                logger.warning("Replacing dead pooled connection")
+                self._pool.putconn(conn, close=True)
+                with self._lock:
+                    self._replaced += 1
+                conn = self._pool.getconn()
+        if not conn.autocommit:
+            conn.autocommit = True
+        return conn
+
+    def _checkin(self, conn: psycopg2.extensions.connection, *, broken: bool) -> None:
+        if not broken and not conn.closed:
+            try:
+                if not conn.autocommit:
+                    conn.rollback()
+                    conn.autocommit = True
+            except psycopg2.Error:
+                broken = True
+        self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=broken or bool(conn.closed))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_size": self.maxconn,
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "replaced_connections": self._replaced,
+                "wait_total_s": round(self._wait_total_s, 6),
+                "wait_avg_ms": round(1000.0 * self._wait_total_s / self._checkouts, 3) if self._checkouts else 0.0,
+                "wait_max_ms": round(1000.0 * self._wait_max_s, 3),
+            }
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+_pool: Optional[ConnectionPool] = None
 
-    sql_files = sorted([p for p in mig_dir.glob("*.sql") if p.is_file()])
-    applied: list[str] = []
-    if not sql_files:
-        return applied
 
+def init_pool(database_url: str, **kwargs) -> ConnectionPool:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+    _pool = ConnectionPool(database_url, **kwargs)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def get_pool() -> ConnectionPool:
+    if _pool is None:
+        raise RuntimeError("database pool not initialised (call init_pool at startup)")
+    return _pool
+
+
+@contextmanager
+def connection() -> Iterator[psycopg2.extensions.connection]:
+    """Check out a pooled (autocommit) connection for the duration of the block."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def apply_sql_migrations(*, database_url: str, migrations_dir: str) -> list[str]:
+    """Shared runner from the DAGs (ytb_elt.db.migrate); the app image ships that package."""
     with connect(database_url) as conn:
-        conn.autocommit = True
-        with conn.cursor() as cur:
-            cur.execute("CREATE SCHEMA IF NOT EXISTS core;")
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS core.schema_migrations (
-                  version text PRIMARY KEY,
-                  applied_at timestamptz NOT NULL DEFAULT now()
-                );
-                """
-            )
-
-            for path in sql_files:
-                version = _migration_version(path)
-                cur.execute("SELECT 1 FROM core.schema_migrations WHERE version = %s;", (version,))
-                if cur.fetchone():
-                    continue
-                sql = path.read_text(encoding="utf-8")
-                logger.info("Applying migration %s", version)
-                cur.execute(sql)
-                cur.execute("INSERT INTO core.schema_migrations(version) VALUES (%s);", (version,))
-                applied.append(version)
-
-    return applied
+        return run_migrations(conn, migrations_dir)
 
 
 def fetchall_dict(cur) -> list[dict]:
@@ -0,0 +1,75 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["PoolTimeout", "init_pool", "close_pool", "get_pool", "connection", "stats"]
+
+_pool: Optional[AsyncConnectionPool] = None
+
+
+async def init_pool(
+    database_url: str,
+    *,
+    minconn: int = 1,
+    maxconn: int = 10,
+    checkout_timeout_s: float = 10.0,
+    max_idle_s: float = 300.0,
+) -> AsyncConnectionPool:
+    """
+    Open the process-wide async pool. Connections are autocommit and health-checked on checkout.
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+    _pool = AsyncConnectionPool(
+        database_url,
+        min_size=minconn,
+        max_size=maxconn,
+        timeout=checkout_timeout_s,
+        max_idle=max_idle_s,
+        kwargs={"autocommit": True},
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+    await _pool.open(wait=True)
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pool() -> AsyncConnectionPool:
+    if _pool is None:
+        raise RuntimeError("async database pool not initialised (call init_pool at startup)")
+    return _pool
+
+
+@asynccontextmanager
+async def connection() -> AsyncIterator[psycopg.AsyncConnection]:
+    async with get_pool().connection() as conn:
+        yield conn
+
+
+def stats() -> dict:
+    s = get_pool().get_stats()
+    waits = s.get("requests_num", 0)
+    return {
+        "max_size": s.get("pool_max"),
+        "size": s.get("pool_size"),
+        "available": s.get("pool_available"),
+        "waiting": s.get("requests_waiting", 0),
+        "checkouts": waits,
+        "timeouts": s.get("requests_errors", 0),
+        "replaced_connections": s.get("connections_lost", 0),
+        "wait_total_s": round(s.get("requests_wait_ms", 0) / 1000.0, 6),
+        "wait_avg_ms": round(s.get("requests_wait_ms", 0) / waits, 3) if waits else 0.0,
+    }
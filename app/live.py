@@ -0,0 +1,123 @@
+"""
+Fan-out of NOTIFY events to Server-Sent Events clients.
+
+The PgListener thread calls AlertBroadcaster.publish() once per notification; the event is
+rendered once and handed to every connected client's asyncio queue. Clients never query the
+database, so DB load does not depend on how many dashboards are open. A small replay buffer
+lets reconnecting browsers (Last-Event-ID) catch up on what they missed.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Published by the core.alerts_sent insert trigger (migrations/010_alerts_notify_trigger.sql).
+ALERTS_CHANNEL = "ytb_alerts"
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    name: str
+    data: str
+
+    def encode(self) -> bytes:
+        lines = "".join(f"data: {line}\n" for line in self.data.splitlines() or [""])
+        return f"id: {self.id}\nevent: {self.name}\n{lines}\n".encode("utf-8")
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, event: Event) -> None:
+        # Runs on the subscriber's event loop. Slow clients lose their oldest events.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class AlertBroadcaster:
+    def __init__(self, render: Callable[[dict], str], *, replay_size: int = 50, max_queue: int = 100):
+        self._render = render
+        self._replay: deque[Event] = deque(maxlen=replay_size)
+        self._subscribers: set[_Subscriber] = set()
+        self._lock = threading.Lock()
+        self.max_queue = max_queue
+        self.published = 0
+
+    def publish(self, payload: str) -> None:
+        """NOTIFY handler (listener thread)."""
+        try:
+            alert = json.loads(payload)
+            if alert.get("sent_at"):
+                alert["sent_at"] = datetime.fromisoformat(alert["sent_at"])
+            event = Event(id=int(alert["id"]), name="alert", data=self._render(alert))
+        except Exception:
+            logger.exception("Dropping malformed alert notification: %.200s", payload)
+            return
+
+        with self._lock:
+            self._replay.append(event)
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # Loop already closed; the subscriber is going away.
+                pass
+
+    @contextmanager
+    def subscribe(self, last_event_id: Optional[int] = None) -> Iterator[_Subscriber]:
+        sub = _Subscriber(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._replay:
+                    if event.id > last_event_id:
+                        sub.offer(event)
+            self._subscribers.add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                self._subscribers.discard(sub)
+
+    async def stream(
+        self,
+        is_disconnected: Callable[[], "asyncio.Future[bool]"],
+        *,
+        last_event_id: Optional[int] = None,
+        keepalive_s: float = 15.0,
+    ) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client; ends when the client disconnects."""
+        with self.subscribe(last_event_id) as sub:
+            yield b"retry: 3000\n\n"
+            while not await is_disconnected():
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=keepalive_s)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield event.encode()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"clients": len(self._subscribers), "published": self.published, "replay_buffer": len(self._replay)}
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
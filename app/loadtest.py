@@ -0,0 +1,105 @@
+"""
+Tiny closed-loop HTTP load generator for comparing app.main (sync) with app.main_async.
+
+Example (both apps running, see the `async` compose profile):
+  python -m app.loadtest \\
+    --target sync=http://localhost:8001 --target async=http://localhost:8002 \\
+    --path / --path /health --path "/search?q=@MrBeast" \\
+    --concurrency 64 --requests 4000
+
+Each target is run separately with the same request mix; paths are issued round-robin.
+Per target and per path we report count, errors, p50/p90/p99 latency and throughput.
+Point it at the compose stack (`postgres:13`) to measure the shipped setup; README numbers are from
+Postgres 16.
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * (p / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def run_target(
+    base_url: str,
+    paths: List[str],
+    *,
+    concurrency: int,
+    total_requests: int,
+    timeout: float,
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    latencies: Dict[str, List[float]] = {p: [] for p in paths}
+    errors: Dict[str, int] = {p: 0 for p in paths}
+    counter = iter(range(total_requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def worker() -> None:
+            for i in counter:
+                path = paths[i % len(paths)]
+                started = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    # 429 from the search throttle is an expected, fast answer; count it as served.
+                    ok = resp.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                latencies[path].append(time.perf_counter() - started)
+                if not ok:
+                    errors[path] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def _report(name: str, latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> None:
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n== {name}: {total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"{'path':<32} {'n':>7} {'err':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    rows = list(latencies.items()) + [("(all)", [x for v in latencies.values() for x in v])]
+    for path, values in rows:
+        values = sorted(values)
+        err = sum(errors.values()) if path == "(all)" else errors[path]
+        print(
+            f"{path[:32]:<32} {len(values):>7} {err:>5} "
+            f"{1000 * _percentile(values, 50):>9.1f} {1000 * _percentile(values, 90):>9.1f} "
+            f"{1000 * _percentile(values, 99):>9.1f}"
+        )
+
+
+def main(argv: List[str] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--target", action="append", required=True, help="name=base_url (repeatable)")
+    p.add_argument("--path", action="append", default=None, help="request path (repeatable, default /)")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--requests", type=int, default=2000, help="requests per target")
+    p.add_argument("--timeout", type=float, default=30.0)
+    args = p.parse_args(argv)
+
+    paths = args.path or ["/"]
+    for spec in args.target:
+        name, _, url = spec.partition("=")
+        if not url:
+            name, url = spec, spec
+        latencies, errors, elapsed = asyncio.run(
+            run_target(url, paths, concurrency=args.concurrency, total_requests=args.requests, timeout=args.timeout)
+        )
+        _report(name, latencies, errors, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
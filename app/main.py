@@ -1,14 +1,16 @@
+import json
 import logging
-import time
-from typing import Any
+import math
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
 
-from fastapi import FastAPI, Form, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Form, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from psycopg2.extras import RealDictCursor
 
-from app import db, settings, youtube
+from app import bulk_import, cache, db, live, notify_listener, pagination, queries, ratelimit, resolver, settings, timeseries, youtube
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +18,31 @@ app = FastAPI()
 templates = Jinja2Templates(directory="app/templates")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+# One rendered SSE event per alert NOTIFY, fanned out to every open dashboard.
+_alerts = live.AlertBroadcaster(lambda a: templates.get_template("partials/alert_item.html").render(a=a))
+
 DEFAULT_WATCHLIST_ID = "default"
 
-# Very small in-memory throttle: ip -> last_search_epoch
-_last_search_by_ip: dict[str, float] = {}
-_SEARCH_COOLDOWN_S = 1.0
+# Per-IP token buckets for /search (shared via Redis when REDIS_URL is set).
+_search_limiter = ratelimit.build_rate_limiter(
+    rate_per_s=settings.search_rate_per_s(),
+    burst=settings.search_burst(),
+    redis_url=settings.redis_url(),
+    prefix="ratelimit:search",
+)
+
+# Rendered pages/fragments keyed by (name, watchlist, data version); see app/cache.py.
+_versions = cache.DataVersion()
+_fragments = cache.TTLCache(max_entries=256, ttl_s=settings.cache_ttl_s())
+# View-series payloads keyed by (kind, id, spec, data version); ingest NOTIFYs roll the version.
+_series = cache.TTLCache(max_entries=512, ttl_s=settings.series_cache_ttl_s())
+_listener: Optional[notify_listener.PgListener] = None
+
+_resolver = resolver.ChannelResolver(
+    max_entries=settings.resolver_cache_max(),
+    ttl_s=settings.resolver_cache_ttl_s(),
+    db_max_age=timedelta(hours=settings.resolver_db_max_age_h()),
+)
 
 
 @app.on_event("startup")
@@ -30,36 +52,122 @@ def _startup() -> None:
     applied = db.apply_sql_migrations(database_url=settings.database_url(), migrations_dir=settings.migrations_dir())
     if applied:
         logger.info("Applied %d migrations", len(applied))
+    db.init_pool(
+        settings.database_url(),
+        minconn=settings.db_pool_min(),
+        maxconn=settings.db_pool_max(),
+        checkout_timeout_s=settings.db_pool_timeout_s(),
+        health_check_after_s=settings.db_pool_health_check_after_s(),
+    )
     _ensure_default_watchlist()
 
+    global _listener
+    _listener = notify_listener.PgListener(settings.database_url())
+    notify_listener.bind_data_version(_listener, _versions)
+    _listener.subscribe(live.ALERTS_CHANNEL, _alerts.publish)
+    _listener.start()
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    if _listener is not None:
+        _listener.stop()
+    db.close_pool()
+
+
+@app.exception_handler(db.PoolTimeout)
+def _pool_timeout(request: Request, exc: db.PoolTimeout) -> JSONResponse:
+    logger.warning("DB pool exhausted on %s: %s", request.url.path, exc)
+    return JSONResponse(status_code=503, content={"detail": "database busy, retry shortly"})
+
+
+@app.exception_handler(pagination.InvalidCursor)
+def _invalid_cursor(request: Request, exc: pagination.InvalidCursor) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": "invalid cursor"})
+
 
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> dict[str, Any]:
+    return {
+        "db_pool": db.get_pool().stats(),
+        "page_cache": _fragments.stats(),
+        "series_cache": _series.stats(),
+        "listener": _listener.stats() if _listener else None,
+        "channel_resolver": _resolver.stats(),
+        "search_rate_limit": _search_limiter.stats(),
+        "live_alerts": _alerts.stats(),
+    }
+
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request) -> Any:
-    tracked = _get_tracked_channels()
-    alerts = _get_recent_alerts()
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "tracked": tracked,
-            "alerts": alerts,
-        },
+    def load(conn) -> dict:
+        return {"tracked": _get_tracked_channels(conn), "alerts": _get_recent_alerts(conn)}
+
+    return _cached_page(request, "index", "index.html", load)
+
+
+@app.get("/alerts/stream")
+async def alerts_stream(request: Request) -> StreamingResponse:
+    """Server-Sent Events: one `alert` event (rendered HTML) per new core.alerts_sent row."""
+    last_event_id = live.parse_last_event_id(request.headers.get("last-event-id"))
+    return StreamingResponse(
+        _alerts.stream(request.is_disconnected, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@app.get("/partials/tracked", response_class=HTMLResponse)
+def tracked_partial(request: Request) -> Any:
+    return _cached_page(request, "tracked", "partials/tracked_list.html", lambda conn: {"tracked": _get_tracked_channels(conn)})
+
+
+@app.get("/partials/alerts", response_class=HTMLResponse)
+def alerts_partial(request: Request) -> Any:
+    return _cached_page(request, "alerts", "partials/alerts_list.html", lambda conn: {"alerts": _get_recent_alerts(conn)})
+
+
+def _cached_page(request: Request, name: str, template: str, load: Callable[[Any], dict]) -> Response:
+    """
+    Serve a page/fragment from the render cache, or 304 when the browser already has it.
+    Only a miss touches the database (one checkout for all of the page's queries).
+    """
+    version = _versions.current(DEFAULT_WATCHLIST_ID)
+    etag = cache.make_etag(name, DEFAULT_WATCHLIST_ID, version)
+    headers = cache.cache_headers(etag)
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (name, DEFAULT_WATCHLIST_ID, version)
+    body = _fragments.get(key)
+    if body is None:
+        with db.connection() as conn:
+            context = load(conn)
+        body = templates.get_template(template).render(context)
+        _fragments.set(key, body)
+    return HTMLResponse(body, headers=headers)
+
+
+def _data_changed(cur) -> None:
+    # Invalidate this worker immediately; other workers pick it up via NOTIFY.
+    notify_listener.notify(cur, notify_listener.DATA_CHANGED_CHANNEL, DEFAULT_WATCHLIST_ID)
+    _versions.bump(DEFAULT_WATCHLIST_ID)
+
+
 @app.get("/search", response_class=HTMLResponse)
 def search(request: Request, q: str = "") -> Any:
     ip = request.client.host if request.client else "unknown"
-    now = time.time()
-    last = _last_search_by_ip.get(ip, 0.0)
-    if now - last < _SEARCH_COOLDOWN_S:
-        raise HTTPException(status_code=429, detail="slow down")
-    _last_search_by_ip[ip] = now
+    decision = _search_limiter.allow(ip)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429, detail="slow down", headers={"Retry-After": str(max(1, math.ceil(decision.retry_after_s)))}
+        )
 
     q = (q or "").strip()
     if not q:
@@ -72,41 +180,25 @@ def search(request: Request, q: str = "") -> Any:
             {"request": request, "results": [], "q": q, "error": "Missing YOUTUBE_API_KEY in environment"},
         )
 
-    yt = youtube.YouTubeClient(api_key)
     parsed = youtube.parse_channel_input(q)
+    # v0 app UX simplification: accept only @handle input.
+    if "handle" not in parsed:
+        return templates.TemplateResponse(
+            "partials/search_results.html",
+            {"request": request, "results": [], "q": q, "error": "Please enter a channel handle like @MrBeast"},
+        )
 
     results: list[youtube.ChannelResult] = []
     error = None
-
+    handle = parsed["handle"]
     try:
-        # v0 app UX simplification: accept only @handle input.
-        if "handle" not in parsed:
-            return templates.TemplateResponse(
-                "partials/search_results.html",
-                {
-                    "request": request,
-                    "results": [],
-                    "q": q,
-                    "error": "Please enter a channel handle like @MrBeast",
-                },
-            )
-
-        handle = parsed["handle"]
-        item = yt.resolve_channel_by_handle(handle)
-        if not item:
-            return templates.TemplateResponse(
-                "partials/search_results.html",
-                {
-                    "request": request,
-                    "results": [],
-                    "q": q,
-                    "error": f"No channel found for @{handle}",
-                },
-            )
-
-        r = youtube.channel_result_from_channels_item(item)
-        if r:
-            results = [r]
+        resolved = _resolver.by_handle(youtube.YouTubeClient(api_key), handle, connection=db.connection)
+        if resolved:
+            results = [resolved.result]
+        else:
+            error = f"No channel found for @{handle}"
+    except db.PoolTimeout:
+        raise
     except Exception as e:
         error = str(e)
 
@@ -122,141 +214,151 @@ def track(request: Request, channel_id: str = Form(...)) -> Any:
     if not api_key:
         raise HTTPException(status_code=400, detail="Missing YOUTUBE_API_KEY")
 
-    yt = youtube.YouTubeClient(api_key)
-    item = yt.resolve_channel_by_id(channel_id)
-    if not item:
+    # Usually served from the resolver cache right after /search; the resolver has already
+    # written the channel row to core.channels.
+    resolved = _resolver.by_id(youtube.YouTubeClient(api_key), channel_id, connection=db.connection)
+    if not resolved:
         raise HTTPException(status_code=404, detail="Channel not found")
 
-    r = youtube.channel_result_from_channels_item(item)
-    uploads = youtube.uploads_playlist_id_from_channels_item(item)
-    if not r or not uploads:
+    r = resolved.result
+    if not resolved.uploads_playlist_id:
         raise HTTPException(status_code=400, detail="Channel missing required metadata")
 
-    with db.connect(settings.database_url()) as conn:
-        conn.autocommit = True
+    with db.connection() as conn:
         with conn.cursor() as cur:
             _ensure_default_watchlist(cur=cur)
-            cur.execute(
-                """
-                INSERT INTO core.channels(
-                  channel_id, title, uploads_playlist_id, handle, thumbnail_url,
-                  subscriber_count, video_count, view_count,
-                  last_resolved_at, updated_at
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now(), now())
-                ON CONFLICT (channel_id) DO UPDATE
-                  SET title = EXCLUDED.title,
-                      uploads_playlist_id = EXCLUDED.uploads_playlist_id,
-                      handle = EXCLUDED.handle,
-                      thumbnail_url = EXCLUDED.thumbnail_url,
-                      subscriber_count = EXCLUDED.subscriber_count,
-                      video_count = EXCLUDED.video_count,
-                      view_count = EXCLUDED.view_count,
-                      last_resolved_at = now(),
-                      updated_at = now();
-                """,
-                (
-                    r.channel_id,
-                    r.title,
-                    uploads,
-                    r.handle,
-                    r.thumbnail_url,
-                    r.subscriber_count,
-                    r.video_count,
-                    r.view_count,
-                ),
-            )
-
-            cur.execute(
-                """
-                INSERT INTO core.watchlist_channels(watchlist_id, channel_id)
-                VALUES (%s, %s)
-                ON CONFLICT DO NOTHING;
-                """,
-                (DEFAULT_WATCHLIST_ID, r.channel_id),
-            )
-
-    tracked = _get_tracked_channels()
+            cur.execute(queries.TRACK_CHANNEL, (DEFAULT_WATCHLIST_ID, r.channel_id))
+            _data_changed(cur)
+        tracked = _get_tracked_channels(conn)
+
     return templates.TemplateResponse("partials/tracked_list.html", {"request": request, "tracked": tracked})
 
 
+@app.post("/track/bulk")
+def track_bulk(channels: str = Form(...)) -> StreamingResponse:
+    api_key = settings.youtube_api_key()
+    if not api_key:
+        raise HTTPException(status_code=400, detail="Missing YOUTUBE_API_KEY")
+    try:
+        plan = bulk_import.parse_inputs(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    events = bulk_import.import_channels(
+        youtube.YouTubeClient(api_key),
+        plan,
+        connection=db.connection,
+        watchlist_id=DEFAULT_WATCHLIST_ID,
+        after_write=_data_changed,
+        db_max_age=timedelta(hours=settings.resolver_db_max_age_h()),
+        concurrency=settings.bulk_import_concurrency(),
+        max_api_calls=settings.bulk_import_max_api_calls(),
+    )
+    # One JSON object per line as the import progresses.
+    return StreamingResponse((json.dumps(e, default=str) + "\n" for e in events), media_type="application/x-ndjson")
+
+
 @app.post("/untrack", response_class=HTMLResponse)
 def untrack(request: Request, channel_id: str = Form(...)) -> Any:
-    with db.connect(settings.database_url()) as conn:
-        conn.autocommit = True
+    with db.connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                "DELETE FROM core.watchlist_channels WHERE watchlist_id=%s AND channel_id=%s;",
-                (DEFAULT_WATCHLIST_ID, channel_id),
-            )
-    tracked = _get_tracked_channels()
+            cur.execute(queries.UNTRACK_CHANNEL, (DEFAULT_WATCHLIST_ID, channel_id))
+            _data_changed(cur)
+        tracked = _get_tracked_channels(conn)
     return templates.TemplateResponse("partials/tracked_list.html", {"request": request, "tracked": tracked})
 
 
+# --- JSON API (keyset pagination; pass back `next_cursor` as `cursor` for the next page) ---------
+
+
+@app.get("/api/alerts")
+def api_alerts(
+    watchlist_id: str = DEFAULT_WATCHLIST_ID, cursor: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT
+) -> dict:
+    return _keyset_page(
+        queries.alerts_page, (watchlist_id,), cursor, (datetime, int), limit, lambda r: (r["sent_at"], r["id"])
+    )
+
+
+@app.get("/api/channels")
+def api_channels(
+    watchlist_id: str = DEFAULT_WATCHLIST_ID, cursor: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT
+) -> dict:
+    return _keyset_page(queries.channels_page, (watchlist_id,), cursor, (str,), limit, lambda r: (r["channel_id"],))
+
+
+@app.get("/api/videos/{video_id}/snapshots")
+def api_video_snapshots(video_id: str, cursor: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT) -> dict:
+    return _keyset_page(
+        queries.video_snapshots_page, (video_id,), cursor, (datetime,), limit, lambda r: (r["pulled_at"],)
+    )
+
+
+@app.get("/api/videos/{video_id}/views")
+def api_video_views(
+    video_id: str,
+    range_: str = Query("30d", alias="range"),
+    resolution: str = "auto",
+    points: int = timeseries.DEFAULT_POINTS,
+) -> dict:
+    return _views_series("video", queries.VIDEO_VIEWS_SERIES, video_id, range_, resolution, points)
+
+
+@app.get("/api/channels/{channel_id}/views")
+def api_channel_views(
+    channel_id: str,
+    range_: str = Query("30d", alias="range"),
+    resolution: str = "auto",
+    points: int = timeseries.DEFAULT_POINTS,
+) -> dict:
+    return _views_series("channel", queries.CHANNEL_VIEWS_SERIES, channel_id, range_, resolution, points)
+
+
+def _views_series(kind: str, sql: str, key_id: str, range_: str, resolution: str, points: int) -> dict:
+    try:
+        spec = timeseries.series_spec(range_, resolution, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    key = (kind, key_id, spec, _versions.current("*"))
+    payload = _series.get(key)
+    if payload is None:
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, spec.params(key_id))
+                rows = cur.fetchall()
+        payload = {f"{kind}_id": key_id, **timeseries.series_payload(rows, spec)}
+        _series.set(key, payload)
+    return payload
+
+
+def _keyset_page(build_sql, params: tuple, cursor: Optional[str], types: tuple, limit: int, key) -> dict:
+    after = pagination.decode_cursor(cursor, types)
+    n = pagination.clamp_limit(limit)
+    with db.connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(build_sql(after is not None), (*params, *(after or ()), n + 1))
+            rows = cur.fetchall()
+    return pagination.page(rows, n, key)
+
+
 def _ensure_default_watchlist(cur=None) -> None:
     if cur is None:
-        with db.connect(settings.database_url()) as conn:
-            conn.autocommit = True
+        with db.connection() as conn:
             with conn.cursor() as cur2:
                 _ensure_default_watchlist(cur=cur2)
         return
 
-    cur.execute(
-        """
-        INSERT INTO core.watchlists(watchlist_id, enabled, video_types, updated_at)
-        VALUES (%s, true, ARRAY['long','short'], now())
-        ON CONFLICT (watchlist_id) DO UPDATE
-          SET enabled = true,
-              updated_at = now();
-        """,
-        (DEFAULT_WATCHLIST_ID,),
-    )
+    cur.execute(queries.ENSURE_WATCHLIST, (DEFAULT_WATCHLIST_ID,))
 
 
-def _get_tracked_channels() -> list[dict]:
-    with db.connect(settings.database_url()) as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT
-                  c.channel_id,
-                  COALESCE(c.title, '') AS title,
-                  COALESCE(c.thumbnail_url, '') AS thumbnail_url,
-                  c.subscriber_count,
-                  c.video_count AS channel_video_count,
-                  max(s.pulled_at) AS last_snapshot_at,
-                  count(distinct v.video_id) AS videos_count
-                FROM core.watchlist_channels wc
-                JOIN core.channels c ON c.channel_id = wc.channel_id
-                LEFT JOIN core.videos v ON v.channel_id = c.channel_id
-                LEFT JOIN core.video_stats_snapshots s ON s.video_id = v.video_id
-                WHERE wc.watchlist_id = %s
-                GROUP BY c.channel_id, c.title, c.thumbnail_url, c.subscriber_count, c.video_count
-                ORDER BY COALESCE(c.title, c.channel_id);
-                """,
-                (DEFAULT_WATCHLIST_ID,),
-            )
-            return [dict(r) for r in cur.fetchall()]
-
-
-def _get_recent_alerts(limit: int = 20) -> list[dict]:
-    with db.connect(settings.database_url()) as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT
-                  a.sent_at,
-                  a.rule_type,
-                  a.channel_id,
-                  COALESCE(c.title, '') AS channel_title,
-                  a.video_id,
-                  COALESCE(v.title, '') AS video_title
-                FROM core.alerts_sent a
-                LEFT JOIN core.channels c ON c.channel_id = a.channel_id
-                LEFT JOIN core.videos v ON v.video_id = a.video_id
-                ORDER BY a.sent_at DESC
-                LIMIT %s;
-                """,
-                (limit,),
-            )
-            return [dict(r) for r in cur.fetchall()]
+def _get_tracked_channels(conn) -> list[dict]:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(queries.TRACKED_CHANNELS, (DEFAULT_WATCHLIST_ID,))
+        return [dict(r) for r in cur.fetchall()]
+
+
+def _get_recent_alerts(conn, limit: int = 20) -> list[dict]:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(queries.RECENT_ALERTS, (limit,))
+        return [dict(r) for r in cur.fetchall()]
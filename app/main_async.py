@@ -0,0 +1,388 @@
+"""
+Async variant of app.main: same routes and templates, but handlers are coroutines backed by a
+psycopg 3 AsyncConnectionPool and an httpx-based YouTube client, so slow YouTube calls in
+/search or /track no longer tie up Starlette's threadpool.
+
+Run with: uvicorn app.main_async:app --port 8002
+"""
+import asyncio
+import json
+import logging
+import math
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import httpx
+from fastapi import FastAPI, Form, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from psycopg.rows import dict_row
+
+from app import bulk_import, cache, db, db_async, live, notify_listener, pagination, queries, ratelimit, resolver, settings, timeseries, youtube
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCHLIST_ID = "default"
+
+# Per-IP token buckets for /search (shared via Redis when REDIS_URL is set).
+_search_limiter = ratelimit.build_rate_limiter(
+    rate_per_s=settings.search_rate_per_s(),
+    burst=settings.search_burst(),
+    redis_url=settings.redis_url(),
+    prefix="ratelimit:search",
+)
+
+# Shared HTTP connection pool for YouTube API calls (set in lifespan).
+_http: httpx.AsyncClient | None = None
+
+# Rendered pages/fragments keyed by (name, watchlist, data version); see app/cache.py.
+_versions = cache.DataVersion()
+_fragments = cache.TTLCache(max_entries=256, ttl_s=settings.cache_ttl_s())
+# View-series payloads keyed by (kind, id, spec, data version); ingest NOTIFYs roll the version.
+_series = cache.TTLCache(max_entries=512, ttl_s=settings.series_cache_ttl_s())
+_listener: notify_listener.PgListener | None = None
+
+_resolver = resolver.ChannelResolver(
+    max_entries=settings.resolver_cache_max(),
+    ttl_s=settings.resolver_cache_ttl_s(),
+    db_max_age=timedelta(hours=settings.resolver_db_max_age_h()),
+)
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    global _http, _listener
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Migrations stay on the sync driver; run them off the event loop.
+    applied = await asyncio.to_thread(
+        db.apply_sql_migrations, database_url=settings.database_url(), migrations_dir=settings.migrations_dir()
+    )
+    if applied:
+        logger.info("Applied %d migrations", len(applied))
+    await db_async.init_pool(
+        settings.database_url(),
+        minconn=settings.db_pool_min(),
+        maxconn=settings.db_pool_max(),
+        checkout_timeout_s=settings.db_pool_timeout_s(),
+    )
+    _http = httpx.AsyncClient(timeout=20, limits=httpx.Limits(max_connections=50, max_keepalive_connections=20))
+    await _ensure_default_watchlist()
+    _listener = notify_listener.PgListener(settings.database_url())
+    notify_listener.bind_data_version(_listener, _versions)
+    _listener.subscribe(live.ALERTS_CHANNEL, _alerts.publish)
+    _listener.start()
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(_listener.stop)
+        _listener = None
+        await _http.aclose()
+        _http = None
+        await db_async.close_pool()
+
+
+app = FastAPI(lifespan=_lifespan)
+templates = Jinja2Templates(directory="app/templates")
+app.mount("/static", StaticFiles(directory="app/static"), name="static")
+
+# One rendered SSE event per alert NOTIFY, fanned out to every open dashboard.
+_alerts = live.AlertBroadcaster(lambda a: templates.get_template("partials/alert_item.html").render(a=a))
+
+
+@app.exception_handler(db_async.PoolTimeout)
+async def _pool_timeout(request: Request, exc: db_async.PoolTimeout) -> JSONResponse:
+    logger.warning("DB pool exhausted on %s: %s", request.url.path, exc)
+    return JSONResponse(status_code=503, content={"detail": "database busy, retry shortly"})
+
+
+@app.exception_handler(pagination.InvalidCursor)
+async def _invalid_cursor(request: Request, exc: pagination.InvalidCursor) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": "invalid cursor"})
+
+
+@app.get("/health")
+async def health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics() -> dict[str, Any]:
+    return {
+        "db_pool": db_async.stats(),
+        "page_cache": _fragments.stats(),
+        "series_cache": _series.stats(),
+        "listener": _listener.stats() if _listener else None,
+        "channel_resolver": _resolver.stats(),
+        "search_rate_limit": _search_limiter.stats(),
+        "live_alerts": _alerts.stats(),
+    }
+
+
+@app.get("/", response_class=HTMLResponse)
+async def index(request: Request) -> Any:
+    async def load() -> dict:
+        # Independent queries on separate pooled connections, concurrently.
+        tracked, alerts = await asyncio.gather(_get_tracked_channels(), _get_recent_alerts())
+        return {"tracked": tracked, "alerts": alerts}
+
+    return await _cached_page(request, "index", "index.html", load)
+
+
+@app.get("/alerts/stream")
+async def alerts_stream(request: Request) -> StreamingResponse:
+    """Server-Sent Events: one `alert` event (rendered HTML) per new core.alerts_sent row."""
+    last_event_id = live.parse_last_event_id(request.headers.get("last-event-id"))
+    return StreamingResponse(
+        _alerts.stream(request.is_disconnected, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/partials/tracked", response_class=HTMLResponse)
+async def tracked_partial(request: Request) -> Any:
+    async def load() -> dict:
+        return {"tracked": await _get_tracked_channels()}
+
+    return await _cached_page(request, "tracked", "partials/tracked_list.html", load)
+
+
+@app.get("/partials/alerts", response_class=HTMLResponse)
+async def alerts_partial(request: Request) -> Any:
+    async def load() -> dict:
+        return {"alerts": await _get_recent_alerts()}
+
+    return await _cached_page(request, "alerts", "partials/alerts_list.html", load)
+
+
+async def _cached_page(request: Request, name: str, template: str, load: Callable[[], Awaitable[dict]]) -> Response:
+    """Async counterpart of app.main._cached_page."""
+    version = _versions.current(DEFAULT_WATCHLIST_ID)
+    etag = cache.make_etag(name, DEFAULT_WATCHLIST_ID, version)
+    headers = cache.cache_headers(etag)
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (name, DEFAULT_WATCHLIST_ID, version)
+    body = _fragments.get(key)
+    if body is None:
+        body = templates.get_template(template).render(await load())
+        _fragments.set(key, body)
+    return HTMLResponse(body, headers=headers)
+
+
+@app.get("/search", response_class=HTMLResponse)
+async def search(request: Request, q: str = "") -> Any:
+    ip = request.client.host if request.client else "unknown"
+    decision = await asyncio.to_thread(_search_limiter.allow, ip)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429, detail="slow down", headers={"Retry-After": str(max(1, math.ceil(decision.retry_after_s)))}
+        )
+
+    q = (q or "").strip()
+    if not q:
+        return templates.TemplateResponse("partials/search_results.html", {"request": request, "results": [], "q": q})
+
+    api_key = settings.youtube_api_key()
+    if not api_key:
+        return templates.TemplateResponse(
+            "partials/search_results.html",
+            {"request": request, "results": [], "q": q, "error": "Missing YOUTUBE_API_KEY in environment"},
+        )
+
+    parsed = youtube.parse_channel_input(q)
+    # v0 app UX simplification: accept only @handle input.
+    if "handle" not in parsed:
+        return templates.TemplateResponse(
+            "partials/search_results.html",
+            {"request": request, "results": [], "q": q, "error": "Please enter a channel handle like @MrBeast"},
+        )
+
+    results: list[youtube.ChannelResult] = []
+    error = None
+    handle = parsed["handle"]
+    try:
+        resolved = await _resolver.aby_handle(_yt(api_key), handle, connection=db_async.connection)
+        if resolved:
+            results = [resolved.result]
+        else:
+            error = f"No channel found for @{handle}"
+    except db_async.PoolTimeout:
+        raise
+    except Exception as e:
+        error = str(e)
+
+    return templates.TemplateResponse(
+        "partials/search_results.html",
+        {"request": request, "results": results, "q": q, "error": error},
+    )
+
+
+@app.post("/track", response_class=HTMLResponse)
+async def track(request: Request, channel_id: str = Form(...)) -> Any:
+    api_key = settings.youtube_api_key()
+    if not api_key:
+        raise HTTPException(status_code=400, detail="Missing YOUTUBE_API_KEY")
+
+    # Usually served from the resolver cache right after /search (see app/resolver.py).
+    resolved = await _resolver.aby_id(_yt(api_key), channel_id, connection=db_async.connection)
+    if not resolved:
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    r = resolved.result
+    if not resolved.uploads_playlist_id:
+        raise HTTPException(status_code=400, detail="Channel missing required metadata")
+
+    async with db_async.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(queries.ENSURE_WATCHLIST, (DEFAULT_WATCHLIST_ID,))
+            await cur.execute(queries.TRACK_CHANNEL, (DEFAULT_WATCHLIST_ID, r.channel_id))
+            await _data_changed(cur)
+
+    tracked = await _get_tracked_channels()
+    return templates.TemplateResponse("partials/tracked_list.html", {"request": request, "tracked": tracked})
+
+
+@app.post("/track/bulk")
+async def track_bulk(channels: str = Form(...)) -> StreamingResponse:
+    api_key = settings.youtube_api_key()
+    if not api_key:
+        raise HTTPException(status_code=400, detail="Missing YOUTUBE_API_KEY")
+    try:
+        plan = bulk_import.parse_inputs(channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    events = bulk_import.aimport_channels(
+        _yt(api_key),
+        plan,
+        connection=db_async.connection,
+        watchlist_id=DEFAULT_WATCHLIST_ID,
+        after_write=_data_changed,
+        db_max_age=timedelta(hours=settings.resolver_db_max_age_h()),
+        concurrency=settings.bulk_import_concurrency(),
+        max_api_calls=settings.bulk_import_max_api_calls(),
+    )
+
+    async def ndjson() -> AsyncIterator[bytes]:
+        async for e in events:
+            yield (json.dumps(e, default=str) + "\n").encode("utf-8")
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/untrack", response_class=HTMLResponse)
+async def untrack(request: Request, channel_id: str = Form(...)) -> Any:
+    async with db_async.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(queries.UNTRACK_CHANNEL, (DEFAULT_WATCHLIST_ID, channel_id))
+            await _data_changed(cur)
+    tracked = await _get_tracked_channels()
+    return templates.TemplateResponse("partials/tracked_list.html", {"request": request, "tracked": tracked})
+
+
+# --- JSON API (keyset pagination; pass back `next_cursor` as `cursor` for the next page) ---------
+
+
+@app.get("/api/alerts")
+async def api_alerts(
+    watchlist_id: str = DEFAULT_WATCHLIST_ID, cursor: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT
+) -> dict:
+    return await _keyset_page(
+        queries.alerts_page, (watchlist_id,), cursor, (datetime, int), limit, lambda r: (r["sent_at"], r["id"])
+    )
+
+
+@app.get("/api/channels")
+async def api_channels(
+    watchlist_id: str = DEFAULT_WATCHLIST_ID, cursor: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT
+) -> dict:
+    return await _keyset_page(
+        queries.channels_page, (watchlist_id,), cursor, (str,), limit, lambda r: (r["channel_id"],)
+    )
+
+
+@app.get("/api/videos/{video_id}/snapshots")
+async def api_video_snapshots(
+    video_id: str, cursor: Optional[str] = None, limit: int = pagination.DEFAULT_LIMIT
+) -> dict:
+    return await _keyset_page(
+        queries.video_snapshots_page, (video_id,), cursor, (datetime,), limit, lambda r: (r["pulled_at"],)
+    )
+
+
+@app.get("/api/videos/{video_id}/views")
+async def api_video_views(
+    video_id: str,
+    range_: str = Query("30d", alias="range"),
+    resolution: str = "auto",
+    points: int = timeseries.DEFAULT_POINTS,
+) -> dict:
+    return await _views_series("video", queries.VIDEO_VIEWS_SERIES, video_id, range_, resolution, points)
+
+
+@app.get("/api/channels/{channel_id}/views")
+async def api_channel_views(
+    channel_id: str,
+    range_: str = Query("30d", alias="range"),
+    resolution: str = "auto",
+    points: int = timeseries.DEFAULT_POINTS,
+) -> dict:
+    return await _views_series("channel", queries.CHANNEL_VIEWS_SERIES, channel_id, range_, resolution, points)
+
+
+async def _views_series(kind: str, sql: str, key_id: str, range_: str, resolution: str, points: int) -> dict:
+    try:
+        spec = timeseries.series_spec(range_, resolution, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    key = (kind, key_id, spec, _versions.current("*"))
+    payload = _series.get(key)
+    if payload is None:
+        async with db_async.connection() as conn:
+            cur = await conn.execute(sql, spec.params(key_id))
+            rows = await cur.fetchall()
+        payload = {f"{kind}_id": key_id, **timeseries.series_payload(rows, spec)}
+        _series.set(key, payload)
+    return payload
+
+
+async def _keyset_page(build_sql, params: tuple, cursor: Optional[str], types: tuple, limit: int, key) -> dict:
+    after = pagination.decode_cursor(cursor, types)
+    n = pagination.clamp_limit(limit)
+    rows = await _fetch_dicts(build_sql(after is not None), (*params, *(after or ()), n + 1))
+    return pagination.page(rows, n, key)
+
+
+async def _data_changed(cur) -> None:
+    # Invalidate this worker immediately; other workers pick it up via NOTIFY.
+    await cur.execute("SELECT pg_notify(%s, %s);", (notify_listener.DATA_CHANGED_CHANNEL, DEFAULT_WATCHLIST_ID))
+    _versions.bump(DEFAULT_WATCHLIST_ID)
+
+
+def _yt(api_key: str) -> youtube.AsyncYouTubeClient:
+    return youtube.AsyncYouTubeClient(api_key, client=_http)
+
+
+async def _ensure_default_watchlist() -> None:
+    async with db_async.connection() as conn:
+        await conn.execute(queries.ENSURE_WATCHLIST, (DEFAULT_WATCHLIST_ID,))
+
+
+async def _fetch_dicts(sql: str, params: tuple) -> list[dict]:
+    async with db_async.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(sql, params)
+            return await cur.fetchall()
+
+
+async def _get_tracked_channels() -> list[dict]:
+    return await _fetch_dicts(queries.TRACKED_CHANNELS, (DEFAULT_WATCHLIST_ID,))
+
+
+async def _get_recent_alerts(limit: int = 20) -> list[dict]:
+    return await _fetch_dicts(queries.RECENT_ALERTS, (limit,))
@@ -0,0 +1,130 @@
+"""
+Background Postgres LISTEN loop shared by the app's caches (and anything else that wants
+change notifications). One dedicated connection per process; callbacks run on the listener
+thread, so they must be quick and thread-safe.
+"""
+import logging
+import select
+import threading
+from typing import Callable, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Payload: a watchlist_id, or "*" when everything may have changed (ingest/alert runs).
+# The DAGs publish on the same channel (ytb_elt.db.events.DATA_CHANGED_CHANNEL).
+DATA_CHANGED_CHANNEL = "ytb_data_changed"
+
+
+class PgListener:
+    def __init__(self, database_url: str, *, reconnect_delay_s: float = 5.0, poll_interval_s: float = 1.0):
+        self.database_url = database_url
+        self.reconnect_delay_s = reconnect_delay_s
+        self.poll_interval_s = poll_interval_s
+        self._handlers: dict[str, list[Callable[[str], None]]] = {}
+        self._on_connect: list[Callable[[], None]] = []
+        self._on_disconnect: list[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.notifications = 0
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        if self._thread is not None:
+            raise RuntimeError("subscribe before start()")
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_connect(self, fn: Callable[[], None]) -> None:
+        """Called after every (re)connect; notifications sent while disconnected are lost."""
+        self._on_connect.append(fn)
+
+    def on_disconnect(self, fn: Callable[[], None]) -> None:
+        self._on_disconnect.append(fn)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.database_url)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    for channel in self._handlers:
+                        cur.execute(f'LISTEN "{channel}";')
+                self._set_connected(True)
+                logger.info("Listening on %s", ", ".join(sorted(self._handlers)))
+
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([conn], [], [], self.poll_interval_s)
+                    if not ready:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        n = conn.notifies.pop(0)
+                        self.notifications += 1
+                        self._dispatch(n.channel, n.payload)
+            except Exception as e:
+                logger.warning("LISTEN connection lost: %s", e)
+            finally:
+                self._set_connected(False)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.reconnect_delay_s)
+
+    def _set_connected(self, connected: bool) -> None:
+        if connected == self.connected:
+            return
+        self.connected = connected
+        for fn in self._on_connect if connected else self._on_disconnect:
+            try:
+                fn()
+            except Exception:
+                logger.exception("listener hook failed")
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("NOTIFY handler failed for channel=%s", channel)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "notifications": self.notifications, "channels": sorted(self._handlers)}
+
+
+def bind_data_version(listener: PgListener, versions) -> None:
+    """
+    Drive a cache.DataVersion from DATA_CHANGED_CHANNEL. After a (re)connect everything is bumped,
+    since notifications sent while disconnected were missed.
+    """
+
+    def connected() -> None:
+        versions.live = True
+        versions.bump()
+
+    def disconnected() -> None:
+        versions.live = False
+
+    listener.subscribe(DATA_CHANGED_CHANNEL, versions.bump)
+    listener.on_connect(connected)
+    listener.on_disconnect(disconnected)
+
+
+def notify(cur, channel: str, payload: str) -> None:
+    cur.execute("SELECT pg_notify(%s, %s);", (channel, payload))
@@ -0,0 +1,67 @@
+"""
+Keyset (cursor) pagination helpers for the JSON API.
+
+A cursor is the sort key of the last row on the previous page, encoded as urlsafe base64 JSON.
+Queries continue with `WHERE (sort keys) < (cursor values)` on an index matching the ORDER BY,
+so page N costs the same as page 1, and rows inserted meanwhile never shift later pages.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_LIMIT
+    return max(1, min(int(limit), MAX_LIMIT))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[tuple]:
+    """
+    Decode a cursor produced by encode_cursor, checking arity and types (datetime, int, str).
+    Returns None for an empty cursor; raises InvalidCursor otherwise.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor("malformed cursor") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursor("malformed cursor")
+
+    out = []
+    for value, typ in zip(values, types):
+        try:
+            if typ is datetime:
+                out.append(datetime.fromisoformat(value))
+            elif isinstance(value, typ) and not isinstance(value, bool):
+                out.append(value)
+            else:
+                raise TypeError(value)
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor("malformed cursor") from e
+    return tuple(out)
+
+
+def page(rows: Sequence[dict], limit: int, key: Callable[[dict], Sequence[Any]]) -> dict:
+    """
+    Build a response page from up to limit + 1 fetched rows (the extra row only signals more data).
+    """
+    items = [dict(r) for r in rows[:limit]]
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > limit and items else None
+    return {"items": items, "next_cursor": next_cursor}
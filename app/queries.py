@@ -0,0 +1,268 @@
+"""
+SQL shared by the sync (app.main) and async (app.main_async) apps.
+
+Both psycopg2 and psycopg 3 use %s placeholders, so the statements are driver-agnostic.
+"""
+
+ENSURE_WATCHLIST = """
+INSERT INTO core.watchlists(watchlist_id, enabled, video_types, updated_at)
+VALUES (%s, true, ARRAY['long','short'], now())
+ON CONFLICT (watchlist_id) DO UPDATE
+  SET enabled = true,
+      updated_at = now();
+"""
+
+UPSERT_CHANNEL = """
+INSERT INTO core.channels(
+  channel_id, title, uploads_playlist_id, handle, thumbnail_url,
+  subscriber_count, video_count, view_count,
+  last_resolved_at, updated_at
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now(), now())
+ON CONFLICT (channel_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      uploads_playlist_id = EXCLUDED.uploads_playlist_id,
+      handle = EXCLUDED.handle,
+      thumbnail_url = EXCLUDED.thumbnail_url,
+      subscriber_count = EXCLUDED.subscriber_count,
+      video_count = EXCLUDED.video_count,
+      view_count = EXCLUDED.view_count,
+      last_resolved_at = now(),
+      updated_at = now();
+"""
+
+# Resolver L2 lookups (app/resolver.py): rows resolved from YouTube within the given interval.
+_RESOLVED_CHANNEL_COLUMNS = """
+SELECT channel_id, COALESCE(title, ''), COALESCE(thumbnail_url, ''), handle,
+       subscriber_count, video_count, view_count, uploads_playlist_id
+FROM core.channels
+"""
+
+RESOLVED_CHANNEL_BY_HANDLE = _RESOLVED_CHANNEL_COLUMNS + """
+WHERE lower(handle) = lower(%s) AND last_resolved_at >= now() - %s
+LIMIT 1;
+"""
+
+RESOLVED_CHANNEL_BY_ID = _RESOLVED_CHANNEL_COLUMNS + """
+WHERE channel_id = %s AND last_resolved_at >= now() - %s
+LIMIT 1;
+"""
+
+# Bulk import (app/bulk_import.py): one round trip for all already-resolved inputs.
+RESOLVED_CHANNELS_BULK = _RESOLVED_CHANNEL_COLUMNS + """
+WHERE (channel_id = ANY(%s::text[]) OR lower(handle) = ANY(%s::text[]))
+  AND last_resolved_at >= now() - %s;
+"""
+
+# Column arrays (same order as UPSERT_CHANNEL params) unnested into one multi-row upsert.
+# Callers must de-duplicate channel_id: ON CONFLICT cannot touch the same row twice.
+UPSERT_CHANNELS_BULK = """
+INSERT INTO core.channels(
+  channel_id, title, uploads_playlist_id, handle, thumbnail_url,
+  subscriber_count, video_count, view_count,
+  last_resolved_at, updated_at
+)
+SELECT t.*, now(), now()
+FROM unnest(
+  %s::text[], %s::text[], %s::text[], %s::text[], %s::text[], %s::bigint[], %s::bigint[], %s::bigint[]
+) AS t(channel_id, title, uploads_playlist_id, handle, thumbnail_url, subscriber_count, video_count, view_count)
+ON CONFLICT (channel_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      uploads_playlist_id = EXCLUDED.uploads_playlist_id,
+      handle = EXCLUDED.handle,
+      thumbnail_url = EXCLUDED.thumbnail_url,
+      subscriber_count = EXCLUDED.subscriber_count,
+      video_count = EXCLUDED.video_count,
+      view_count = EXCLUDED.view_count,
+      last_resolved_at = now(),
+      updated_at = now();
+"""
+
+TRACK_CHANNELS_BULK = """
+INSERT INTO core.watchlist_channels(watchlist_id, channel_id)
+SELECT %s, unnest(%s::text[])
+ON CONFLICT DO NOTHING;
+"""
+
+TRACK_CHANNEL = """
+INSERT INTO core.watchlist_channels(watchlist_id, channel_id)
+VALUES (%s, %s)
+ON CONFLICT DO NOTHING;
+"""
+
+UNTRACK_CHANNEL = "DELETE FROM core.watchlist_channels WHERE watchlist_id=%s AND channel_id=%s;"
+
+TRACKED_CHANNELS = """
+SELECT
+  c.channel_id,
+  COALESCE(c.title, '') AS title,
+  COALESCE(c.thumbnail_url, '') AS thumbnail_url,
+  c.subscriber_count,
+  c.video_count AS channel_video_count,
+  ss.last_snapshot_at,
+  COALESCE(ss.videos_count, 0) AS videos_count
+FROM core.watchlist_channels wc
+JOIN core.channels c ON c.channel_id = wc.channel_id
+-- Maintained by the ingest DAG (migrations/008_channel_stats_summary.sql).
+LEFT JOIN core.channel_stats_summary ss ON ss.channel_id = c.channel_id
+WHERE wc.watchlist_id = %s
+ORDER BY COALESCE(c.title, c.channel_id);
+"""
+
+RECENT_ALERTS = """
+SELECT
+  a.sent_at,
+  a.rule_type,
+  a.channel_id,
+  COALESCE(c.title, '') AS channel_title,
+  a.video_id,
+  COALESCE(v.title, '') AS video_title
+FROM core.alerts_sent a
+LEFT JOIN core.channels c ON c.channel_id = a.channel_id
+LEFT JOIN core.videos v ON v.video_id = a.video_id
+ORDER BY a.sent_at DESC
+LIMIT %s;
+"""
+
+
+def channel_row(r, uploads: str) -> tuple:
+    """Parameters for UPSERT_CHANNEL from a youtube.ChannelResult."""
+    return (
+        r.channel_id,
+        r.title,
+        uploads,
+        r.handle,
+        r.thumbnail_url,
+        r.subscriber_count,
+        r.video_count,
+        r.view_count,
+    )
+
+
+def channel_columns(rows: list[tuple]) -> tuple:
+    """Transpose channel_row() tuples into the column arrays UPSERT_CHANNELS_BULK expects."""
+    return tuple(list(col) for col in zip(*rows)) if rows else ([],) * 8
+
+
+# --- JSON API: keyset pages (app/pagination.py). Each query fetches limit + 1 rows. ---------
+
+
+def alerts_page(with_cursor: bool) -> str:
+    # Served by alerts_sent_watchlist_sent_id_idx (migrations/011_api_keyset_indexes.sql).
+    after = "AND (a.sent_at, a.id) < (%s, %s)" if with_cursor else ""
+    return f"""
+SELECT
+  a.id,
+  a.sent_at,
+  a.rule_type,
+  a.channel_id,
+  COALESCE(c.title, '') AS channel_title,
+  a.video_id,
+  COALESCE(v.title, '') AS video_title
+FROM core.alerts_sent a
+LEFT JOIN core.channels c ON c.channel_id = a.channel_id
+LEFT JOIN core.videos v ON v.video_id = a.video_id
+WHERE a.watchlist_id = %s {after}
+ORDER BY a.sent_at DESC, a.id DESC
+LIMIT %s;
+"""
+
+
+def channels_page(with_cursor: bool) -> str:
+    # Walks the core.watchlist_channels primary key (watchlist_id, channel_id).
+    after = "AND wc.channel_id > %s" if with_cursor else ""
+    return f"""
+SELECT
+  c.channel_id,
+  COALESCE(c.title, '') AS title,
+  c.handle,
+  COALESCE(c.thumbnail_url, '') AS thumbnail_url,
+  c.subscriber_count,
+  ss.last_snapshot_at,
+  COALESCE(ss.videos_count, 0) AS videos_count,
+  wc.created_at AS tracked_at
+FROM core.watchlist_channels wc
+JOIN core.channels c ON c.channel_id = wc.channel_id
+LEFT JOIN core.channel_stats_summary ss ON ss.channel_id = c.channel_id
+WHERE wc.watchlist_id = %s {after}
+ORDER BY wc.channel_id
+LIMIT %s;
+"""
+
+
+def video_snapshots_page(with_cursor: bool) -> str:
+    # Same rows as core.video_stats_history (migrations/014_snapshot_last_confirmed.sql), but each
+    # branch is cut to one page on its own index (migrations/019_history_keyset_indexes.sql) before
+    # the merge; ordering the view itself would sort the video's whole history on every page.
+    before = "%s" if with_cursor else "'infinity'"
+    return f"""
+WITH p AS (SELECT %s::text AS video_id, {before}::timestamptz AS before, %s::int AS n)
+SELECT h.pulled_at, h.view_count, h.like_count, h.comment_count, h.resolution
+FROM p
+CROSS JOIN LATERAL (
+  (SELECT s.pulled_at, s.view_count, s.like_count, s.comment_count, 'raw'::text AS resolution
+   FROM core.video_stats_snapshots s
+   WHERE s.video_id = p.video_id AND s.pulled_at < p.before
+     AND s.pulled_at >= core.snapshot_tier_start('raw')
+   ORDER BY s.pulled_at DESC
+   LIMIT p.n)
+  UNION ALL
+  (SELECT s.last_confirmed_at, s.view_count, s.like_count, s.comment_count, 'raw'::text
+   FROM core.video_stats_snapshots s
+   WHERE s.video_id = p.video_id AND s.last_confirmed_at < p.before
+     AND s.pulled_at >= core.snapshot_tier_start('raw')
+   ORDER BY s.last_confirmed_at DESC
+   LIMIT p.n)
+  UNION ALL
+  (SELECT r.last_pulled_at, r.last_views, r.last_likes, r.last_comments, 'hour'::text
+   FROM core.video_stats_hourly r
+   WHERE r.video_id = p.video_id AND r.last_pulled_at < p.before
+     AND r.bucket_start < core.snapshot_tier_start('raw')
+     AND r.bucket_start >= core.snapshot_tier_start('hourly')
+   ORDER BY r.last_pulled_at DESC
+   LIMIT p.n)
+  UNION ALL
+  (SELECT r.last_pulled_at, r.last_views, r.last_likes, r.last_comments, 'day'::text
+   FROM core.video_stats_daily r
+   WHERE r.video_id = p.video_id AND r.last_pulled_at < p.before
+     AND r.bucket_start < core.snapshot_tier_start('hourly')
+   ORDER BY r.last_pulled_at DESC
+   LIMIT p.n)
+) h
+ORDER BY h.pulled_at DESC
+LIMIT (SELECT n FROM p);
+"""
+
+
+# --- View-count series (app/timeseries.py). Buckets are aligned to the Unix epoch. -----------
+# core.video_stats_history stitches raw snapshots with hourly/daily rollups for long ranges.
+
+VIDEO_VIEWS_SERIES = """
+SELECT
+  to_timestamp(floor(extract(epoch FROM s.pulled_at) / %(bucket_s)s) * %(bucket_s)s) AS bucket,
+  max(s.view_count) AS views
+FROM core.video_stats_history s
+WHERE s.video_id = %(id)s
+  AND s.pulled_at >= %(since)s
+GROUP BY 1
+ORDER BY 1;
+"""
+
+# Per video: the latest (max, counts only grow) value in each bucket; then summed per bucket.
+CHANNEL_VIEWS_SERIES = """
+WITH per_video AS (
+  SELECT
+    floor(extract(epoch FROM s.pulled_at) / %(bucket_s)s) AS b,
+    s.video_id,
+    max(s.view_count) AS views
+  FROM core.video_stats_history s
+  JOIN core.videos v ON v.video_id = s.video_id
+  WHERE v.channel_id = %(id)s
+    AND s.pulled_at >= %(since)s
+  GROUP BY 1, 2
+)
+SELECT to_timestamp(b * %(bucket_s)s) AS bucket, sum(views)::bigint AS views
+FROM per_video
+GROUP BY b
+ORDER BY b;
+"""
@@ -0,0 +1,183 @@
+"""
+Token-bucket rate limiting for the web app.
+
+- MemoryTokenBuckets: per-process, O(1) per check, hard-capped number of tracked keys (LRU).
+  A bucket that has refilled completely is indistinguishable from a missing one, so idle
+  keys can be dropped without changing behaviour.
+- RedisTokenBuckets: the same algorithm as one atomic Lua script, shared by all uvicorn
+  workers. Keys expire once their bucket would be full again.
+- RateLimiter: Redis when configured and reachable, the in-memory buckets otherwise.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: float
+    retry_after_s: float
+
+
+class MemoryTokenBuckets:
+    def __init__(
+        self,
+        *,
+        rate_per_s: float,
+        burst: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate_per_s <= 0 or burst < 1 or max_keys < 1:
+            raise ValueError("rate_per_s must be > 0, burst >= 1, max_keys >= 1")
+        self.rate_per_s = float(rate_per_s)
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> (tokens, updated_at); least recently used first.
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def allow(self, key: str, cost: float = 1.0) -> Decision:
+        now = self._clock()
+        with self._lock:
+            state = self._buckets.pop(key, None)
+            if state is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, state[0] + (now - state[1]) * self.rate_per_s)
+
+            if tokens >= cost:
+                tokens -= cost
+                decision = Decision(True, tokens, 0.0)
+            else:
+                decision = Decision(False, tokens, (cost - tokens) / self.rate_per_s)
+
+            if tokens < self.burst:
+                self._buckets[key] = (tokens, now)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+        return decision
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": len(self._buckets), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+# KEYS[1] = bucket key; ARGV = rate_per_s, burst, cost. Uses Redis server time so all workers agree.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+  tokens = burst
+else
+  tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisTokenBuckets:
+    def __init__(self, client, *, rate_per_s: float, burst: float, prefix: str = "ratelimit"):
+        self.client = client
+        self.rate_per_s = float(rate_per_s)
+        self.burst = float(burst)
+        self.prefix = prefix
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    def allow(self, key: str, cost: float = 1.0) -> Decision:
+        allowed, remaining, retry_after = self._script(
+            keys=[f"{self.prefix}:{key}"], args=[self.rate_per_s, self.burst, cost]
+        )
+        return Decision(bool(int(allowed)), float(remaining), float(retry_after))
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "prefix": self.prefix}
+
+
+class RateLimiter:
+    """
+    Shared buckets in Redis with an in-memory fallback. After a Redis error the limiter
+    stays on the fallback for `redis_retry_s` before trying Redis again.
+    """
+
+    def __init__(
+        self,
+        fallback: MemoryTokenBuckets,
+        redis_buckets: Optional[RedisTokenBuckets] = None,
+        *,
+        redis_retry_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.fallback = fallback
+        self.redis_buckets = redis_buckets
+        self.redis_retry_s = redis_retry_s
+        self._clock = clock
+        self._redis_down_until = 0.0
+        self.redis_errors = 0
+
+    def allow(self, key: str, cost: float = 1.0) -> Decision:
+        if self.redis_buckets is not None and self._clock() >= self._redis_down_until:
+            try:
+                return self.redis_buckets.allow(key, cost)
+            except Exception as e:
+                self.redis_errors += 1
+                self._redis_down_until = self._clock() + self.redis_retry_s
+                logger.warning("Rate limiter falling back to memory for %.0fs: %s", self.redis_retry_s, e)
+        return self.fallback.allow(key, cost)
+
+    def stats(self) -> dict:
+        return {
+            "redis": self.redis_buckets.stats() if self.redis_buckets else None,
+            "redis_errors": self.redis_errors,
+            "using_fallback": self.redis_buckets is None or self._clock() < self._redis_down_until,
+            "memory": self.fallback.stats(),
+        }
+
+
+def build_rate_limiter(
+    *,
+    rate_per_s: float,
+    burst: float,
+    redis_url: str = "",
+    prefix: str = "ratelimit",
+    max_keys: int = 100_000,
+) -> RateLimiter:
+    """Redis-backed limiter when redis_url is set and the client library is installed."""
+    fallback = MemoryTokenBuckets(rate_per_s=rate_per_s, burst=burst, max_keys=max_keys)
+    if not redis_url:
+        return RateLimiter(fallback)
+    try:
+        import redis
+    except ImportError:
+        logger.warning("REDIS_URL is set but the redis package is not installed; using in-memory rate limits")
+        return RateLimiter(fallback)
+
+    client = redis.Redis.from_url(redis_url, socket_timeout=0.1, socket_connect_timeout=0.1)
+    return RateLimiter(fallback, RedisTokenBuckets(client, rate_per_s=rate_per_s, burst=burst, prefix=prefix))
@@ -0,0 +1,177 @@
+"""
+Two-level channel resolution for /search and /track:
+
+  L1  bounded in-process LRU with TTL (also remembers "not found" briefly)
+  L2  core.channels rows resolved from YouTube within `db_max_age` (shared by all workers)
+  L3  YouTube Data API; results are written back to core.channels and L1
+
+A search followed by a track of the same channel therefore costs one YouTube call at most.
+"""
+import threading
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from app import queries, youtube
+from app.cache import TTLCache
+
+_MISS = object()
+_NOT_FOUND = object()
+
+
+@dataclass(frozen=True)
+class ResolvedChannel:
+    result: youtube.ChannelResult
+    uploads_playlist_id: Optional[str]
+    source: str  # "memory" | "db" | "youtube"
+
+
+def _norm_handle(handle: str) -> str:
+    return "@" + handle.strip().lstrip("@").lower()
+
+
+def from_row(row) -> ResolvedChannel:
+    channel_id, title, thumbnail_url, handle, subscriber_count, video_count, view_count, uploads = row
+    result = youtube.ChannelResult(
+        channel_id=channel_id,
+        title=title,
+        thumbnail_url=thumbnail_url,
+        handle=handle,
+        subscriber_count=subscriber_count,
+        video_count=video_count,
+        view_count=view_count,
+    )
+    return ResolvedChannel(result=result, uploads_playlist_id=uploads, source="db")
+
+
+def from_item(item: Optional[dict[str, Any]]) -> Optional[ResolvedChannel]:
+    r = youtube.channel_result_from_channels_item(item) if item else None
+    if not r:
+        return None
+    return ResolvedChannel(result=r, uploads_playlist_id=youtube.uploads_playlist_id_from_channels_item(item), source="youtube")
+
+
+class ChannelResolver:
+    def __init__(
+        self,
+        *,
+        max_entries: int = 4096,
+        ttl_s: float = 600.0,
+        negative_ttl_s: float = 60.0,
+        db_max_age: timedelta = timedelta(hours=24),
+    ):
+        self._l1 = TTLCache(max_entries=max_entries, ttl_s=ttl_s)
+        self.negative_ttl_s = negative_ttl_s
+        self.db_max_age = db_max_age
+        self._lock = threading.Lock()
+        self._counts = {"memory": 0, "db": 0, "youtube": 0, "not_found": 0}
+
+    # --- sync (app.main) -------------------------------------------------------------------
+
+    def by_handle(
+        self, yt: youtube.YouTubeClient, handle: str, *, connection: Callable[[], AbstractContextManager]
+    ) -> Optional[ResolvedChannel]:
+        h = _norm_handle(handle)
+        return self._resolve(
+            ("handle", h), queries.RESOLVED_CHANNEL_BY_HANDLE, h, lambda: yt.resolve_channel_by_handle(h[1:]), connection
+        )
+
+    def by_id(
+        self, yt: youtube.YouTubeClient, channel_id: str, *, connection: Callable[[], AbstractContextManager]
+    ) -> Optional[ResolvedChannel]:
+        return self._resolve(
+            ("id", channel_id), queries.RESOLVED_CHANNEL_BY_ID, channel_id, lambda: yt.resolve_channel_by_id(channel_id), connection
+        )
+
+    def _resolve(self, key, sql: str, arg: str, fetch, connection) -> Optional[ResolvedChannel]:
+        hit = self._memory(key)
+        if hit is not _MISS:
+            return hit
+
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (arg, self.db_max_age))
+                row = cur.fetchone()
+        if row:
+            return self._remember(key, from_row(row))
+
+        resolved = from_item(fetch())
+        if resolved is not None:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(queries.UPSERT_CHANNEL, queries.channel_row(resolved.result, resolved.uploads_playlist_id))
+        return self._remember(key, resolved)
+
+    # --- async (app.main_async) ------------------------------------------------------------
+
+    async def aby_handle(
+        self, yt: youtube.AsyncYouTubeClient, handle: str, *, connection: Callable[[], AbstractAsyncContextManager]
+    ) -> Optional[ResolvedChannel]:
+        h = _norm_handle(handle)
+        return await self._aresolve(
+            ("handle", h), queries.RESOLVED_CHANNEL_BY_HANDLE, h, lambda: yt.resolve_channel_by_handle(h[1:]), connection
+        )
+
+    async def aby_id(
+        self, yt: youtube.AsyncYouTubeClient, channel_id: str, *, connection: Callable[[], AbstractAsyncContextManager]
+    ) -> Optional[ResolvedChannel]:
+        return await self._aresolve(
+            ("id", channel_id), queries.RESOLVED_CHANNEL_BY_ID, channel_id, lambda: yt.resolve_channel_by_id(channel_id), connection
+        )
+
+    async def _aresolve(self, key, sql: str, arg: str, fetch, connection) -> Optional[ResolvedChannel]:
+        hit = self._memory(key)
+        if hit is not _MISS:
+            return hit
+
+        async with connection() as conn:
+            cur = await conn.execute(sql, (arg, self.db_max_age))
+            row = await cur.fetchone()
+        if row:
+            return self._remember(key, from_row(row))
+
+        resolved = from_item(await fetch())
+        if resolved is not None:
+            async with connection() as conn:
+                await conn.execute(queries.UPSERT_CHANNEL, queries.channel_row(resolved.result, resolved.uploads_playlist_id))
+        return self._remember(key, resolved)
+
+    # --- L1 ----------------------------------------------------------------------------------
+
+    def _memory(self, key):
+        value = self._l1.get(key, _MISS)
+        if value is _MISS:
+            return _MISS
+        self._count("memory")
+        return None if value is _NOT_FOUND else replace(value, source="memory")
+
+    def _remember(self, key, resolved: Optional[ResolvedChannel]) -> Optional[ResolvedChannel]:
+        if resolved is None:
+            self._count("not_found")
+            self._l1.set(key, _NOT_FOUND, ttl_s=self.negative_ttl_s)
+            return None
+        self._count(resolved.source)
+        # Index under both keys so search-by-handle followed by track-by-id hits memory.
+        self._l1.set(("id", resolved.result.channel_id), resolved)
+        if resolved.result.handle:
+            self._l1.set(("handle", _norm_handle(resolved.result.handle)), resolved)
+        if key[0] == "handle":
+            self._l1.set(key, resolved)
+        return resolved
+
+    def _count(self, source: str) -> None:
+        with self._lock:
+            self._counts[source] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        local = counts["memory"] + counts["db"]
+        return {
+            **counts,
+            "lookups": total,
+            "local_hit_rate": round(local / total, 4) if total else 0.0,
+            "l1_cache": self._l1.stats(),
+        }
@@ -30,9 +30,83 @@ def migrations_dir() -> str:
     return os.getenv("MIGRATIONS_DIR", "/app/migrations")
 
 
+def _getenv_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def _getenv_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def db_pool_min() -> int:
+    return _getenv_int("DB_POOL_MIN", 1)
+
+
+def db_pool_max() -> int:
+    return _getenv_int("DB_POOL_MAX", 10)
+
+
+def db_pool_timeout_s() -> float:
+    return _getenv_float("DB_POOL_TIMEOUT_S", 10.0)
+
+
+def db_pool_health_check_after_s() -> float:
+    return _getenv_float("DB_POOL_HEALTH_CHECK_AFTER_S", 30.0)
+
+
+def cache_ttl_s() -> float:
+    # Upper bound for cached pages/fragments; invalidation normally happens via NOTIFY.
+    return _getenv_float("CACHE_TTL_S", 300.0)
+
+
+def series_cache_ttl_s() -> float:
+    # View-series responses; ingest NOTIFYs also invalidate them via the data version.
+    return _getenv_float("SERIES_CACHE_TTL_S", 300.0)
+
+
+def resolver_cache_max() -> int:
+    return _getenv_int("RESOLVER_CACHE_MAX", 4096)
+
+
+def resolver_cache_ttl_s() -> float:
+    return _getenv_float("RESOLVER_CACHE_TTL_S", 600.0)
+
+
+def resolver_db_max_age_h() -> float:
+    # How old a core.channels row may be before the resolver asks YouTube again.
+    return _getenv_float("RESOLVER_DB_MAX_AGE_H", 24.0)
+
+
+def redis_url() -> str:
+    # Shared rate-limit state across workers; empty means per-process in-memory limits.
+    return os.getenv("REDIS_URL", "")
+
+
+def search_rate_per_s() -> float:
+    return _getenv_float("SEARCH_RATE_PER_S", 1.0)
+
+
+def search_burst() -> float:
+    return _getenv_float("SEARCH_BURST", 3.0)
+
+
+def bulk_import_concurrency() -> int:
+    return _getenv_int("BULK_IMPORT_CONCURRENCY", 4)
+
+
+def bulk_import_max_api_calls() -> int:
+    # YouTube calls (1 quota unit each) a single /track/bulk request may spend.
+    return _getenv_int("BULK_IMPORT_MAX_API_CALLS", 100)
+
+
 def app_port() -> int:
     try:
         return int(os.getenv("APP_PORT", "8001"))
     except ValueError:
         return 8001
-
@@ -0,0 +1,115 @@
+"""
+View-count series for charts.
+
+Postgres buckets snapshots on epoch boundaries (one row per bucket instead of one per 15-minute
+pull), then largest-triangle-three-buckets (LTTB) thins the result to the chart width while
+keeping the visual shape (peaks, steps). Payload size is bounded by `points`, not by history.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+RANGES = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "90d": timedelta(days=90),
+    "365d": timedelta(days=365),
+    "all": None,
+}
+RESOLUTIONS = {"15m": 900, "1h": 3600, "6h": 6 * 3600, "1d": 86400}
+
+DEFAULT_POINTS = 300
+MAX_POINTS = 1000
+# "auto" picks the finest resolution that yields at most this many buckets per output point,
+# so LTTB has real detail to choose from without shipping thousands of rows out of Postgres.
+_AUTO_OVERSAMPLE = 4
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class SeriesSpec:
+    range: str
+    resolution: str
+    bucket_s: int
+    points: int
+
+    def since(self, now: Optional[datetime] = None) -> datetime:
+        span = RANGES[self.range]
+        if span is None:
+            return _EPOCH
+        start = (now or datetime.now(timezone.utc)) - span
+        # Align to a bucket boundary so the first bucket is not a partial one.
+        return datetime.fromtimestamp(start.timestamp() // self.bucket_s * self.bucket_s, tz=timezone.utc)
+
+    def params(self, key_id: str, now: Optional[datetime] = None) -> dict:
+        return {"id": key_id, "bucket_s": self.bucket_s, "since": self.since(now)}
+
+
+def series_spec(range_: str, resolution: str = "auto", points: int = DEFAULT_POINTS) -> SeriesSpec:
+    """Validate request parameters; raises ValueError with a user-facing message."""
+    if range_ not in RANGES:
+        raise ValueError(f"range must be one of {', '.join(RANGES)}")
+    if resolution != "auto" and resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be auto or one of {', '.join(RESOLUTIONS)}")
+    points = max(3, min(int(points), MAX_POINTS))
+
+    if resolution == "auto":
+        span = RANGES[range_]
+        resolution = "1d"
+        if span is not None:
+            for name, seconds in RESOLUTIONS.items():
+                if span.total_seconds() / seconds <= points * _AUTO_OVERSAMPLE:
+                    resolution = name
+                    break
+    return SeriesSpec(range=range_, resolution=resolution, bucket_s=RESOLUTIONS[resolution], points=points)
+
+
+def lttb(points: Sequence[tuple[float, float]], threshold: int) -> list[tuple[float, float]]:
+    """
+    Largest-Triangle-Three-Buckets downsampling (Steinarsson, 2013). `points` must be sorted by x.
+    Keeps the first and last point and, per bucket, the point forming the largest triangle with
+    the previously kept point and the average of the next bucket.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        nxt = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in nxt) / len(nxt)
+        avg_y = sum(p[1] for p in nxt) / len(nxt)
+
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def series_payload(rows: Sequence[tuple], spec: SeriesSpec) -> dict:
+    """Rows are (bucket timestamptz, views) from queries.VIDEO_VIEWS_SERIES / CHANNEL_VIEWS_SERIES."""
+    raw = [(ts.timestamp(), float(views)) for ts, views in rows if ts is not None and views is not None]
+    kept = lttb(raw, spec.points)
+    return {
+        "range": spec.range,
+        "resolution": spec.resolution,
+        "bucket_s": spec.bucket_s,
+        "buckets": len(raw),
+        "points": [[datetime.fromtimestamp(x, tz=timezone.utc).isoformat(), int(y)] for x, y in kept],
+    }
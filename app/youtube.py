@@ -1,9 +1,11 @@
+import asyncio
 import logging
 import re
 import time
 from dataclasses import dataclass
 from typing import Any, Optional
 
+import httpx
 import requests
 
 logger = logging.getLogger(__name__)
@@ -13,6 +15,12 @@ _CHANNEL_ID_RE = re.compile(r"^(UC[a-zA-Z0-9_-]{20,})$")
 _CHANNEL_URL_RE = re.compile(r"/channel/(UC[a-zA-Z0-9_-]{20,})")
 _HANDLE_RE = re.compile(r"(?:^|/|\\s)@([A-Za-z0-9_.-]{3,})")
 
+_API_BASE = "https://youtube.googleapis.com/youtube/v3"
+_RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+_CHANNEL_PARTS = [("part", "contentDetails"), ("part", "snippet"), ("part", "statistics")]
+# channels.list accepts up to 50 comma-separated ids per call (1 quota unit either way).
+MAX_IDS_PER_CALL = 50
+
 
 @dataclass(frozen=True)
 class ChannelResult:
@@ -88,6 +96,17 @@ class YouTubeClient:
         items = data.get("items") or []
         return items[0] if items else None
 
+    def resolve_channels_by_ids(self, channel_ids: list[str]) -> list[dict[str, Any]]:
+        if len(channel_ids) > MAX_IDS_PER_CALL:
+            raise ValueError(f"at most {MAX_IDS_PER_CALL} channel ids per call")
+        url = (
+            "https://youtube.googleapis.com/youtube/v3/channels"
+            f"?part=contentDetails&part=snippet&part=statistics&maxResults={MAX_IDS_PER_CALL}"
+            f"&id={','.join(channel_ids)}&key={self.api_key}"
+        )
+        data = self._get(url)
+        return data.get("items") or []
+
     def search_channels(self, query: str, *, limit: int = 10) -> list[dict[str, Any]]:
         params = {
             "part": "snippet",
@@ -104,6 +123,65 @@ class YouTubeClient:
         return data.get("items") or []
 
 
+class AsyncYouTubeClient:
+    """
+    Async twin of YouTubeClient (httpx) for app.main_async. Pass a shared httpx.AsyncClient so
+    connections are pooled across requests; otherwise one is created and owned by this instance.
+    """
+
+    def __init__(self, api_key: str, *, timeout: float = 20, client: Optional[httpx.AsyncClient] = None):
+        self.api_key = api_key
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(timeout=timeout)
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def _get(self, path: str, params: list[tuple[str, str]], *, retries: int = 3, backoff_s: float = 0.8) -> dict[str, Any]:
+        last_exc: Optional[Exception] = None
+        params = params + [("key", self.api_key)]
+        for attempt in range(1, retries + 1):
+            try:
+                resp = await self._client.get(f"{_API_BASE}/{path}", params=params)
+                if resp.status_code in _RETRYABLE_STATUS:
+                    raise httpx.HTTPStatusError(
+                        f"retryable status {resp.status_code}: {resp.text[:300]}", request=resp.request, response=resp
+                    )
+                resp.raise_for_status()
+                return resp.json()
+            except Exception as e:
+                last_exc = e
+                await asyncio.sleep(backoff_s * (2 ** (attempt - 1)))
+        raise last_exc  # type: ignore[misc]
+
+    async def resolve_channel_by_id(self, channel_id: str) -> Optional[dict[str, Any]]:
+        data = await self._get("channels", _CHANNEL_PARTS + [("id", channel_id)])
+        items = data.get("items") or []
+        return items[0] if items else None
+
+    async def resolve_channel_by_handle(self, handle: str) -> Optional[dict[str, Any]]:
+        data = await self._get("channels", _CHANNEL_PARTS + [("forHandle", handle)])
+        items = data.get("items") or []
+        return items[0] if items else None
+
+    async def resolve_channels_by_ids(self, channel_ids: list[str]) -> list[dict[str, Any]]:
+        if len(channel_ids) > MAX_IDS_PER_CALL:
+            raise ValueError(f"at most {MAX_IDS_PER_CALL} channel ids per call")
+        data = await self._get(
+            "channels", _CHANNEL_PARTS + [("maxResults", str(MAX_IDS_PER_CALL)), ("id", ",".join(channel_ids))]
+        )
+        return data.get("items") or []
+
+    async def search_channels(self, query: str, *, limit: int = 10) -> list[dict[str, Any]]:
+        data = await self._get(
+            "search",
+            [("part", "snippet"), ("type", "channel"), ("maxResults", str(limit)), ("q", query)],
+            retries=1,
+        )
+        return data.get("items") or []
+
+
 def channel_result_from_channels_item(item: dict[str, Any]) -> Optional[ChannelResult]:
     snippet = item.get("snippet") or {}
     channel_id = item.get("id")
@@ -3,18 +3,23 @@ from dataclasses import dataclass
 from dataclasses import replace as dc_replace
 from datetime import datetime, timedelta, timezone
 from statistics import median
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+import numpy as np
 import pendulum
 from airflow import DAG
 from airflow.decorators import task
 from airflow.models import Variable
+from airflow.operators.python import get_current_context
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 
-from ytb_elt.db.migrate import apply_sql_migrations, migrations_dir_default
-from ytb_elt.logic.alerts import default_rules_for, should_trigger_velocity_spike
-from ytb_elt.logic.metrics import compute_views_per_hour
-from ytb_elt.notify.discord import send_discord_webhook
+from ytb_elt.db.events import notify_data_changed
+from ytb_elt.db.rules import load_alert_rule
+from ytb_elt.logic.metrics import latest_observations
+from ytb_elt.logic.scoring import latest_views_per_hour, velocity_spike_mask
+from ytb_elt.notify.dispatcher import NotificationDispatcher
+from ytb_elt.notify.message import Notification
+from ytb_elt.notify.outbox import deliver_outbox, record_alert
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +81,7 @@ def _rule_with_overrides(cur, watchlist_id: str, video_type: str):
       ALERTS_LONG_MAX_AGE_HOURS=9999
     (short variants use ALERTS_SHORT_*)
     """
-    rule = _rule_from_db_or_default(cur=cur, watchlist_id=watchlist_id, video_type=video_type)
+    rule = load_alert_rule(cur, watchlist_id=watchlist_id, video_type=video_type)
     prefix = "ALERTS_SHORT_" if video_type == "short" else "ALERTS_LONG_"
 
     abs_floor_vph = _var_float(prefix + "ABS_FLOOR_VPH")
@@ -97,58 +102,65 @@ def _rule_with_overrides(cur, watchlist_id: str, video_type: str):
     return rule
 
 
-def _rule_from_db_or_default(*, cur, watchlist_id: str, video_type: str):
+def _ingest_run_id_from_conf() -> Optional[str]:
     """
-    Load per-watchlist alert rules from Postgres if present (core.alert_rules),
-    else fallback to code defaults.
+    The ingest DAG triggers us with conf={"ingest_run_id": ...}. Manual triggers without it
+    (or with {"full_scan": true}) fall back to scanning every tracked channel.
     """
-    rule = default_rules_for(video_type, watchlist_id)
-    try:
-        cur.execute(
-            """
-            SELECT baseline_window_videos, baseline_hours, multiplier, abs_floor_vph,
-                   min_age_minutes, max_age_hours, daily_cap_per_channel
-            FROM core.alert_rules
-            WHERE watchlist_id=%s AND video_type=%s;
-            """,
-            (watchlist_id, video_type),
-        )
-        row = cur.fetchone()
-        if not row:
-            return rule
-        (baseline_window_videos, baseline_hours, multiplier, abs_floor_vph, min_age_minutes, max_age_hours, daily_cap_per_channel) = row
-        return dc_replace(
-            rule,
-            baseline_window_videos=int(baseline_window_videos),
-            baseline_hours=float(baseline_hours),
-            multiplier=float(multiplier),
-            abs_floor_vph=float(abs_floor_vph),
-            min_age_minutes=int(min_age_minutes),
-            max_age_hours=float(max_age_hours),
-            daily_cap_per_channel=int(daily_cap_per_channel),
-        )
-    except Exception:
-        # If the table doesn't exist yet (or any other issue), keep defaults.
-        return rule
+    dag_run = get_current_context().get("dag_run")
+    conf = (dag_run.conf if dag_run else None) or {}
+    if conf.get("full_scan"):
+        return None
+    return conf.get("ingest_run_id") or None
 
 
-@task
-def compute_and_send_alerts() -> int:
+def _load_ingest_scope(cur, ingest_run_id: str) -> Dict[str, Set[str]]:
     """
-    Compute velocity spikes from the last two snapshots per video and send Discord alerts.
-    Returns number of alerts sent (deduped by core.alerts_sent).
+    Returns mapping: channel_id -> video_ids that received a new snapshot in the given ingest run.
     """
-    # Ensure migrations applied so optional columns exist (e.g. discord_webhook_url).
-    apply_sql_migrations(postgres_conn_id=POSTGRES_CONN_ID, migrations_dir=migrations_dir_default())
+    cur.execute(
+        "SELECT channel_id, video_id FROM core.ingest_run_videos WHERE run_id=%s;",
+        (ingest_run_id,),
+    )
+    scope: Dict[str, Set[str]] = {}
+    for channel_id, video_id in cur.fetchall():
+        scope.setdefault(channel_id, set()).add(video_id)
+    return scope
+
 
+@task
+def detect_alerts() -> int:
+    """
+    Compute velocity spikes from the last two snapshots per video and queue Discord alerts
+    in core.alert_outbox (delivered by deliver_alert_outbox, so webhook latency never slows detection).
+    When triggered by an ingest run, only the videos that run snapshotted are evaluated.
+    Returns number of alerts queued (deduped by core.alerts_sent).
+    """
     default_webhook = Variable.get("DISCORD_WEBHOOK_URL", default_var="")
     now = datetime.now(timezone.utc)
 
-    sent = 0
+    detected = 0
+    alerted_watchlists: Set[str] = set()
+    ingest_run_id = _ingest_run_id_from_conf()
 
     with _pg().get_conn() as conn:
         conn.autocommit = True
         with conn.cursor() as cur:
+            # None means full scan.
+            scope: Optional[Dict[str, Set[str]]] = None
+            if ingest_run_id:
+                scope = _load_ingest_scope(cur, ingest_run_id)
+                logger.info(
+                    "Alerts scoped to ingest run_id=%s: channels=%d videos=%d",
+                    ingest_run_id,
+                    len(scope),
+                    sum(len(v) for v in scope.values()),
+                )
+                if not scope:
+                    return 0
+            else:
+                logger.info("Alerts full scan (no ingest_run_id in conf)")
+
             cur.execute(
                 """
                 SELECT watchlist_id, COALESCE(discord_webhook_url, ''), enabled, video_types
@@ -175,8 +187,11 @@ def compute_and_send_alerts() -> int:
                     (watchlist_id,),
                 )
                 channels = cur.fetchall()
+                if scope is not None:
+                    channels = [(cid, ctitle) for (cid, ctitle) in channels if cid in scope]
 
                 for channel_id, channel_title in channels:
+                    fresh_video_ids = scope.get(channel_id) if scope is not None else None
                     for video_type in (video_types or []):
                         rule = _rule_with_overrides(cur, watchlist_id, video_type)
 
@@ -221,23 +236,42 @@ def compute_and_send_alerts() -> int:
                             rule.max_age_hours,
                         )
 
+                        video_ids = [video_id for (video_id, _title, _published_at) in vids]
+                        vph_by_video = _latest_vph_by_video(cur, video_ids)
+
                         # Baseline: median VPH among "early" videos (<= baseline_hours), using current VPH per video.
                         baseline_samples: List[float] = []
                         for video_id, _title, published_at in vids[: rule.baseline_window_videos]:
                             age_hours = (now - published_at).total_seconds() / 3600.0
                             if age_hours > rule.baseline_hours:
                                 continue
-                            vph = _latest_vph(cur, video_id)
+                            vph = vph_by_video.get(video_id)
                             if vph is not None and vph >= 0:
                                 baseline_samples.append(vph)
                         baseline_vph = median(baseline_samples) if baseline_samples else (1000.0 if video_type == "long" else 2000.0)
 
-                        for video_id, video_title, published_at in vids:
-                            age_minutes = (now - published_at).total_seconds() / 60.0
-                            age_hours = age_minutes / 60.0
-                            vph = _latest_vph(cur, video_id)
-                            if vph is None:
-                                continue
+                        # Baseline above still uses the whole window; only fresh videos can spike.
+                        candidates = [
+                            (video_id, video_title, published_at)
+                            for (video_id, video_title, published_at) in vids
+                            if video_id in vph_by_video and (fresh_video_ids is None or video_id in fresh_video_ids)
+                        ]
+                        if not candidates:
+                            continue
+
+                        age_minutes = np.array([(now - published_at).total_seconds() / 60.0 for (_v, _t, published_at) in candidates])
+                        vphs = np.array([vph_by_video[video_id] for (video_id, _t, _p) in candidates])
+                        triggered = velocity_spike_mask(
+                            video_age_minutes=age_minutes,
+                            video_age_hours=age_minutes / 60.0,
+                            vph=vphs,
+                            baseline_vph=baseline_vph,
+                            rule=rule,
+                        )
+
+                        for idx in np.flatnonzero(triggered):
+                            video_id, video_title, published_at = candidates[idx]
+                            vph = float(vphs[idx])
 
                             # Current views from newest snapshot.
                             cur.execute(
@@ -252,66 +286,113 @@ def compute_and_send_alerts() -> int:
                             )
                             views_now = cur.fetchone()[0] or 0
 
-                            if not should_trigger_velocity_spike(
-                                video_age_minutes=age_minutes,
-                                video_age_hours=age_hours,
-                                vph=vph,
-                                baseline_vph=baseline_vph,
-                                rule=rule,
-                            ):
-                                continue
-
-                            # Dedup at DB level.
-                            cur.execute(
-                                """
-                                INSERT INTO core.alerts_sent(watchlist_id, channel_id, video_id, rule_type, sent_at)
-                                VALUES (%s, %s, %s, %s, now())
-                                ON CONFLICT (watchlist_id, video_id, rule_type) DO NOTHING;
-                                """,
-                                (watchlist_id, channel_id, video_id, "velocity_spike"),
+                            # Dedup at DB level; the outbox row is written in the same statement.
+                            queued = record_alert(
+                                cur,
+                                watchlist_id=watchlist_id,
+                                channel_id=channel_id,
+                                video_id=video_id,
+                                rule_type="velocity_spike",
+                                kind="discord",
+                                webhook_url=webhook,
+                                notification=_spike_notification(
+                                    channel_title=channel_title,
+                                    video_id=video_id,
+                                    video_title=video_title,
+                                    video_type=video_type,
+                                    published_at=published_at,
+                                    views_now=views_now,
+                                    vph=vph,
+                                    baseline_vph=baseline_vph,
+                                    multiplier=rule.multiplier,
+                                ),
                             )
-                            if cur.rowcount != 1:
-                                continue
+                            if queued:
+                                detected += 1
+                                alerted_watchlists.add(watchlist_id)
 
-                            text = f"[Spike] {channel_title}: {video_title}"
-                            body = (
-                                f"*{text}*\n"
-                                f"Video: {_video_url(video_id)}\n"
-                                f"Type: {video_type}\n"
-                                f"Published: {published_at.isoformat()}\n"
-                                f"Views: {views_now:,}\n"
-                                f"Views/hour (est): {vph:,.0f}\n"
-                                f"Baseline: {baseline_vph:,.0f} (x{rule.multiplier})\n"
-                            )
-                            send_discord_webhook(webhook_url=webhook, content=body)
-                            sent += 1
+            for watchlist_id in sorted(alerted_watchlists):
+                notify_data_changed(cur, watchlist_id)
+
+    return detected
 
-    return sent
 
+@task(trigger_rule="all_done")
+def deliver_alert_outbox() -> Dict[str, int]:
+    """
+    Drain core.alert_outbox: coalesced, concurrent webhook delivery with retries.
+    Runs even if detection failed so earlier pending/retrying rows still go out.
+    """
+    with NotificationDispatcher() as dispatcher:
+        with _pg().get_conn() as conn:
+            return deliver_outbox(conn, dispatcher=dispatcher)
+
+
+def _spike_notification(
+    *,
+    channel_title: str,
+    video_id: str,
+    video_title: str,
+    video_type: str,
+    published_at: datetime,
+    views_now: int,
+    vph: float,
+    baseline_vph: float,
+    multiplier: float,
+) -> Notification:
+    return Notification(
+        title=f"[Spike] {channel_title}: {video_title}",
+        url=_video_url(video_id),
+        fields=(
+            ("Type", video_type),
+            ("Published", published_at.isoformat()),
+            ("Views", f"{views_now:,}"),
+            ("Views/hour (est)", f"{vph:,.0f}"),
+            ("Baseline", f"{baseline_vph:,.0f} (x{multiplier})"),
+        ),
+    )
 
-def _latest_vph(cur, video_id: str) -> Optional[float]:
+
+def _latest_vph_by_video(cur, video_ids: List[str]) -> Dict[str, float]:
+    """
+    VPH from the last two non-null snapshots of each video, fetched in a single round trip.
+    Rows written in change-only mode carry last_confirmed_at; see latest_observations.
+    Videos without an observation pair, a non-positive time delta or a negative views delta
+    are omitted.
+    """
+    if not video_ids:
+        return {}
     cur.execute(
         """
-        SELECT pulled_at, view_count
-        FROM core.video_stats_snapshots
-        WHERE video_id=%s AND view_count IS NOT NULL
-        ORDER BY pulled_at DESC
-        LIMIT 2;
+        SELECT v.video_id, s.pulled_at, s.last_confirmed_at, s.view_count
+        FROM unnest(%s::text[]) AS v(video_id)
+        CROSS JOIN LATERAL (
+          SELECT pulled_at, last_confirmed_at, view_count
+          FROM core.video_stats_snapshots
+          WHERE video_id = v.video_id AND view_count IS NOT NULL
+          ORDER BY pulled_at DESC
+          LIMIT 2
+        ) s
+        ORDER BY v.video_id, s.pulled_at DESC;
         """,
-        (video_id,),
+        (list(video_ids),),
     )
-    rows = cur.fetchall()
-    if len(rows) < 2:
-        return None
-    (t1, v1), (t0, v0) = rows[0], rows[1]
-    delta_views = int(v1) - int(v0)
-    delta_seconds = (t1 - t0).total_seconds()
-    if delta_views < 0:
-        return None
-    try:
-        return compute_views_per_hour(delta_views, delta_seconds)
-    except ValueError:
-        return None
+    latest: Dict[str, List[Tuple[datetime, Optional[datetime], int]]] = {}
+    for video_id, pulled_at, confirmed_at, view_count in cur.fetchall():
+        latest.setdefault(video_id, []).append((pulled_at, confirmed_at, int(view_count)))
+
+    pairs = []
+    for video_id, rows in latest.items():
+        pair = latest_observations(rows)
+        if pair is not None:
+            pairs.append((video_id, pair[0], pair[1]))
+    if not pairs:
+        return {}
+    delta_views = np.array([v1 - v0 for (_vid, (_t1, v1), (_t0, v0)) in pairs], dtype=np.float64)
+    delta_seconds = np.array([(t1 - t0).total_seconds() for (_vid, (t1, _v1), (t0, _v0)) in pairs])
+    vph = latest_views_per_hour(delta_views, delta_seconds)
+
+    return {video_id: float(vph[i]) for i, (video_id, _new, _old) in enumerate(pairs) if not np.isnan(vph[i])}
 
 
 default_args = {
@@ -319,8 +400,6 @@ default_args = {
     "depends_on_past": False,
     "retries": 1,
     "retry_delay": timedelta(minutes=2),
-    "max_active_runs": 1,
-    "dagrun_timeout": timedelta(minutes=10),
     "start_date": datetime(2026, 1, 1, tzinfo=LOCAL_TZ),
 }
 
@@ -330,6 +409,8 @@ with DAG(
     default_args=default_args,
     schedule=None,  # triggered by ingest DAG
     catchup=False,
+    max_active_runs=1,
+    dagrun_timeout=timedelta(minutes=10),
     description="Compute velocity spike alerts from snapshots and send Discord notifications",
 ) as dag:
-    compute_and_send_alerts()
+    detect_alerts() >> deliver_alert_outbox()
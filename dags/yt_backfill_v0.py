@@ -0,0 +1,253 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pendulum
+
+from airflow import DAG
+from airflow.decorators import task
+from airflow.models import Variable
+from airflow.operators.python import get_current_context
+
+from ytb_elt.db.backfill import (
+    VideoRow,
+    backfill_cursor,
+    bulk_load_videos,
+    pending_backfills,
+    request_backfills,
+    save_backfill_progress,
+)
+from ytb_elt.db.channel_summary import refresh_channel_summary
+from ytb_elt.db.events import notify_data_changed
+from ytb_elt.db.partitions import ensure_snapshot_partitions
+from ytb_elt.db.quota import refund_quota, reserve_quota
+from ytb_elt.logic.duration import classify_video_type, parse_youtube_duration_to_seconds
+from ytb_elt.youtube.client import YouTubeClient
+
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TZ = pendulum.timezone("UTC")
+
+POSTGRES_CONN_ID = "postgres_db_yt_elt"
+
+# core.api_quota_usage consumer name.
+QUOTA_CONSUMER = "backfill"
+# Default for the BACKFILL_DAILY_QUOTA Airflow Variable: API units per quota day the backfill may
+# spend. Keep it below the project's daily quota minus what the 15-minute ingest uses.
+BACKFILL_DAILY_QUOTA = 3000
+# Unfinished backfills worked on per run (one mapped task each).
+BACKFILL_CHANNELS_PER_RUN = 8
+# Playlist pages (50 videos, 2 API units: playlistItems + videos.list) loaded per COPY and
+# checkpoint; a failure loses at most this much work.
+PAGES_PER_CHUNK = 20
+# Concurrent videos.list requests per channel while the playlist is being paged.
+FETCH_WORKERS = 4
+
+
+def _pg() -> PostgresHook:
+    return PostgresHook(postgres_conn_id=POSTGRES_CONN_ID)
+
+
+def _to_int(v) -> Optional[int]:
+    return int(v) if v is not None else None
+
+
+def _daily_quota() -> int:
+    raw = Variable.get("BACKFILL_DAILY_QUOTA", default_var="")
+    if raw in (None, ""):
+        return BACKFILL_DAILY_QUOTA
+    try:
+        return max(int(float(raw)), 0)
+    except Exception:
+        logger.warning("Invalid int Airflow Variable BACKFILL_DAILY_QUOTA=%r (using %d)", raw, BACKFILL_DAILY_QUOTA)
+        return BACKFILL_DAILY_QUOTA
+
+
+def _video_rows(items: List[Dict[str, Any]], channel_id: str) -> List[VideoRow]:
+    rows: List[VideoRow] = []
+    for item in items:
+        video_id = item.get("id")
+        snippet = item.get("snippet") or {}
+        content = item.get("contentDetails") or {}
+        stats = item.get("statistics") or {}
+
+        title = snippet.get("title") or ""
+        published_at = snippet.get("publishedAt")
+        duration = content.get("duration")
+        if not (video_id and published_at and duration and title):
+            continue
+
+        duration_seconds = parse_youtube_duration_to_seconds(duration)
+        rows.append(
+            (
+                video_id,
+                channel_id,
+                title,
+                published_at,
+                duration_seconds,
+                classify_video_type(duration_seconds),
+                _to_int(stats.get("viewCount")),
+                _to_int(stats.get("likeCount")),
+                _to_int(stats.get("commentCount")),
+            )
+        )
+    return rows
+
+
+@task
+def queue_backfills() -> List[str]:
+    """
+    Queue the channels in conf {"channel_ids": [...], "restart": false} (channels must already be
+    in core.channels), then return the unfinished backfills this run works on.
+    """
+    dag_run = get_current_context().get("dag_run")
+    conf = (dag_run.conf if dag_run else None) or {}
+    requested = [c for c in (conf.get("channel_ids") or []) if c]
+
+    with _pg().get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            if requested:
+                cur.execute("SELECT channel_id FROM core.channels WHERE channel_id = ANY(%s);", (requested,))
+                unknown = sorted(set(requested) - {r[0] for r in cur.fetchall()})
+                if unknown:
+                    logger.warning("Not in core.channels (bootstrap or ingest them first): %s", unknown)
+            queued = request_backfills(cur, requested, restart=bool(conf.get("restart")))
+            pending = pending_backfills(cur, limit=BACKFILL_CHANNELS_PER_RUN)
+
+    logger.info("Queued %d backfill(s); working on %d this run", len(queued), len(pending))
+    return pending
+
+
+@task(max_active_tis_per_dagrun=2)
+def backfill_channel(channel_id: str) -> Dict[str, Any]:
+    """
+    Walk one channel's uploads playlist from its saved cursor, PAGES_PER_CHUNK pages at a time:
+    page through playlistItems while videos.list calls for the pages already seen run in a
+    thread pool, then COPY the chunk into core.videos (plus a baseline snapshot for videos
+    without history) and save the cursor in the same transaction. Each chunk first reserves
+    its API units from the BACKFILL_DAILY_QUOTA budget; when none are left the task stops and
+    the next run resumes from the cursor.
+    """
+    daily_quota = _daily_quota()
+    yt = YouTubeClient(Variable.get("YOUTUBE_API_KEY"))
+    pulled_at = datetime.now(tz=LOCAL_TZ).replace(second=0, microsecond=0)
+
+    pages_loaded = videos_loaded = snapshots_inserted = 0
+    completed = throttled = False
+    with _pg().get_conn() as conn:
+        with conn.cursor() as cur:
+            ensure_snapshot_partitions(cur)
+            state = backfill_cursor(cur, channel_id)
+            conn.commit()
+            if state is None:
+                return {"channel_id": channel_id, "skipped": "not pending"}
+            uploads, page_token, pages_done = state
+            if not uploads:
+                logger.warning("Missing uploads_playlist_id for channel_id=%s (run ingest first)", channel_id)
+                return {"channel_id": channel_id, "skipped": "no uploads playlist"}
+
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                while not completed:
+                    # Committed right away so concurrent tasks see the reservation.
+                    quota_day, granted = reserve_quota(
+                        cur, consumer=QUOTA_CONSUMER, units=2 * PAGES_PER_CHUNK, daily_limit=daily_quota
+                    )
+                    conn.commit()
+                    if granted < 2:
+                        refund_quota(cur, consumer=QUOTA_CONSUMER, quota_day=quota_day, units=granted)
+                        conn.commit()
+                        throttled = True
+                        break
+
+                    spent = 0
+                    pages = 0
+                    futures = []
+                    settled = False
+                    try:
+                        # Units count as spent once a call is issued: YouTube may charge for a
+                        # request that then fails on our side, and that unit must not be refunded.
+                        while spent + 2 <= granted:
+                            spent += 1
+                            page, page_token = yt.list_upload_video_ids_page(uploads, page_token=page_token)
+                            pages += 1
+                            if page:
+                                spent += 1
+                                futures.append(pool.submit(yt.get_videos, [v for (v, _published_at) in page]))
+                            if not page_token:
+                                completed = True
+                                break
+
+                        rows = [row for f in futures for row in _video_rows(f.result(), channel_id)]
+                        _written, snapshots = bulk_load_videos(cur, rows, pulled_at=pulled_at)
+                        save_backfill_progress(cur, channel_id, page_token=page_token, pages=pages, videos=len(rows))
+                        refund_quota(cur, consumer=QUOTA_CONSUMER, quota_day=quota_day, units=granted - spent)
+                        conn.commit()
+                        settled = True
+                    finally:
+                        if not settled:
+                            # The chunk failed after its reservation was committed: give the unspent
+                            # units back in their own transaction before the error propagates.
+                            conn.rollback()
+                            refund_quota(cur, consumer=QUOTA_CONSUMER, quota_day=quota_day, units=granted - spent)
+                            conn.commit()
+
+                    pages_loaded += pages
+                    videos_loaded += len(rows)
+                    snapshots_inserted += snapshots
+                    logger.info(
+                        "Backfill %s: page %d, %d videos loaded so far", channel_id, pages_done + pages_loaded, videos_loaded
+                    )
+
+            if videos_loaded:
+                refresh_channel_summary(
+                    cur,
+                    channel_id=channel_id,
+                    pulled_at=pulled_at if snapshots_inserted else None,
+                    views_total=None,
+                    likes_total=None,
+                    comments_total=None,
+                )
+                # Web app caches key off this (see app/notify_listener.py).
+                notify_data_changed(cur)
+                conn.commit()
+
+    if throttled:
+        logger.info("Backfill %s paused: BACKFILL_DAILY_QUOTA (%d units) spent for today", channel_id, daily_quota)
+    return {
+        "channel_id": channel_id,
+        "pages": pages_loaded,
+        "videos": videos_loaded,
+        "snapshots": snapshots_inserted,
+        "completed": completed,
+        "throttled": throttled,
+    }
+
+
+default_args = {
+    "owner": "dataengineers",
+    "depends_on_past": False,
+    "retries": 2,
+    "retry_delay": timedelta(minutes=5),
+    "start_date": datetime(2026, 1, 1, tzinfo=LOCAL_TZ),
+}
+
+
+with DAG(
+    dag_id="backfill_channel_history",
+    default_args=default_args,
+    # Hourly runs pick up where throttled or failed backfills stopped; trigger manually with
+    # conf {"channel_ids": [...]} to queue channels.
+    schedule="20 * * * *",
+    catchup=False,
+    max_active_runs=1,
+    dagrun_timeout=timedelta(minutes=50),
+    description="Backfill the full uploads history of queued channels into core.videos, within a daily API quota",
+) as dag:
+    t_queue = queue_backfills()
+    t_backfill = backfill_channel.expand(channel_id=t_queue)
+
+    t_queue >> t_backfill
@@ -107,8 +107,6 @@ default_args = {
     "owner": "dataengineers",
     "depends_on_past": False,
     "retries": 0,
-    "max_active_runs": 1,
-    "dagrun_timeout": timedelta(minutes=10),
     "start_date": datetime(2026, 1, 1, tzinfo=LOCAL_TZ),
 }
 
@@ -118,6 +116,8 @@ with DAG(
     default_args=default_args,
     schedule=None,  # manual only
     catchup=False,
+    max_active_runs=1,
+    dagrun_timeout=timedelta(minutes=10),
     description="Manual/dev-only: import channel_ids from config/watchlists.yml into DB without deleting anything",
 ) as dag:
     t_mig = migrate_db()
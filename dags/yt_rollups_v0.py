@@ -0,0 +1,135 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import pendulum
+
+from airflow import DAG
+from airflow.decorators import task
+from airflow.models import Variable
+
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+from ytb_elt.db.rollups import prune_hourly_rollups, prune_raw_snapshots, rollup_daily, rollup_hourly
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TZ = pendulum.timezone("UTC")
+POSTGRES_CONN_ID = "postgres_db_yt_elt"
+
+# Defaults for the RAW_SNAPSHOT_HORIZON_DAYS / HOURLY_ROLLUP_HORIZON_DAYS Airflow Variables.
+RAW_SNAPSHOT_HORIZON_DAYS = 30
+HOURLY_ROLLUP_HORIZON_DAYS = 365
+
+
+def _pg() -> PostgresHook:
+    return PostgresHook(postgres_conn_id=POSTGRES_CONN_ID)
+
+
+def _var_days(name: str, default: int) -> timedelta:
+    raw = Variable.get(name, default_var="")
+    try:
+        days = int(float(raw)) if raw not in (None, "") else default
+    except Exception:
+        logger.warning("Invalid int Airflow Variable %s=%r (using %d)", name, raw, default)
+        days = default
+    return timedelta(days=max(days, 1))
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return ts.isoformat() if ts else None
+
+
+def _archive_dir() -> str:
+    return (Variable.get("SNAPSHOT_ARCHIVE_DIR", default_var="") or "").strip()
+
+
+@task
+def rollup_hourly_stats() -> Dict[str, object]:
+    # One transaction: rows and watermark move together.
+    with _pg().get_conn() as conn:
+        with conn.cursor() as cur:
+            through, rows = rollup_hourly(cur, now=datetime.now(tz=LOCAL_TZ))
+    logger.info("Hourly rollup through %s (%d rows)", through, rows)
+    return {"rolled_through": _iso(through), "rows": rows}
+
+
+@task
+def rollup_daily_stats() -> Dict[str, object]:
+    with _pg().get_conn() as conn:
+        with conn.cursor() as cur:
+            through, rows = rollup_daily(cur)
+    logger.info("Daily rollup through %s (%d rows)", through, rows)
+    return {"rolled_through": _iso(through), "rows": rows}
+
+
+@task
+def archive_cold_stats() -> Dict[str, object]:
+    """
+    Export cold days of raw snapshots to Parquet under the SNAPSHOT_ARCHIVE_DIR Variable
+    (ytb_elt.archive.export). Disabled when the Variable is empty.
+    """
+    root = _archive_dir()
+    if not root:
+        return {"enabled": False}
+    from ytb_elt.archive.export import export_cold_days
+
+    with _pg().get_conn() as conn:
+        archived_through, days = export_cold_days(conn, root, now=datetime.now(tz=LOCAL_TZ))
+    logger.info("Archive covers raw snapshots before %s (%d days exported)", archived_through, len(days))
+    return {"enabled": True, "archived_through": _iso(archived_through), "days": [d.isoformat() for d in days]}
+
+
+@task
+def prune_raw_stats(archive: Dict[str, object]) -> Dict[str, object]:
+    horizon = _var_days("RAW_SNAPSHOT_HORIZON_DAYS", RAW_SNAPSHOT_HORIZON_DAYS)
+    keep_from: Optional[datetime] = None
+    if archive.get("enabled"):
+        # Never prune raw rows the archive does not have yet.
+        if not archive.get("archived_through"):
+            return {"raw_from": None, "deleted": 0}
+        keep_from = datetime.fromisoformat(str(archive["archived_through"]))
+    with _pg().get_conn() as conn:
+        with conn.cursor() as cur:
+            raw_from, deleted = prune_raw_snapshots(
+                cur, now=datetime.now(tz=LOCAL_TZ), horizon=horizon, keep_from=keep_from
+            )
+    logger.info("Raw snapshots now start at %s (%d rows deleted)", raw_from, deleted)
+    return {"raw_from": _iso(raw_from), "deleted": deleted}
+
+
+@task
+def prune_hourly_stats() -> Dict[str, object]:
+    horizon = _var_days("HOURLY_ROLLUP_HORIZON_DAYS", HOURLY_ROLLUP_HORIZON_DAYS)
+    with _pg().get_conn() as conn:
+        with conn.cursor() as cur:
+            hourly_from, deleted = prune_hourly_rollups(cur, now=datetime.now(tz=LOCAL_TZ), horizon=horizon)
+    logger.info("Hourly rollups now start at %s (%d rows deleted)", hourly_from, deleted)
+    return {"hourly_from": _iso(hourly_from), "deleted": deleted}
+
+
+default_args = {
+    "owner": "dataengineers",
+    "depends_on_past": False,
+    "retries": 2,
+    "retry_delay": timedelta(minutes=5),
+    "start_date": datetime(2026, 1, 1, tzinfo=LOCAL_TZ),
+}
+
+
+with DAG(
+    dag_id="rollup_video_stats",
+    default_args=default_args,
+    schedule="7 * * * *",
+    catchup=False,
+    max_active_runs=1,
+    dagrun_timeout=timedelta(minutes=30),
+    description="Roll raw video stats snapshots into hourly/daily tiers, archive cold days and prune old raw rows",
+) as dag:
+    t_hourly = rollup_hourly_stats()
+    t_daily = rollup_daily_stats()
+    t_archive = archive_cold_stats()
+    t_prune_raw = prune_raw_stats(t_archive)
+    t_prune_hourly = prune_hourly_stats()
+
+    t_hourly >> t_daily >> t_archive >> t_prune_raw >> t_prune_hourly
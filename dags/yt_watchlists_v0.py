@@ -1,19 +1,28 @@
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set
 
 import pendulum
 
 from airflow import DAG
 from airflow.decorators import task
 from airflow.models import Variable
+from airflow.operators.python import get_current_context
 from airflow.operators.trigger_dagrun import TriggerDagRunOperator
 
-from ytb_elt.db.migrate import apply_sql_migrations, migrations_dir_default
+from ytb_elt.db.channel_summary import refresh_channel_summary
+from ytb_elt.db.events import notify_data_changed
+from ytb_elt.db.leases import acquire_leases, channel_lease_key, release_holder_leases, release_leases
+from ytb_elt.db.partitions import ensure_snapshot_partitions
+from ytb_elt.db.progress import completed_units, mark_done, prune_progress
+from ytb_elt.db.snapshots import WRITE_MODE_CHANGES, WRITE_MODE_FULL, WRITE_MODES, write_snapshot
+from ytb_elt.db.videos import upsert_video
 from ytb_elt.logic.duration import classify_video_type, parse_youtube_duration_to_seconds
+from ytb_elt.logic.sharding import balance_shards
 from ytb_elt.youtube.client import YouTubeClient, batch
 
 from airflow.providers.postgres.hooks.postgres import PostgresHook
+from psycopg2.extras import execute_values
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +30,89 @@ LOCAL_TZ = pendulum.timezone("UTC")
 
 POSTGRES_CONN_ID = "postgres_db_yt_elt"
 
+# How long run-scoped rows in core.ingest_run_videos are kept around.
+INGEST_RUN_VIDEOS_RETENTION = timedelta(days=2)
+
+# Default for the INGEST_SHARDS Airflow Variable (mapped fetch/upsert task instances per run).
+INGEST_SHARDS = 4
+# Recent uploads fetched per channel.
+RECENT_VIDEOS_PER_CHANNEL = 200
+# Channel leases (core.ingest_leases) outlive dagrun_timeout, so a killed run's channels are
+# reclaimed by the next run rather than held forever.
+INGEST_LEASE_TTL = timedelta(minutes=15)
+
 
 def _pg() -> PostgresHook:
     return PostgresHook(postgres_conn_id=POSTGRES_CONN_ID)
 
 
+def _to_int(v) -> Optional[int]:
+    return int(v) if v is not None else None
+
+
+def _var_int(name: str) -> Optional[int]:
+    raw = Variable.get(name, default_var="")
+    if raw in (None, ""):
+        return None
+    try:
+        return int(float(raw))
+    except Exception:
+        logger.warning("Invalid int Airflow Variable %s=%r (ignored)", name, raw)
+        return None
+
+
+def _snapshot_write_mode() -> str:
+    mode = (Variable.get("SNAPSHOT_WRITE_MODE", default_var="") or WRITE_MODE_FULL).strip().lower()
+    if mode not in WRITE_MODES:
+        logger.warning("Invalid Airflow Variable SNAPSHOT_WRITE_MODE=%r (using %s)", mode, WRITE_MODE_FULL)
+        return WRITE_MODE_FULL
+    return mode
+
+
+def _run_pulled_at() -> datetime:
+    """
+    One pulled_at for the whole run, taken from its data interval rather than the clock, so all
+    shards share an ingest tick and a retried shard rewrites the same snapshot keys.
+    """
+    ctx = get_current_context()
+    ts = ctx.get("data_interval_end") or ctx["logical_date"]
+    # Round to minute for dedupe.
+    return ts.in_timezone(LOCAL_TZ).replace(second=0, microsecond=0)
+
+
+def _lease_channels(channel_ids: List[str], run_id: str) -> List[str]:
+    """Channels of `channel_ids` this run now holds; the rest are being ingested by another run."""
+    keys = {channel_lease_key(c): c for c in channel_ids}
+    with _pg().get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            held = acquire_leases(cur, list(keys), holder=run_id, ttl=INGEST_LEASE_TTL)
+    skipped = len(keys) - len(held)
+    if skipped:
+        logger.info("Skipping %d channel(s) leased by another ingest run", skipped)
+    return sorted(keys[k] for k in held)
+
+
+def _add(total: Optional[int], v: Optional[int]) -> Optional[int]:
+    if v is None:
+        return total
+    return v if total is None else total + v
+
+
 @task
-def migrate_db() -> List[str]:
-    return apply_sql_migrations(postgres_conn_id=POSTGRES_CONN_ID, migrations_dir=migrations_dir_default())
+def maintain_snapshot_partitions() -> Dict[str, object]:
+    """
+    Keep monthly core.video_stats_snapshots partitions ready ahead of time (inserts fail without
+    one). Old partitions are dropped by rollup_video_stats (prune_raw_snapshots), and only once
+    their rows are rolled up and archived.
+    """
+    with _pg().get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            created = ensure_snapshot_partitions(cur)
+    if created:
+        logger.info("Snapshot partitions: created=%d", created)
+    return {"created": created}
 
 
 @task
@@ -93,59 +177,169 @@ def upsert_channels_and_uploads_playlist_ids(watchlist_channels: Dict[str, List[
 
 
 @task
-def fetch_recent_video_ids_per_channel(channel_ids: List[str], limit_per_channel: int = 200) -> Dict[str, List[str]]:
+def plan_ingest_shards(channel_ids: List[str]) -> List[List[str]]:
+    """
+    Partition channels into INGEST_SHARDS groups of similar video volume (videos already in
+    core.videos, capped at what one run fetches; unseen channels count as a full fetch).
+    Each group becomes one mapped fetch/upsert task instance.
+    """
+    if not channel_ids:
+        return []
+    shards = _var_int("INGEST_SHARDS") or INGEST_SHARDS
+    with _pg().get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT channel_id, count(*) FROM core.videos WHERE channel_id = ANY(%s) GROUP BY channel_id;",
+                (list(channel_ids),),
+            )
+            known = dict(cur.fetchall())
+    weights = {
+        cid: min(int(known.get(cid) or RECENT_VIDEOS_PER_CHANNEL), RECENT_VIDEOS_PER_CHANNEL) for cid in channel_ids
+    }
+    plan = balance_shards(weights, shards)
+    logger.info(
+        "Ingest shards: %s",
+        ", ".join(f"{len(s)} channels/{sum(weights[c] for c in s)} videos" for s in plan),
+    )
+    return plan
+
+
+@task
+def fetch_recent_video_ids_per_channel(
+    channel_ids: List[str], limit_per_channel: int = RECENT_VIDEOS_PER_CHANNEL
+) -> Dict[str, List[str]]:
     out: Dict[str, List[str]] = {}
     if not channel_ids:
         return out
 
+    run_id = get_current_context()["run_id"]
+    # Held until upsert_videos_and_insert_snapshots (or, if that never runs, release_ingest_leases)
+    # releases them.
+    channel_ids = _lease_channels(channel_ids, run_id)
+
     api_key = Variable.get("YOUTUBE_API_KEY")
     yt = YouTubeClient(api_key)
 
     with _pg().get_conn() as conn:
         conn.autocommit = True
         with conn.cursor() as cur:
+            # Channels an earlier attempt of this run already listed (core.ingest_progress).
+            done = completed_units(cur, run_id=run_id, stage="fetch")
             for channel_id in channel_ids:
+                if channel_id in done:
+                    out[channel_id] = list(done[channel_id] or [])
+                    continue
                 cur.execute("SELECT uploads_playlist_id FROM core.channels WHERE channel_id=%s;", (channel_id,))
                 row = cur.fetchone()
                 uploads = row[0] if row else None
                 if not uploads:
                     logger.warning("Missing uploads_playlist_id for channel_id=%s", channel_id)
+                    # Keep the key so the downstream task releases its lease.
+                    out[channel_id] = []
                     continue
                 vids = yt.list_recent_upload_video_ids(uploads, limit=limit_per_channel)
                 out[channel_id] = [v for (v, _published_at) in vids]
+                mark_done(cur, run_id=run_id, stage="fetch", unit_key=channel_id, payload=out[channel_id])
 
+    resumed = sum(1 for c in out if c in done)
+    if resumed:
+        logger.info("Resumed %d channel(s) from core.ingest_progress", resumed)
     return out
 
 
 @task
 def upsert_videos_and_insert_snapshots(recent_video_ids: Dict[str, List[str]]) -> int:
-    # Dedupe all IDs across channels (videos are channel-scoped, but keep safe).
-    to_fetch: List[Tuple[str, str]] = []
-    for channel_id, vids in recent_video_ids.items():
-        for vid in vids:
-            to_fetch.append((channel_id, vid))
+    """
+    Write one shard's videos and snapshots under its channel leases (re-taken here so a retry
+    skips channels another run reclaimed meanwhile), releasing them when done.
+    """
+    run_id = get_current_context()["run_id"]
+    channel_ids = _lease_channels(list(recent_video_ids), run_id)
+    try:
+        return _upsert_videos_and_snapshots({c: recent_video_ids[c] for c in channel_ids}, run_id)
+    finally:
+        with _pg().get_conn() as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                release_leases(cur, [channel_lease_key(c) for c in channel_ids], holder=run_id)
+
+
+@task(trigger_rule="all_done")
+def release_ingest_leases() -> int:
+    """
+    Release the channel leases this run still holds, whatever happened upstream. If one fetch
+    shard fails for good the upsert mapping never expands, so the other shards' leases would
+    otherwise stay held (and those channels skipped) until INGEST_LEASE_TTL.
+    """
+    run_id = get_current_context()["run_id"]
+    with _pg().get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            released = release_holder_leases(cur, holder=run_id)
+    if released:
+        logger.info("Released %d channel lease(s) left by failed shards", released)
+    return released
 
-    if not to_fetch:
+
+def _upsert_videos_and_snapshots(recent_video_ids: Dict[str, List[str]], run_id: str) -> int:
+    """
+    Videos and snapshots per channel, one videos.list batch (50 IDs) at a time. Each finished
+    batch and channel is recorded in core.ingest_progress, so a retry skips them and only
+    folds the stored batch totals into the channel summary.
+    """
+    if not any(recent_video_ids.values()):
         logger.info("No videos to fetch")
         return 0
 
     api_key = Variable.get("YOUTUBE_API_KEY")
     yt = YouTubeClient(api_key)
 
-    pulled_at = datetime.now(tz=LOCAL_TZ)
-    # Round to minute for dedupe.
-    pulled_at = pulled_at.replace(second=0, microsecond=0)
+    pulled_at = _run_pulled_at()
 
+    changes_only = _snapshot_write_mode() == WRITE_MODE_CHANGES
     inserted_snapshots = 0
+    confirmed_snapshots = 0
+    # core.videos outcomes; unchanged metadata is not rewritten (see ytb_elt.db.videos).
+    videos_inserted = videos_updated = videos_unchanged = 0
+    resumed_batches = 0
+    changed = False
 
     # Process per channel to keep video->channel mapping simple.
     with _pg().get_conn() as conn:
         conn.autocommit = True
         with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM core.ingest_run_videos WHERE created_at < now() - %s;",
+                (INGEST_RUN_VIDEOS_RETENTION,),
+            )
+            prune_progress(cur, older_than=INGEST_RUN_VIDEOS_RETENTION)
+            done = completed_units(cur, run_id=run_id, stage="upsert")
+
             for channel_id, vids in recent_video_ids.items():
-                if not vids:
+                if not vids or channel_id in done:
                     continue
-                for ids in batch(vids, 50):
+                channel_snapshots = 0
+                views_total: Optional[int] = None
+                likes_total: Optional[int] = None
+                comments_total: Optional[int] = None
+                for batch_no, ids in enumerate(batch(vids, 50)):
+                    unit = f"{channel_id}#{batch_no}"
+                    prior = done.get(unit)
+                    if prior is not None:
+                        resumed_batches += 1
+                        views_total = _add(views_total, prior["views"])
+                        likes_total = _add(likes_total, prior["likes"])
+                        comments_total = _add(comments_total, prior["comments"])
+                        channel_snapshots += prior["observed"]
+                        continue
+
+                    batch_views: Optional[int] = None
+                    batch_likes: Optional[int] = None
+                    batch_comments: Optional[int] = None
+                    batch_observed = 0
+                    # Videos that received a new snapshot row in this run.
+                    touched: List[str] = []
                     items = yt.get_videos(ids)
                     for item in items:
                         video_id = item.get("id")
@@ -162,42 +356,106 @@ def upsert_videos_and_insert_snapshots(recent_video_ids: Dict[str, List[str]]) -
                         duration_seconds = parse_youtube_duration_to_seconds(duration)
                         video_type = classify_video_type(duration_seconds)
 
-                        view_count = stats.get("viewCount")
-                        like_count = stats.get("likeCount")
-                        comment_count = stats.get("commentCount")
-
-                        cur.execute(
-                            """
-                            INSERT INTO core.videos(video_id, channel_id, title, published_at, duration_seconds, video_type, updated_at)
-                            VALUES (%s, %s, %s, %s, %s, %s, now())
-                            ON CONFLICT (video_id) DO UPDATE
-                              SET title = EXCLUDED.title,
-                                  channel_id = EXCLUDED.channel_id,
-                                  published_at = EXCLUDED.published_at,
-                                  duration_seconds = EXCLUDED.duration_seconds,
-                                  video_type = EXCLUDED.video_type,
-                                  updated_at = now();
-                            """,
-                            (video_id, channel_id, title, published_at, duration_seconds, video_type),
+                        view_count = _to_int(stats.get("viewCount"))
+                        like_count = _to_int(stats.get("likeCount"))
+                        comment_count = _to_int(stats.get("commentCount"))
+                        batch_views = _add(batch_views, view_count)
+                        batch_likes = _add(batch_likes, like_count)
+                        batch_comments = _add(batch_comments, comment_count)
+
+                        video_write = upsert_video(
+                            cur,
+                            video_id=video_id,
+                            channel_id=channel_id,
+                            title=title,
+                            published_at=published_at,
+                            duration_seconds=duration_seconds,
+                            video_type=video_type,
                         )
-
-                        cur.execute(
+                        if video_write == "inserted":
+                            videos_inserted += 1
+                        elif video_write == "updated":
+                            videos_updated += 1
+                        else:
+                            videos_unchanged += 1
+
+                        written = write_snapshot(
+                            cur,
+                            video_id=video_id,
+                            pulled_at=pulled_at,
+                            view_count=view_count,
+                            like_count=like_count,
+                            comment_count=comment_count,
+                            changes_only=changes_only,
+                        )
+                        if written == "inserted":
+                            inserted_snapshots += 1
+                            batch_observed += 1
+                            touched.append(video_id)
+                        elif written == "confirmed":
+                            # Still observed this run; unchanged counts can't spike, so no alert scope.
+                            confirmed_snapshots += 1
+                            batch_observed += 1
+                            changed = True
+                        elif written is None:
+                            # Written by an earlier attempt of this run (same run pulled_at).
+                            batch_observed += 1
+                            touched.append(video_id)
+
+                    # Publish fresh videos so the alerts DAG can scope its scan to them.
+                    if touched:
+                        execute_values(
+                            cur,
                             """
-                            INSERT INTO core.video_stats_snapshots(video_id, pulled_at, view_count, like_count, comment_count)
-                            VALUES (%s, %s, %s, %s, %s)
-                            ON CONFLICT (video_id, pulled_at) DO NOTHING;
+                            INSERT INTO core.ingest_run_videos(run_id, channel_id, video_id, pulled_at)
+                            VALUES %s
+                            ON CONFLICT (run_id, video_id) DO NOTHING;
                             """,
-                            (
-                                video_id,
-                                pulled_at,
-                                int(view_count) if view_count is not None else None,
-                                int(like_count) if like_count is not None else None,
-                                int(comment_count) if comment_count is not None else None,
-                            ),
+                            [(run_id, channel_id, video_id, pulled_at) for video_id in touched],
                         )
-                        if cur.rowcount == 1:
-                            inserted_snapshots += 1
-
+                        changed = True
+                    mark_done(
+                        cur,
+                        run_id=run_id,
+                        stage="upsert",
+                        unit_key=unit,
+                        payload={
+                            "views": batch_views,
+                            "likes": batch_likes,
+                            "comments": batch_comments,
+                            "observed": batch_observed,
+                        },
+                    )
+                    views_total = _add(views_total, batch_views)
+                    likes_total = _add(likes_total, batch_likes)
+                    comments_total = _add(comments_total, batch_comments)
+                    channel_snapshots += batch_observed
+
+                refresh_channel_summary(
+                    cur,
+                    channel_id=channel_id,
+                    pulled_at=pulled_at if channel_snapshots else None,
+                    views_total=views_total,
+                    likes_total=likes_total,
+                    comments_total=comments_total,
+                )
+                mark_done(cur, run_id=run_id, stage="upsert", unit_key=channel_id)
+
+            if changed:
+                # Web app caches key off this (see app/notify_listener.py).
+                notify_data_changed(cur)
+
+    logger.info(
+        "Videos: %d inserted, %d updated, %d unchanged; snapshots: %d inserted, %d confirmed unchanged; "
+        "%d batch(es) resumed (run_id=%s)",
+        videos_inserted,
+        videos_updated,
+        videos_unchanged,
+        inserted_snapshots,
+        confirmed_snapshots,
+        resumed_batches,
+        run_id,
+    )
     return inserted_snapshots
 
 
@@ -206,8 +464,6 @@ default_args = {
     "depends_on_past": False,
     "retries": 2,
     "retry_delay": timedelta(minutes=2),
-    "max_active_runs": 1,
-    "dagrun_timeout": timedelta(minutes=10),
     "start_date": datetime(2026, 1, 1, tzinfo=LOCAL_TZ),
 }
 
@@ -217,18 +473,28 @@ with DAG(
     default_args=default_args,
     schedule="*/15 * * * *",
     catchup=False,
+    # A slow run may overlap the next one; channel leases keep them on disjoint channels.
+    max_active_runs=2,
+    dagrun_timeout=timedelta(minutes=10),
     description="Ingest YouTube channels from DB watchlists into core tables + stats snapshots",
 ) as dag:
-    t_mig = migrate_db()
+    t_partitions = maintain_snapshot_partitions()
     t_tracked = get_tracked_channels_from_db()
     t_channels = upsert_channels_and_uploads_playlist_ids(t_tracked)
-    t_recent = fetch_recent_video_ids_per_channel(t_channels)
-    t_snap = upsert_videos_and_insert_snapshots(t_recent)
+    t_shards = plan_ingest_shards(t_channels)
+    # One mapped instance per shard; each retries on its own and spreads across workers.
+    t_recent = fetch_recent_video_ids_per_channel.expand(channel_ids=t_shards)
+    t_snap = upsert_videos_and_insert_snapshots.expand(recent_video_ids=t_recent)
 
     t_trigger_alerts = TriggerDagRunOperator(
         task_id="trigger_compute_and_send_alerts",
         trigger_dag_id="compute_and_send_alerts",
+        # Alerts only evaluate the videos this run snapshotted (see core.ingest_run_videos).
+        conf={"ingest_run_id": "{{ run_id }}"},
         wait_for_completion=False,
     )
 
-    t_mig >> t_tracked >> t_channels >> t_recent >> t_snap >> t_trigger_alerts
+    t_release = release_ingest_leases()
+
+    t_partitions >> t_tracked >> t_channels >> t_shards >> t_recent >> t_snap >> t_trigger_alerts
+    t_snap >> t_release
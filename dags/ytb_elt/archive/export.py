@@ -0,0 +1,166 @@
+"""
+Parquet archive of cold snapshot history, for analytics and backtests without touching Postgres.
+
+Layout under the archive root (one directory per UTC day, hive-style):
+  snapshots/day=YYYY-MM-DD/snapshots.parquet   raw core.video_stats_snapshots rows of that day,
+                                               sorted by (pulled_at, video_id), zstd-compressed
+  videos/videos.parquet                        core.videos metadata, rewritten by every export
+
+A day is exported once it is `cold_after` old, i.e. no new rows or confirmations
+(migrations/014) can land in it. Files are written to a temp name and renamed into place, so a
+day's file either exists complete or not at all; existing days are skipped, which makes the
+export incremental and safe to re-run. Read it back with ytb_elt.archive.reader.
+"""
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SCHEMA = pa.schema(
+    [
+        ("video_id", pa.string()),
+        ("pulled_at", pa.timestamp("us", tz="UTC")),
+        ("view_count", pa.int64()),
+        ("like_count", pa.int64()),
+        ("comment_count", pa.int64()),
+        ("last_confirmed_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+VIDEO_SCHEMA = pa.schema(
+    [
+        ("video_id", pa.string()),
+        ("channel_id", pa.string()),
+        ("title", pa.string()),
+        ("published_at", pa.timestamp("us", tz="UTC")),
+        ("duration_seconds", pa.int32()),
+        ("video_type", pa.string()),
+    ]
+)
+
+COMPRESSION = "zstd"
+ROW_GROUP_ROWS = 250_000
+
+# Days a finished UTC day waits before export; covers late ingest runs and open confirmations.
+DEFAULT_COLD_AFTER = timedelta(days=2)
+
+
+def _epoch_us(column: str) -> str:
+    return f"(extract(epoch FROM {column}) * 1000000)::bigint"
+
+
+def day_path(root: str, day: date) -> str:
+    return os.path.join(root, "snapshots", f"day={day.isoformat()}", "snapshots.parquet")
+
+
+def videos_path(root: str) -> str:
+    return os.path.join(root, "videos", "videos.parquet")
+
+
+def _utc_midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _write_batches(conn, path: str, schema: pa.Schema, sql: str, params, cursor_name: str) -> int:
+    """Stream a query through a server-side cursor into a Parquet file, then rename it into place."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    rows_written = 0
+    with pq.ParquetWriter(tmp, schema, compression=COMPRESSION) as writer:
+        with conn.cursor(name=cursor_name) as cur:
+            cur.itersize = ROW_GROUP_ROWS
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(ROW_GROUP_ROWS)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                        schema=schema,
+                    )
+                )
+                rows_written += len(rows)
+        if rows_written == 0:
+            writer.write_table(schema.empty_table())
+    os.replace(tmp, path)
+    return rows_written
+
+
+def export_day(conn, root: str, day: date) -> int:
+    """Write one UTC day of raw snapshots (overwriting any existing file). Returns rows written."""
+    lo = _utc_midnight(day)
+    return _write_batches(
+        conn,
+        day_path(root, day),
+        SNAPSHOT_SCHEMA,
+        f"""
+        SELECT video_id, {_epoch_us("pulled_at")}, view_count, like_count, comment_count,
+               {_epoch_us("last_confirmed_at")}
+        FROM core.video_stats_snapshots
+        WHERE pulled_at >= %s AND pulled_at < %s
+        ORDER BY pulled_at, video_id;
+        """,
+        (lo, lo + timedelta(days=1)),
+        "archive_snapshots",
+    )
+
+
+def export_videos(conn, root: str) -> int:
+    return _write_batches(
+        conn,
+        videos_path(root),
+        VIDEO_SCHEMA,
+        f"""
+        SELECT video_id, channel_id, title, {_epoch_us("published_at")}, duration_seconds, video_type
+        FROM core.videos
+        ORDER BY video_id;
+        """,
+        None,
+        "archive_videos",
+    )
+
+
+def export_cold_days(
+    conn,
+    root: str,
+    *,
+    now: datetime,
+    cold_after: timedelta = DEFAULT_COLD_AFTER,
+    max_days: int = 31,
+) -> Tuple[Optional[datetime], List[date]]:
+    """
+    Export every cold day from the oldest raw snapshot onwards that has no archive file yet,
+    at most `max_days` per call, and refresh the videos file when anything was written.
+    Returns (archived_through, days exported): archived_through is the end of the contiguous
+    run of archived days starting at the oldest raw day, i.e. raw rows before it are safe to
+    prune. None when there are no raw rows.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT min(pulled_at) FROM core.video_stats_snapshots;")
+        first = cur.fetchone()[0]
+    if first is None:
+        return None, []
+
+    day = first.astimezone(timezone.utc).date()
+    last_cold = (now - cold_after).astimezone(timezone.utc).date() - timedelta(days=1)
+    exported: List[date] = []
+    while day <= last_cold:
+        if not os.path.exists(day_path(root, day)):
+            if len(exported) >= max_days:
+                break
+            rows = export_day(conn, root, day)
+            logger.info("Archived %s: %d snapshot rows", day, rows)
+            exported.append(day)
+        day += timedelta(days=1)
+    archived_through = _utc_midnight(day)
+
+    if exported or not os.path.exists(videos_path(root)):
+        export_videos(conn, root)
+    return archived_through, exported
@@ -0,0 +1,87 @@
+"""
+Read side of the Parquet snapshot archive (ytb_elt.archive.export).
+
+Day files are opened memory-mapped and only the requested columns are decoded, so scanning
+months of one or two columns stays cheap and never touches Postgres.
+
+  from ytb_elt.archive.reader import read_snapshots
+  t = read_snapshots("/opt/airflow/data/archive", start=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                     columns=["video_id", "pulled_at", "view_count"])
+"""
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ytb_elt.archive.export import SNAPSHOT_SCHEMA, VIDEO_SCHEMA, day_path, videos_path
+
+_DAY_DIR = re.compile(r"^day=(\d{4}-\d{2}-\d{2})$")
+
+
+def archived_days(root: str) -> List[date]:
+    """UTC days with a complete archive file, oldest first."""
+    base = os.path.join(root, "snapshots")
+    if not os.path.isdir(base):
+        return []
+    days = []
+    for name in os.listdir(base):
+        m = _DAY_DIR.match(name)
+        if m:
+            day = date.fromisoformat(m.group(1))
+            if os.path.exists(day_path(root, day)):
+                days.append(day)
+    return sorted(days)
+
+
+def read_snapshots(
+    root: str,
+    *,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    video_ids: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pa.Table:
+    """
+    Archived snapshots with start <= pulled_at < end, optionally restricted to some videos,
+    in (pulled_at, video_id) order. Only day files overlapping the range are opened.
+    """
+    columns = list(columns) if columns else SNAPSHOT_SCHEMA.names
+    # Filter columns are read too and dropped at the end.
+    needed = list(dict.fromkeys(columns + ["pulled_at"] + (["video_id"] if video_ids is not None else [])))
+
+    first_day = start.astimezone(timezone.utc).date() if start else None
+    last_day = (end - timedelta(microseconds=1)).astimezone(timezone.utc).date() if end else None
+    tables = [
+        pq.read_table(day_path(root, day), columns=needed, memory_map=True)
+        for day in archived_days(root)
+        if (first_day is None or day >= first_day) and (last_day is None or day <= last_day)
+    ]
+    if not tables:
+        return pa.schema([SNAPSHOT_SCHEMA.field(c) for c in columns]).empty_table()
+    table = pa.concat_tables(tables)
+
+    mask = None
+    if start is not None:
+        mask = pc.greater_equal(table["pulled_at"], pa.scalar(start, type=SNAPSHOT_SCHEMA.field("pulled_at").type))
+    if end is not None:
+        upper = pc.less(table["pulled_at"], pa.scalar(end, type=SNAPSHOT_SCHEMA.field("pulled_at").type))
+        mask = upper if mask is None else pc.and_(mask, upper)
+    if video_ids is not None:
+        wanted = pc.is_in(table["video_id"], value_set=pa.array(list(video_ids), type=pa.string()))
+        mask = wanted if mask is None else pc.and_(mask, wanted)
+    if mask is not None:
+        table = table.filter(mask)
+    return table.select(columns)
+
+
+def read_videos(root: str, *, columns: Optional[Sequence[str]] = None) -> pa.Table:
+    """core.videos metadata as of the last export (empty if nothing was exported yet)."""
+    columns = list(columns) if columns else VIDEO_SCHEMA.names
+    path = videos_path(root)
+    if not os.path.exists(path):
+        return pa.schema([VIDEO_SCHEMA.field(c) for c in columns]).empty_table()
+    return pq.read_table(path, columns=columns, memory_map=True)
@@ -0,0 +1,496 @@
+"""
+Historical replay of velocity-spike alert rules over core.video_stats_snapshots.
+
+At every ingest tick (distinct pulled_at) the replay reconstructs what compute_and_send_alerts
+would have seen: the last two snapshots per video, the per channel/video_type baseline, the
+fresh-videos scope, the daily cap and the alerts_sent dedupe. Snapshot history is streamed once
+through a server-side cursor into column arrays; rule sets are then replayed in a process pool.
+
+Usage (outside Airflow):
+  python -m ytb_elt.backtest.replay --dsn postgresql://... --watchlist-id default \\
+      --start 2026-01-01 --set multiplier=2,2.5,3 --set abs_floor_vph=3000,5000
+
+Add --archive DIR to read snapshots from the Parquet archive (ytb_elt.archive) instead; the
+DSN is then only used for rules and the watchlist's channels.
+"""
+import argparse
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from dataclasses import replace as dc_replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+
+from ytb_elt.db.rules import load_alert_rule
+from ytb_elt.logic.alerts import AlertRule
+from ytb_elt.logic.scoring import latest_views_per_hour, velocity_spike_mask
+
+logger = logging.getLogger(__name__)
+
+# video_type -> rule, mirroring one watchlist's core.alert_rules rows.
+RuleSet = Dict[str, AlertRule]
+
+DEFAULT_BASELINE_VPH = {"long": 1000.0, "short": 2000.0}
+
+
+@dataclass(frozen=True)
+class SnapshotHistory:
+    """
+    Columnar snapshot history. Per-video arrays are indexed by position in video_ids;
+    snapshot arrays are sorted by pulled_at (epoch seconds).
+    """
+
+    video_ids: List[str]
+    channel_ids: List[str]
+    video_channel: np.ndarray  # int32, index into channel_ids
+    video_is_short: np.ndarray  # bool
+    video_published: np.ndarray  # float64 epoch seconds
+    snap_video: np.ndarray  # int32, index into video_ids
+    snap_pulled: np.ndarray  # float64 epoch seconds
+    snap_views: np.ndarray  # float64
+
+
+@dataclass(frozen=True)
+class FiredAlert:
+    pulled_at: datetime
+    channel_id: str
+    video_id: str
+    video_type: str
+    vph: float
+    baseline_vph: float
+
+
+def load_history(
+    conn,
+    *,
+    channel_ids: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_rows: int = 200_000,
+) -> SnapshotHistory:
+    """
+    Stream snapshots for the given channels in pulled_at order through a named (server-side)
+    cursor, converting each chunk to arrays as it arrives.
+    """
+    channel_ids = sorted(set(channel_ids))
+    channel_index = {cid: i for i, cid in enumerate(channel_ids)}
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT video_id, channel_id, video_type, extract(epoch FROM published_at)::float8
+            FROM core.videos
+            WHERE channel_id = ANY(%s)
+            ORDER BY video_id;
+            """,
+            (channel_ids,),
+        )
+        videos = cur.fetchall()
+
+    video_ids = [v[0] for v in videos]
+    video_index = {vid: i for i, vid in enumerate(video_ids)}
+    video_channel = np.array([channel_index[v[1]] for v in videos], dtype=np.int32)
+    video_is_short = np.array([v[2] == "short" for v in videos], dtype=bool)
+    video_published = np.array([v[3] for v in videos], dtype=np.float64)
+
+    snap_video: List[np.ndarray] = []
+    snap_pulled: List[np.ndarray] = []
+    snap_views: List[np.ndarray] = []
+    snap_confirmed: List[np.ndarray] = []
+
+    with conn.cursor(name="backtest_snapshots") as cur:
+        cur.itersize = chunk_rows
+        cur.execute(
+            """
+            SELECT s.video_id, extract(epoch FROM s.pulled_at)::float8, s.view_count,
+                   extract(epoch FROM s.last_confirmed_at)::float8
+            FROM core.video_stats_snapshots s
+            JOIN core.videos v ON v.video_id = s.video_id
+            WHERE v.channel_id = ANY(%s)
+              AND s.view_count IS NOT NULL
+              AND s.pulled_at >= COALESCE(%s, '-infinity'::timestamptz)
+              AND s.pulled_at < COALESCE(%s, 'infinity'::timestamptz)
+            ORDER BY s.pulled_at, s.video_id;
+            """,
+            (channel_ids, start, end),
+        )
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            vids, pulled, views, confirmed = zip(*rows)
+            snap_video.append(np.fromiter((video_index[v] for v in vids), dtype=np.int32, count=len(rows)))
+            snap_pulled.append(np.asarray(pulled, dtype=np.float64))
+            snap_views.append(np.asarray(views, dtype=np.float64))
+            snap_confirmed.append(np.array([np.nan if c is None else c for c in confirmed], dtype=np.float64))
+            logger.info("Loaded %d snapshot rows", sum(len(c) for c in snap_video))
+
+    sv, sp, sw = expand_confirmed_runs(
+        np.concatenate(snap_video) if snap_video else np.empty(0, dtype=np.int32),
+        np.concatenate(snap_pulled) if snap_pulled else np.empty(0, dtype=np.float64),
+        np.concatenate(snap_views) if snap_views else np.empty(0, dtype=np.float64),
+        np.concatenate(snap_confirmed) if snap_confirmed else np.empty(0, dtype=np.float64),
+    )
+    return SnapshotHistory(
+        video_ids=video_ids,
+        channel_ids=channel_ids,
+        video_channel=video_channel,
+        video_is_short=video_is_short,
+        video_published=video_published,
+        snap_video=sv,
+        snap_pulled=sp,
+        snap_views=sw,
+    )
+
+
+def load_archived_history(
+    root: str,
+    *,
+    channel_ids: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> SnapshotHistory:
+    """
+    Same as load_history, but from the Parquet archive (ytb_elt.archive) instead of Postgres.
+    Covers archived (cold) days only.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    from ytb_elt.archive.reader import read_snapshots, read_videos
+
+    channel_ids = sorted(set(channel_ids))
+    channel_index = {cid: i for i, cid in enumerate(channel_ids)}
+
+    videos = read_videos(root, columns=["video_id", "channel_id", "video_type", "published_at"])
+    videos = videos.filter(pc.is_in(videos["channel_id"], value_set=pa.array(channel_ids, type=pa.string())))
+    videos = videos.sort_by("video_id")
+    video_ids = videos["video_id"].to_pylist()
+
+    snaps = read_snapshots(
+        root,
+        start=start,
+        end=end,
+        video_ids=video_ids,
+        columns=["video_id", "pulled_at", "view_count", "last_confirmed_at"],
+    )
+    snaps = snaps.filter(pc.is_valid(snaps["view_count"]))
+    logger.info("Loaded %d archived snapshot rows", snaps.num_rows)
+
+    def epoch_seconds(col) -> np.ndarray:
+        us = pc.cast(pc.cast(col, pa.int64()), pa.float64())
+        return pc.divide(us, 1e6).fill_null(np.nan).to_numpy()
+
+    sv, sp, sw = expand_confirmed_runs(
+        pc.index_in(snaps["video_id"], value_set=pa.array(video_ids, type=pa.string())).to_numpy().astype(np.int32),
+        epoch_seconds(snaps["pulled_at"]),
+        pc.cast(snaps["view_count"], pa.float64()).to_numpy(),
+        epoch_seconds(snaps["last_confirmed_at"]),
+    )
+    return SnapshotHistory(
+        video_ids=video_ids,
+        channel_ids=channel_ids,
+        video_channel=np.array([channel_index[c] for c in videos["channel_id"].to_pylist()], dtype=np.int32),
+        video_is_short=np.array([t == "short" for t in videos["video_type"].to_pylist()], dtype=bool),
+        video_published=epoch_seconds(videos["published_at"]),
+        snap_video=sv,
+        snap_pulled=sp,
+        snap_views=sw,
+    )
+
+
+def expand_confirmed_runs(
+    snap_video: np.ndarray,
+    snap_pulled: np.ndarray,
+    snap_views: np.ndarray,
+    snap_confirmed: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Undo change-only snapshot writes (migrations/014): a row confirmed until last_confirmed_at
+    (NaN if never) is repeated at every tick in (pulled_at, last_confirmed_at], where ticks are
+    all pulled_at / last_confirmed_at values seen. The replay then sees the same unchanged
+    observations full writes would have produced. Output is sorted by (pulled_at, video).
+    """
+    runs = np.flatnonzero(~np.isnan(snap_confirmed))
+    if runs.size == 0:
+        return snap_video, snap_pulled, snap_views
+
+    ticks = np.unique(np.concatenate([snap_pulled, snap_confirmed[runs]]))
+    lo = np.searchsorted(ticks, snap_pulled[runs], side="right")
+    hi = np.searchsorted(ticks, snap_confirmed[runs], side="right")
+    counts = np.maximum(hi - lo, 0)
+    src = np.repeat(runs, counts)
+    # Position of each repeat within its run, offset by the run's first tick.
+    within = np.arange(src.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    tick_pos = np.repeat(lo, counts) + within
+
+    video = np.concatenate([snap_video, snap_video[src]])
+    pulled = np.concatenate([snap_pulled, ticks[tick_pos]])
+    views = np.concatenate([snap_views, snap_views[src]])
+    order = np.lexsort((video, pulled))
+    return video[order], pulled[order], views[order]
+
+
+def _group_medians(group_ids: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Median per group (same as statistics.median). Returns (unique_group_ids, medians)."""
+    order = np.lexsort((values, group_ids))
+    g = group_ids[order]
+    v = values[order]
+    uniq, starts, counts = np.unique(g, return_index=True, return_counts=True)
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    return uniq, (v[lo] + v[hi]) / 2.0
+
+
+def replay(
+    history: SnapshotHistory,
+    rules: RuleSet,
+    *,
+    video_types: Sequence[str] = ("long", "short"),
+    report_from: Optional[datetime] = None,
+) -> List[FiredAlert]:
+    """
+    Replay every ingest tick in history against one rule set and return the alerts that
+    would have been sent. Ticks before report_from only warm up state (dedupe, caps).
+    """
+    n = len(history.video_ids)
+    out: List[FiredAlert] = []
+    if n == 0 or history.snap_pulled.size == 0:
+        return out
+
+    channel = history.video_channel
+    is_short = history.video_is_short
+    published = history.video_published
+
+    # Latest two observations per video.
+    t1 = np.full(n, np.nan)
+    v1 = np.full(n, np.nan)
+    t0 = np.full(n, np.nan)
+    v0 = np.full(n, np.nan)
+
+    # Static order for "newest videos first" within (channel, video_type) groups.
+    group_of_video = channel.astype(np.int64) * 2 + is_short
+    order = np.lexsort((-published, is_short, channel))
+    group_sorted = group_of_video[order]
+    group_start = np.r_[True, group_sorted[1:] != group_sorted[:-1]]
+    start_pos = np.flatnonzero(group_start)
+    group_pos = np.cumsum(group_start) - 1
+
+    fired = np.zeros(n, dtype=bool)
+    sent_today = np.zeros(len(history.channel_ids), dtype=np.int64)
+    current_day = None
+    report_from_ts = report_from.timestamp() if report_from else -np.inf
+
+    pulled = history.snap_pulled
+    bounds = np.flatnonzero(np.r_[True, pulled[1:] != pulled[:-1], True])
+
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        tick = pulled[a]
+        idx = history.snap_video[a:b]
+        t0[idx] = t1[idx]
+        v0[idx] = v1[idx]
+        t1[idx] = tick
+        v1[idx] = history.snap_views[a:b]
+        fresh = np.zeros(n, dtype=bool)
+        fresh[idx] = True
+
+        day = int(tick // 86400)
+        if day != current_day:
+            current_day = day
+            sent_today[:] = 0
+
+        age_minutes = (tick - published) / 60.0
+        age_hours = age_minutes / 60.0
+        known = ~np.isnan(t1)
+        vph = latest_views_per_hour(v1 - v0, t1 - t0)
+        vph_sorted = vph[order]
+
+        for video_type in video_types:
+            rule = rules[video_type]
+            of_type = is_short if video_type == "short" else ~is_short
+            # Every published video in the age window, snapshotted or not, like the DAG's query.
+            listed = of_type & (age_hours >= 0) & (age_hours <= rule.max_age_hours)
+            in_window = known & listed
+            if not in_window.any():
+                continue
+
+            # Baseline: median VPH over the newest baseline_window_videos in the window,
+            # restricted to videos no older than baseline_hours. Videos without snapshots
+            # take up a slot in the window but contribute no sample.
+            win_sorted = listed[order]
+            seen = np.cumsum(win_sorted)
+            rank = seen - (seen - win_sorted)[start_pos][group_pos] - 1
+            eligible = (
+                win_sorted
+                & (rank < rule.baseline_window_videos)
+                & (age_hours[order] <= rule.baseline_hours)
+                & ~np.isnan(vph_sorted)
+                & (vph_sorted >= 0)
+            )
+            baseline_by_group = np.full(len(history.channel_ids) * 2, DEFAULT_BASELINE_VPH.get(video_type, 1000.0))
+            if eligible.any():
+                groups, medians = _group_medians(group_sorted[eligible], vph_sorted[eligible])
+                baseline_by_group[groups] = medians
+            baseline = baseline_by_group[group_of_video]
+
+            triggered = velocity_spike_mask(
+                video_age_minutes=age_minutes,
+                video_age_hours=age_hours,
+                vph=vph,
+                baseline_vph=baseline,
+                rule=rule,
+            )
+            hits = np.flatnonzero(triggered & in_window & fresh & ~fired)
+            if hits.size == 0:
+                continue
+
+            # Daily cap is checked per channel before sending this video_type's spikes.
+            hits = hits[sent_today[channel[hits]] < rule.daily_cap_per_channel]
+            fired[hits] = True
+            np.add.at(sent_today, channel[hits], 1)
+
+            if tick < report_from_ts:
+                continue
+            tick_dt = datetime.fromtimestamp(tick, tz=timezone.utc)
+            for i in hits:
+                out.append(
+                    FiredAlert(
+                        pulled_at=tick_dt,
+                        channel_id=history.channel_ids[channel[i]],
+                        video_id=history.video_ids[i],
+                        video_type=video_type,
+                        vph=float(vph[i]),
+                        baseline_vph=float(baseline[i]),
+                    )
+                )
+
+    return out
+
+
+def rule_grid(base: RuleSet, overrides: Dict[str, Sequence[float]]) -> List[RuleSet]:
+    """
+    Cartesian product of override values, applied to every video_type's base rule.
+    e.g. {"multiplier": [2, 3], "abs_floor_vph": [3000]} -> 2 rule sets.
+    """
+    field_types = {f.name: f.type for f in fields(AlertRule)}
+    for name in overrides:
+        if name not in field_types or name in ("watchlist_id", "video_type"):
+            raise ValueError(f"unknown AlertRule threshold: {name}")
+
+    names = sorted(overrides)
+    out: List[RuleSet] = []
+    for combo in itertools.product(*(overrides[n] for n in names)):
+        changes = {n: (int(v) if field_types[n] in (int, "int") else float(v)) for n, v in zip(names, combo)}
+        out.append({video_type: dc_replace(rule, **changes) for video_type, rule in base.items()})
+    return out
+
+
+_WORKER_HISTORY: Optional[SnapshotHistory] = None
+
+
+def _init_worker(history: SnapshotHistory) -> None:
+    global _WORKER_HISTORY
+    _WORKER_HISTORY = history
+
+
+def _replay_in_worker(args) -> List[FiredAlert]:
+    rules, video_types, report_from = args
+    assert _WORKER_HISTORY is not None
+    return replay(_WORKER_HISTORY, rules, video_types=video_types, report_from=report_from)
+
+
+def sweep(
+    history: SnapshotHistory,
+    rule_sets: Sequence[RuleSet],
+    *,
+    video_types: Sequence[str] = ("long", "short"),
+    report_from: Optional[datetime] = None,
+    processes: Optional[int] = None,
+) -> List[List[FiredAlert]]:
+    """
+    Replay each rule set (in parallel processes) and return results in rule_sets order.
+    History is handed to each worker once, not per rule set.
+    """
+    if processes == 1 or len(rule_sets) <= 1:
+        return [replay(history, rs, video_types=video_types, report_from=report_from) for rs in rule_sets]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(history,)) as pool:
+        return list(pool.map(_replay_in_worker, [(rs, tuple(video_types), report_from) for rs in rule_sets]))
+
+
+def _parse_override(raw: str) -> Tuple[str, List[float]]:
+    name, _, values = raw.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected name=v1,v2,...: {raw!r}")
+    return name.strip(), [float(v) for v in values.split(",") if v.strip()]
+
+
+def _parse_day(raw: str) -> datetime:
+    return datetime.fromisoformat(raw).replace(tzinfo=timezone.utc)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay snapshot history against a grid of alert rule sets.")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", ""), help="Postgres DSN (default: $DATABASE_URL)")
+    parser.add_argument("--watchlist-id", default="default")
+    parser.add_argument("--channel-id", action="append", default=[], help="Restrict to channel(s); default: watchlist channels")
+    parser.add_argument("--start", type=_parse_day, help="First day to report alerts for (YYYY-MM-DD, UTC)")
+    parser.add_argument("--end", type=_parse_day, help="Stop before this day (YYYY-MM-DD, UTC)")
+    parser.add_argument("--warmup-hours", type=float, default=24.0, help="History replayed before --start to seed dedupe/baselines")
+    parser.add_argument("--set", dest="overrides", type=_parse_override, action="append", default=[], help="Threshold grid, e.g. multiplier=2,2.5,3")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--details", action="store_true", help="Print every fired alert")
+    parser.add_argument("--archive", help="Read snapshots from this Parquet archive (ytb_elt.archive) instead of Postgres")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT video_types FROM core.watchlists WHERE watchlist_id=%s;", (args.watchlist_id,))
+            row = cur.fetchone()
+            video_types = tuple(row[0]) if row and row[0] else ("long", "short")
+            channel_ids = args.channel_id
+            if not channel_ids:
+                cur.execute("SELECT channel_id FROM core.watchlist_channels WHERE watchlist_id=%s;", (args.watchlist_id,))
+                channel_ids = [r[0] for r in cur.fetchall()]
+            base = {vt: load_alert_rule(cur, watchlist_id=args.watchlist_id, video_type=vt) for vt in video_types}
+
+        load_from = args.start - timedelta(hours=args.warmup_hours) if args.start else None
+        if args.archive:
+            history = load_archived_history(args.archive, channel_ids=channel_ids, start=load_from, end=args.end)
+        else:
+            history = load_history(conn, channel_ids=channel_ids, start=load_from, end=args.end)
+    finally:
+        conn.close()
+
+    rule_sets = rule_grid(base, dict(args.overrides)) if args.overrides else [base]
+    logger.info(
+        "Replaying %d snapshots over %d videos for %d rule set(s)",
+        history.snap_pulled.size,
+        len(history.video_ids),
+        len(rule_sets),
+    )
+    results = sweep(history, rule_sets, video_types=video_types, report_from=args.start, processes=args.processes)
+
+    names = sorted(dict(args.overrides))
+    for rules, alerts in zip(rule_sets, results):
+        params = " ".join(f"{n}={getattr(next(iter(rules.values())), n)}" for n in names) or "(current rules)"
+        by_type = {vt: sum(1 for a in alerts if a.video_type == vt) for vt in video_types}
+        print(f"{params}: alerts={len(alerts)} " + " ".join(f"{vt}={c}" for vt, c in by_type.items()))
+        if args.details:
+            for a in alerts:
+                print(f"  {a.pulled_at.isoformat()} {a.channel_id} {a.video_id} {a.video_type} vph={a.vph:,.0f} baseline={a.baseline_vph:,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+import io
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# core.channel_backfills (migrations/017_channel_backfills.sql).
+
+VIDEO_COLUMNS = (
+    "video_id",
+    "channel_id",
+    "title",
+    "published_at",
+    "duration_seconds",
+    "video_type",
+    "view_count",
+    "like_count",
+    "comment_count",
+)
+VideoRow = Tuple[str, str, str, str, int, str, Optional[int], Optional[int], Optional[int]]
+
+_STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS backfill_videos_stage (
+  video_id text NOT NULL,
+  channel_id text NOT NULL,
+  title text NOT NULL,
+  published_at timestamptz NOT NULL,
+  duration_seconds integer NOT NULL,
+  video_type text NOT NULL,
+  view_count bigint,
+  like_count bigint,
+  comment_count bigint
+) ON COMMIT DELETE ROWS;
+"""
+
+# Same no-op guard as ytb_elt.db.videos: unchanged rows are not rewritten.
+_UPSERT_VIDEOS_SQL = """
+INSERT INTO core.videos AS v(video_id, channel_id, title, published_at, duration_seconds, video_type, updated_at)
+SELECT DISTINCT ON (video_id) video_id, channel_id, title, published_at, duration_seconds, video_type, now()
+FROM backfill_videos_stage
+ORDER BY video_id
+ON CONFLICT (video_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      channel_id = EXCLUDED.channel_id,
+      published_at = EXCLUDED.published_at,
+      duration_seconds = EXCLUDED.duration_seconds,
+      video_type = EXCLUDED.video_type,
+      updated_at = now()
+  WHERE (v.title, v.channel_id, v.published_at, v.duration_seconds, v.video_type)
+    IS DISTINCT FROM
+        (EXCLUDED.title, EXCLUDED.channel_id, EXCLUDED.published_at, EXCLUDED.duration_seconds, EXCLUDED.video_type);
+"""
+
+# Baseline snapshot only for videos without any history; videos the ingest already tracks
+# keep their own series.
+_INSERT_SNAPSHOTS_SQL = """
+INSERT INTO core.video_stats_snapshots(video_id, pulled_at, view_count, like_count, comment_count)
+SELECT DISTINCT ON (t.video_id) t.video_id, %s, t.view_count, t.like_count, t.comment_count
+FROM backfill_videos_stage t
+WHERE NOT EXISTS (SELECT 1 FROM core.video_stats_snapshots s WHERE s.video_id = t.video_id)
+ORDER BY t.video_id
+ON CONFLICT (video_id, pulled_at) DO NOTHING;
+"""
+
+
+def request_backfills(cur, channel_ids: Sequence[str], *, restart: bool = False) -> List[str]:
+    """
+    Queue backfills for known channels (rows in core.channels). Channels already queued keep
+    their progress unless `restart`, which walks the playlist again from the newest upload.
+    Returns the channel IDs queued or restarted.
+    """
+    if not channel_ids:
+        return []
+    conflict = (
+        """
+        DO UPDATE SET requested_at = now(), page_token = NULL, pages_done = 0, videos_loaded = 0,
+                      completed_at = NULL, updated_at = now()
+        """
+        if restart
+        else "DO NOTHING"
+    )
+    cur.execute(
+        f"""
+        INSERT INTO core.channel_backfills(channel_id)
+        SELECT c.channel_id FROM core.channels c WHERE c.channel_id = ANY(%s)
+        ON CONFLICT (channel_id) {conflict}
+        RETURNING channel_id;
+        """,
+        (list(channel_ids),),
+    )
+    return sorted(row[0] for row in cur.fetchall())
+
+
+def pending_backfills(cur, *, limit: int) -> List[str]:
+    """Unfinished backfills, oldest request first."""
+    cur.execute(
+        """
+        SELECT channel_id FROM core.channel_backfills
+        WHERE completed_at IS NULL
+        ORDER BY requested_at, channel_id
+        LIMIT %s;
+        """,
+        (limit,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def backfill_cursor(cur, channel_id: str) -> Optional[Tuple[Optional[str], Optional[str], int]]:
+    """(uploads_playlist_id, page_token, pages_done) of a pending backfill, or None if there is none."""
+    cur.execute(
+        """
+        SELECT c.uploads_playlist_id, b.page_token, b.pages_done
+        FROM core.channel_backfills b
+        JOIN core.channels c USING (channel_id)
+        WHERE b.channel_id = %s AND b.completed_at IS NULL;
+        """,
+        (channel_id,),
+    )
+    row = cur.fetchone()
+    return (row[0], row[1], int(row[2])) if row else None
+
+
+def save_backfill_progress(
+    cur,
+    channel_id: str,
+    *,
+    page_token: Optional[str],
+    pages: int,
+    videos: int,
+) -> None:
+    """Advance the cursor past `pages` loaded pages; a None page_token marks the playlist done."""
+    cur.execute(
+        """
+        UPDATE core.channel_backfills
+        SET page_token = %s,
+            pages_done = pages_done + %s,
+            videos_loaded = videos_loaded + %s,
+            completed_at = CASE WHEN %s::text IS NULL THEN now() END,
+            updated_at = now()
+        WHERE channel_id = %s;
+        """,
+        (page_token, pages, videos, page_token, channel_id),
+    )
+
+
+def _copy_text(v) -> str:
+    # COPY text format: backslash escapes, \N for NULL.
+    if v is None:
+        return "\\N"
+    return str(v).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> None:
+    """Bulk-load rows with COPY ... FROM STDIN."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def bulk_load_videos(cur, rows: Sequence[VideoRow], *, pulled_at: datetime) -> Tuple[int, int]:
+    """
+    COPY parsed videos.list rows into a session temp table, then upsert core.videos and insert
+    a baseline snapshot at `pulled_at` for videos that have none. Must run inside a transaction
+    (the stage table empties on commit). Returns (videos written, snapshots inserted).
+    """
+    if not rows:
+        return 0, 0
+    cur.execute(_STAGE_DDL)
+    copy_rows(cur, "backfill_videos_stage", VIDEO_COLUMNS, rows)
+    cur.execute(_UPSERT_VIDEOS_SQL)
+    videos = cur.rowcount
+    cur.execute(_INSERT_SNAPSHOTS_SQL, (pulled_at,))
+    return videos, cur.rowcount
@@ -0,0 +1,136 @@
+"""
+Benchmark: latest-snapshot lookups on a plain heap vs the monthly-partitioned layout
+(migrations/012_partition_video_stats_snapshots.sql) as history grows.
+
+Builds both layouts in a scratch schema, appends one synthetic month at a time, and after each
+month times `ORDER BY pulled_at DESC LIMIT 1` lookups for random videos. With ordered Append the
+partitioned query only touches the newest partition, so its buffer count stays flat. Finally it
+compares retiring the oldest month with DELETE vs DETACH + DROP.
+
+  python -m ytb_elt.db.bench_partitions --dsn "$DATABASE_URL" --videos 200 --per-day 24 --months 24
+
+The scratch schema is dropped afterwards; nothing in core.* is touched.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+import psycopg2
+
+SCHEMA = "bench_partitions"
+
+_LATEST_SQL = "SELECT pulled_at, view_count FROM {table} WHERE video_id = %s ORDER BY pulled_at DESC LIMIT 1;"
+
+
+def _month(start: date, offset: int) -> date:
+    y, m = divmod(start.month - 1 + offset, 12)
+    return date(start.year + y, m + 1, 1)
+
+
+def _setup(cur) -> None:
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+    for table, suffix in (("heap", ""), ("part", " PARTITION BY RANGE (pulled_at)")):
+        cur.execute(
+            f"""
+            CREATE TABLE {SCHEMA}.{table} (
+              video_id text NOT NULL,
+              pulled_at timestamptz NOT NULL,
+              view_count bigint,
+              UNIQUE (video_id, pulled_at)
+            ){suffix};
+            CREATE INDEX ON {SCHEMA}.{table}(video_id, pulled_at DESC);
+            """
+        )
+
+
+def _load_month(cur, month_start: date, month_end: date, videos: int, per_day: int) -> None:
+    part = f"part_p{month_start:%Y%m}"
+    cur.execute(
+        f"CREATE TABLE {SCHEMA}.{part} PARTITION OF {SCHEMA}.part FOR VALUES FROM (%s) TO (%s);",
+        (month_start, month_end),
+    )
+    for table in ("heap", "part"):
+        cur.execute(
+            f"""
+            INSERT INTO {SCHEMA}.{table}(video_id, pulled_at, view_count)
+            SELECT 'v' || v, t, (extract(epoch FROM t)::bigint / 60) * v
+            FROM generate_series(1, %s) AS v,
+                 generate_series(%s::timestamptz, %s::timestamptz - interval '1 second', %s::interval) AS t;
+            """,
+            (videos, month_start, month_end, f"{86400 // per_day} seconds"),
+        )
+    cur.execute(f"ANALYZE {SCHEMA}.heap; ANALYZE {SCHEMA}.part;")
+
+
+def _time_lookups(cur, table: str, video_ids: Sequence[str]) -> Tuple[float, int]:
+    """(median ms, shared buffers touched by one lookup)."""
+    sql = _LATEST_SQL.format(table=f"{SCHEMA}.{table}")
+    samples: List[float] = []
+    for vid in video_ids:
+        t0 = time.perf_counter()
+        cur.execute(sql, (vid,))
+        cur.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, (video_ids[0],))
+    plan = cur.fetchone()[0][0]["Plan"]
+    buffers = int(plan.get("Shared Hit Blocks", 0)) + int(plan.get("Shared Read Blocks", 0))
+    return statistics.median(samples), buffers
+
+
+def _retire_oldest(cur, oldest: date, next_month: date) -> Tuple[float, float]:
+    t0 = time.perf_counter()
+    cur.execute(f"DELETE FROM {SCHEMA}.heap WHERE pulled_at < %s;", (next_month,))
+    delete_ms = (time.perf_counter() - t0) * 1000.0
+
+    part = f"part_p{oldest:%Y%m}"
+    t0 = time.perf_counter()
+    cur.execute(f"ALTER TABLE {SCHEMA}.part DETACH PARTITION {SCHEMA}.{part}; DROP TABLE {SCHEMA}.{part};")
+    drop_ms = (time.perf_counter() - t0) * 1000.0
+    return delete_ms, drop_ms
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", ""), help="Postgres DSN (default: $DATABASE_URL)")
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--per-day", type=int, default=24, help="Snapshots per video per day (ingest does 96)")
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--lookups", type=int, default=200, help="Timed lookups per layout per month")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema for inspection")
+    args = parser.parse_args(argv)
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    start = date(2024, 1, 1)
+    rng = random.Random(7)
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            _setup(cur)
+            print(f"{'months':>6} {'rows':>12} {'heap ms':>9} {'part ms':>9} {'heap buf':>9} {'part buf':>9}")
+            for i in range(args.months):
+                _load_month(cur, _month(start, i), _month(start, i + 1), args.videos, args.per_day)
+                ids = [f"v{rng.randint(1, args.videos)}" for _ in range(args.lookups)]
+                heap_ms, heap_buf = _time_lookups(cur, "heap", ids)
+                part_ms, part_buf = _time_lookups(cur, "part", ids)
+                cur.execute(f"SELECT count(*) FROM {SCHEMA}.heap;")
+                rows = cur.fetchone()[0]
+                print(f"{i + 1:>6} {rows:>12,} {heap_ms:>9.3f} {part_ms:>9.3f} {heap_buf:>9} {part_buf:>9}")
+
+            delete_ms, drop_ms = _retire_oldest(cur, start, _month(start, 1))
+            print(f"\nRetire oldest month: DELETE {delete_ms:.1f} ms vs DETACH + DROP {drop_ms:.1f} ms")
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE;")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+
+def refresh_channel_summary(
+    cur,
+    *,
+    channel_id: str,
+    pulled_at: Optional[datetime],
+    views_total: Optional[int],
+    likes_total: Optional[int],
+    comments_total: Optional[int],
+) -> None:
+    """
+    Upsert core.channel_stats_summary after a channel's videos were ingested.
+
+    pulled_at is the snapshot time if this pull wrote any snapshots for the channel, else None
+    (last_snapshot_at then keeps its previous value). Totals are None when the pull returned no
+    stats, which also keeps the previous values.
+    """
+    cur.execute(
+        """
+        INSERT INTO core.channel_stats_summary AS s(
+          channel_id, last_snapshot_at, videos_count,
+          latest_views_total, latest_likes_total, latest_comments_total, updated_at
+        )
+        SELECT %s, %s, count(*), %s, %s, %s, now()
+        FROM core.videos
+        WHERE channel_id = %s
+        ON CONFLICT (channel_id) DO UPDATE
+          SET last_snapshot_at = GREATEST(s.last_snapshot_at, EXCLUDED.last_snapshot_at),
+              videos_count = EXCLUDED.videos_count,
+              latest_views_total = COALESCE(EXCLUDED.latest_views_total, s.latest_views_total),
+              latest_likes_total = COALESCE(EXCLUDED.latest_likes_total, s.latest_likes_total),
+              latest_comments_total = COALESCE(EXCLUDED.latest_comments_total, s.latest_comments_total),
+              updated_at = now();
+        """,
+        (channel_id, pulled_at, views_total, likes_total, comments_total, channel_id),
+    )
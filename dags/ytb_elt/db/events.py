@@ -0,0 +1,11 @@
+# Postgres NOTIFY channel the web app listens on to invalidate its caches
+# (mirrors app/notify_listener.py DATA_CHANGED_CHANNEL).
+DATA_CHANGED_CHANNEL = "ytb_data_changed"
+
+
+def notify_data_changed(cur, watchlist_id: str = "*") -> None:
+    """
+    Tell listeners that data behind a watchlist changed ("*" = anything may have changed).
+    Delivered when the surrounding transaction commits (immediately under autocommit).
+    """
+    cur.execute("SELECT pg_notify(%s, %s);", (DATA_CHANGED_CHANNEL, watchlist_id))
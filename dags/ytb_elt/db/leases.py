@@ -0,0 +1,49 @@
+from datetime import timedelta
+from typing import List, Sequence
+
+# core.ingest_leases (migrations/015_ingest_leases.sql).
+
+
+def channel_lease_key(channel_id: str) -> str:
+    return f"channel:{channel_id}"
+
+
+def acquire_leases(cur, keys: Sequence[str], *, holder: str, ttl: timedelta) -> List[str]:
+    """
+    Take the leases for `keys` that are free, expired, or already held by `holder` (so a
+    retried task gets its own leases back), extending them to now() + ttl. Returns the keys
+    now held by `holder`; the rest belong to another live holder and should be skipped.
+    """
+    if not keys:
+        return []
+    cur.execute(
+        """
+        INSERT INTO core.ingest_leases AS l(lease_key, holder, acquired_at, expires_at)
+        SELECT k, %s, now(), now() + %s FROM unnest(%s::text[]) AS k
+        ON CONFLICT (lease_key) DO UPDATE
+          SET holder = EXCLUDED.holder,
+              acquired_at = CASE WHEN l.holder = EXCLUDED.holder THEN l.acquired_at ELSE now() END,
+              expires_at = EXCLUDED.expires_at
+          WHERE l.holder = EXCLUDED.holder OR l.expires_at < now()
+        RETURNING lease_key;
+        """,
+        (holder, ttl, list(keys)),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def release_leases(cur, keys: Sequence[str], *, holder: str) -> int:
+    """Drop `holder`'s leases on `keys` (leases since reclaimed by others are left alone)."""
+    if not keys:
+        return 0
+    cur.execute(
+        "DELETE FROM core.ingest_leases WHERE holder = %s AND lease_key = ANY(%s);",
+        (holder, list(keys)),
+    )
+    return cur.rowcount
+
+
+def release_holder_leases(cur, *, holder: str) -> int:
+    """Drop every lease `holder` still has, e.g. when its run ends."""
+    cur.execute("DELETE FROM core.ingest_leases WHERE holder = %s;", (holder,))
+    return cur.rowcount
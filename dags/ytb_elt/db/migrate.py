@@ -1,68 +1,158 @@
+import argparse
 import hashlib
 import logging
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from airflow.providers.postgres.hooks.postgres import PostgresHook
+import psycopg2
+import psycopg2.errors
 
 logger = logging.getLogger(__name__)
 
+# pg_advisory_lock key serialising appliers across DAG tasks and app processes.
+MIGRATIONS_LOCK_KEY = 7_220_431_001
+
+_STATE_DDL = """
+CREATE SCHEMA IF NOT EXISTS core;
+CREATE TABLE IF NOT EXISTS core.schema_migrations (
+  version text PRIMARY KEY,
+  applied_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS core.schema_migrations_manifest (
+  id boolean PRIMARY KEY DEFAULT true CHECK (id),
+  manifest text NOT NULL,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+# path -> (mtime_ns, size, version): files are only re-read and re-hashed when they change.
+_version_cache: Dict[str, Tuple[int, int, str]] = {}
+
+
+@dataclass(frozen=True)
+class Migration:
+    path: Path
+    version: str
+
 
 def _migration_version(path: Path) -> str:
     # Use filename + content hash to prevent silent edits to already-applied migrations.
-    content = path.read_bytes()
-    h = hashlib.sha256(content).hexdigest()[:16]
-    return f"{path.name}:{h}"
-
+    st = path.stat()
+    cached = _version_cache.get(str(path))
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    h = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+    version = f"{path.name}:{h}"
+    _version_cache[str(path)] = (st.st_mtime_ns, st.st_size, version)
+    return version
 
-def apply_sql_migrations(*, postgres_conn_id: str, migrations_dir: str) -> List[str]:
-    """
-    Applies *.sql migrations in sorted order, recording each applied migration in core.schema_migrations.
-    Returns a list of applied migration versions.
-    """
-    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
-    applied: List[str] = []
 
+def load_manifest(migrations_dir: str) -> Tuple[List[Migration], str]:
+    """*.sql migrations in apply order, plus a hash over all their versions."""
     mig_dir = Path(migrations_dir)
     if not mig_dir.exists():
         raise FileNotFoundError(f"migrations_dir not found: {migrations_dir}")
+    migrations = [Migration(path=p, version=_migration_version(p)) for p in sorted(mig_dir.glob("*.sql")) if p.is_file()]
+    manifest = hashlib.sha256("\n".join(m.version for m in migrations).encode("utf-8")).hexdigest()
+    return migrations, manifest
+
+
+def _applied_manifest(cur) -> Optional[str]:
+    try:
+        cur.execute("SELECT manifest FROM core.schema_migrations_manifest;")
+    except psycopg2.errors.UndefinedTable:
+        # Database the runner has never touched (or one migrated before the manifest existed).
+        return None
+    row = cur.fetchone()
+    return row[0] if row else None
 
-    sql_files = sorted([p for p in mig_dir.glob("*.sql") if p.is_file()])
-    if not sql_files:
+
+def run_migrations(conn, migrations_dir: str) -> List[str]:
+    """
+    Apply pending *.sql migrations on a psycopg2 connection, recording each in
+    core.schema_migrations, and return the versions applied.
+
+    When the stored manifest hash matches the files on disk this is a single SELECT. Otherwise
+    appliers take a session advisory lock, re-check, fetch all applied versions in one query
+    and run what is missing in file order; each file executes as one implicit transaction.
+    """
+    migrations, manifest = load_manifest(migrations_dir)
+    if not migrations:
         logger.warning("No SQL migrations found in %s", migrations_dir)
-        return applied
+        return []
 
-    with hook.get_conn() as conn:
-        conn.autocommit = True
-        with conn.cursor() as cur:
-            # Ensure schemas table exists early (migration 001 creates it, but this makes re-runs safe).
-            cur.execute("CREATE SCHEMA IF NOT EXISTS core;")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        if _applied_manifest(cur) == manifest:
+            return []
+
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_KEY,))
+        try:
+            # Another applier may have finished while we waited for the lock.
+            if _applied_manifest(cur) == manifest:
+                return []
+            cur.execute(_STATE_DDL)
+            cur.execute("SELECT version FROM core.schema_migrations;")
+            done = {row[0] for row in cur.fetchall()}
+
+            applied = _apply_pending(cur, [m for m in migrations if m.version not in done])
             cur.execute(
                 """
-                CREATE TABLE IF NOT EXISTS core.schema_migrations (
-                  version text PRIMARY KEY,
-                  applied_at timestamptz NOT NULL DEFAULT now()
-                );
-                """
+                INSERT INTO core.schema_migrations_manifest(id, manifest, updated_at)
+                VALUES (true, %s, now())
+                ON CONFLICT (id) DO UPDATE SET manifest = EXCLUDED.manifest, updated_at = now();
+                """,
+                (manifest,),
             )
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATIONS_LOCK_KEY,))
+    return applied
 
-            for path in sql_files:
-                version = _migration_version(path)
-                cur.execute("SELECT 1 FROM core.schema_migrations WHERE version = %s;", (version,))
-                if cur.fetchone():
-                    continue
-
-                sql = path.read_text(encoding="utf-8")
-                logger.info("Applying migration %s", version)
-                cur.execute(sql)
-                cur.execute("INSERT INTO core.schema_migrations(version) VALUES (%s);", (version,))
-                applied.append(version)
 
+def _apply_pending(cur, pending: Sequence[Migration]) -> List[str]:
+    applied: List[str] = []
+    for m in pending:
+        logger.info("Applying migration %s", m.version)
+        cur.execute(m.path.read_text(encoding="utf-8"))
+        cur.execute("INSERT INTO core.schema_migrations(version) VALUES (%s);", (m.version,))
+        applied.append(m.version)
     return applied
 
 
+def apply_sql_migrations(*, postgres_conn_id: str, migrations_dir: str) -> List[str]:
+    """Airflow entry point: run_migrations on the given Postgres connection."""
+    from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+    with PostgresHook(postgres_conn_id=postgres_conn_id).get_conn() as conn:
+        return run_migrations(conn, migrations_dir)
+
+
 def migrations_dir_default() -> str:
     # In docker-compose we mount ./migrations -> /opt/airflow/migrations
     return os.getenv("MIGRATIONS_DIR", "/opt/airflow/migrations")
 
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Deploy-time entry point (docker compose runs it once as the db-migrate service)."""
+    parser = argparse.ArgumentParser(description="Apply pending SQL migrations.")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", ""), help="Postgres DSN (default: $DATABASE_URL)")
+    parser.add_argument("--migrations-dir", default=migrations_dir_default())
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        applied = run_migrations(conn, args.migrations_dir)
+    finally:
+        conn.close()
+    logger.info("%d migration(s) applied", len(applied))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+# Months of core.video_stats_snapshots partitions kept ready ahead of the current one.
+SNAPSHOT_PARTITIONS_AHEAD_MONTHS = 2
+
+
+def ensure_snapshot_partitions(cur, *, now: Optional[datetime] = None, months_ahead: int = SNAPSHOT_PARTITIONS_AHEAD_MONTHS) -> int:
+    """
+    Create any missing monthly partitions from the current month through `months_ahead`
+    (migrations/012_partition_video_stats_snapshots.sql). Returns the number created.
+    """
+    cur.execute(
+        """
+        SELECT core.ensure_video_stats_partitions(
+          COALESCE(%s, now()),
+          COALESCE(%s, now()) + make_interval(months => %s)
+        );
+        """,
+        (now, now, months_ahead),
+    )
+    return int(cur.fetchone()[0])
+
@@ -0,0 +1,32 @@
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from psycopg2.extras import Json
+
+# core.ingest_progress (migrations/016_ingest_progress.sql).
+
+
+def completed_units(cur, *, run_id: str, stage: str) -> Dict[str, Any]:
+    """unit_key -> payload (None if the unit stored none) for everything `run_id` finished in `stage`."""
+    cur.execute(
+        "SELECT unit_key, payload FROM core.ingest_progress WHERE run_id = %s AND stage = %s;",
+        (run_id, stage),
+    )
+    return {unit: payload for unit, payload in cur.fetchall()}
+
+
+def mark_done(cur, *, run_id: str, stage: str, unit_key: str, payload: Optional[Any] = None) -> None:
+    cur.execute(
+        """
+        INSERT INTO core.ingest_progress(run_id, stage, unit_key, payload)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (run_id, stage, unit_key) DO UPDATE
+          SET payload = EXCLUDED.payload, completed_at = now();
+        """,
+        (run_id, stage, unit_key, Json(payload) if payload is not None else None),
+    )
+
+
+def prune_progress(cur, *, older_than: timedelta) -> int:
+    cur.execute("DELETE FROM core.ingest_progress WHERE completed_at < now() - %s;", (older_than,))
+    return cur.rowcount
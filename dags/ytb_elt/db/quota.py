@@ -0,0 +1,65 @@
+from datetime import date
+from typing import Tuple
+
+# core.api_quota_usage (migrations/017_channel_backfills.sql).
+
+# YouTube Data API quota resets at midnight Pacific time.
+_QUOTA_DAY = "(now() AT TIME ZONE 'America/Los_Angeles')::date"
+
+
+def quota_day(cur) -> date:
+    """The current YouTube quota day."""
+    cur.execute(f"SELECT {_QUOTA_DAY};")
+    return cur.fetchone()[0]
+
+
+def reserve_quota(cur, *, consumer: str, units: int, daily_limit: int) -> Tuple[date, int]:
+    """
+    Reserve up to `units` of today's quota for `consumer` without exceeding `daily_limit`.
+    Returns (quota_day, units granted); 0 units once the day's budget is spent. Refunds
+    go to the returned day. The row lock makes concurrent reservers (e.g. mapped tasks)
+    queue rather than overshoot.
+    """
+    day = quota_day(cur)
+    if units <= 0 or daily_limit <= 0:
+        return day, 0
+    cur.execute(
+        """
+        INSERT INTO core.api_quota_usage(quota_day, consumer, units)
+        VALUES (%s, %s, 0)
+        ON CONFLICT (quota_day, consumer) DO NOTHING;
+        """,
+        (day, consumer),
+    )
+    cur.execute(
+        """
+        WITH old AS (
+          SELECT units FROM core.api_quota_usage
+          WHERE quota_day = %(day)s AND consumer = %(consumer)s
+          FOR UPDATE
+        )
+        UPDATE core.api_quota_usage q
+        SET units = GREATEST(old.units, LEAST(old.units + %(units)s, %(limit)s)),
+            updated_at = now()
+        FROM old
+        WHERE q.quota_day = %(day)s AND q.consumer = %(consumer)s
+        RETURNING q.units - old.units;
+        """,
+        {"day": day, "consumer": consumer, "units": units, "limit": daily_limit},
+    )
+    row = cur.fetchone()
+    return day, (int(row[0]) if row else 0)
+
+
+def refund_quota(cur, *, consumer: str, quota_day: date, units: int) -> None:
+    """Return reserved units that were not spent to the day they were reserved on."""
+    if units <= 0:
+        return
+    cur.execute(
+        """
+        UPDATE core.api_quota_usage
+        SET units = GREATEST(units - %s, 0), updated_at = now()
+        WHERE quota_day = %s AND consumer = %s;
+        """,
+        (units, quota_day, consumer),
+    )
@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# Tables and state from migrations/013_snapshot_rollups.sql. Buckets are UTC hours/days.
+
+# Select list shared by both tiers: (video_id, bucket_start) come first, then these columns.
+_ROLLUP_COLUMNS = (
+    "samples, first_pulled_at, last_pulled_at, "
+    "first_views, last_views, max_views, "
+    "first_likes, last_likes, max_likes, "
+    "first_comments, last_comments, max_comments"
+)
+
+_UPSERT_SET = ",\n  ".join(
+    f"{c.strip()} = EXCLUDED.{c.strip()}" for c in _ROLLUP_COLUMNS.split(",")
+) + ",\n  updated_at = now()"
+
+
+def _state(cur, tier: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+    cur.execute("SELECT rolled_through, pruned_before FROM core.snapshot_rollup_state WHERE tier = %s;", (tier,))
+    row = cur.fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _set_state(cur, tier: str, *, rolled_through: Optional[datetime] = None, pruned_before: Optional[datetime] = None) -> None:
+    cur.execute(
+        """
+        INSERT INTO core.snapshot_rollup_state AS st(tier, rolled_through, pruned_before, updated_at)
+        VALUES (%s, %s, %s, now())
+        ON CONFLICT (tier) DO UPDATE
+          SET rolled_through = COALESCE(EXCLUDED.rolled_through, st.rolled_through),
+              pruned_before = COALESCE(EXCLUDED.pruned_before, st.pruned_before),
+              updated_at = now();
+        """,
+        (tier, rolled_through, pruned_before),
+    )
+
+
+def _utc_trunc(cur, unit: str, ts: datetime) -> datetime:
+    cur.execute("SELECT date_trunc(%s, %s::timestamptz AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';", (unit, ts))
+    return cur.fetchone()[0]
+
+
+def rollup_hourly(cur, *, now: datetime, lag: timedelta = timedelta(minutes=15), max_window: timedelta = timedelta(days=7)) -> Tuple[Optional[datetime], int]:
+    """
+    Aggregate complete UTC hours of raw snapshots into core.video_stats_hourly, starting at the
+    'hourly' watermark. An hour counts as complete `lag` after it ends (in-flight ingest runs);
+    `max_window` bounds the first backfill. Buckets are recomputed from raw rows, so re-running
+    a window is idempotent. Returns (new watermark, rows upserted).
+    """
+    rolled_through, _ = _state(cur, "hourly")
+    if rolled_through is None:
+        cur.execute("SELECT min(pulled_at) FROM core.video_stats_snapshots;")
+        first = cur.fetchone()[0]
+        if first is None:
+            return None, 0
+        rolled_through = _utc_trunc(cur, "hour", first)
+
+    hi = min(_utc_trunc(cur, "hour", now - lag), rolled_through + max_window)
+    if hi <= rolled_through:
+        return rolled_through, 0
+
+    cur.execute(
+        f"""
+        INSERT INTO core.video_stats_hourly(video_id, bucket_start, {_ROLLUP_COLUMNS})
+        SELECT
+          video_id,
+          date_trunc('hour', pulled_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+          count(*),
+          min(pulled_at),
+          max(pulled_at),
+          (array_agg(view_count ORDER BY pulled_at))[1],
+          (array_agg(view_count ORDER BY pulled_at DESC))[1],
+          max(view_count),
+          (array_agg(like_count ORDER BY pulled_at))[1],
+          (array_agg(like_count ORDER BY pulled_at DESC))[1],
+          max(like_count),
+          (array_agg(comment_count ORDER BY pulled_at))[1],
+          (array_agg(comment_count ORDER BY pulled_at DESC))[1],
+          max(comment_count)
+        FROM core.video_stats_snapshots
+        WHERE pulled_at >= %s AND pulled_at < %s
+        GROUP BY 1, 2
+        ON CONFLICT (video_id, bucket_start) DO UPDATE SET
+          {_UPSERT_SET};
+        """,
+        (rolled_through, hi),
+    )
+    upserted = cur.rowcount
+    _set_state(cur, "hourly", rolled_through=hi)
+    return hi, upserted
+
+
+def rollup_daily(cur) -> Tuple[Optional[datetime], int]:
+    """
+    Aggregate complete UTC days of core.video_stats_hourly into core.video_stats_daily, up to the
+    last day whose hours are all rolled up. Returns (new watermark, rows upserted).
+    """
+    hourly_through, _ = _state(cur, "hourly")
+    if hourly_through is None:
+        return None, 0
+    hi = _utc_trunc(cur, "day", hourly_through)
+
+    rolled_through, _ = _state(cur, "daily")
+    if rolled_through is None:
+        cur.execute("SELECT min(bucket_start) FROM core.video_stats_hourly;")
+        first = cur.fetchone()[0]
+        if first is None:
+            return None, 0
+        rolled_through = _utc_trunc(cur, "day", first)
+    if hi <= rolled_through:
+        return rolled_through, 0
+
+    cur.execute(
+        f"""
+        INSERT INTO core.video_stats_daily(video_id, bucket_start, {_ROLLUP_COLUMNS})
+        SELECT
+          video_id,
+          date_trunc('day', bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+          sum(samples),
+          min(first_pulled_at),
+          max(last_pulled_at),
+          (array_agg(first_views ORDER BY bucket_start))[1],
+          (array_agg(last_views ORDER BY bucket_start DESC))[1],
+          max(max_views),
+          (array_agg(first_likes ORDER BY bucket_start))[1],
+          (array_agg(last_likes ORDER BY bucket_start DESC))[1],
+          max(max_likes),
+          (array_agg(first_comments ORDER BY bucket_start))[1],
+          (array_agg(last_comments ORDER BY bucket_start DESC))[1],
+          max(max_comments)
+        FROM core.video_stats_hourly
+        WHERE bucket_start >= %s AND bucket_start < %s
+        GROUP BY 1, 2
+        ON CONFLICT (video_id, bucket_start) DO UPDATE SET
+          {_UPSERT_SET};
+        """,
+        (rolled_through, hi),
+    )
+    upserted = cur.rowcount
+    _set_state(cur, "daily", rolled_through=hi)
+    return hi, upserted
+
+
+def prune_raw_snapshots(
+    cur, *, now: datetime, horizon: timedelta, keep_from: Optional[datetime] = None
+) -> Tuple[Optional[datetime], int]:
+    """
+    Delete raw snapshots older than `horizon`, but never past the hourly watermark nor past
+    `keep_from` (e.g. what the Parquet archive covers). Whole monthly partitions go via
+    DETACH + DROP (migrations/012), the remainder with DELETE. Returns (new raw start, rows
+    deleted by DELETE).
+    """
+    hourly_through, _ = _state(cur, "hourly")
+    if hourly_through is None:
+        return None, 0
+    cutoff = min(_utc_trunc(cur, "hour", now - horizon), hourly_through)
+    if keep_from is not None:
+        cutoff = min(cutoff, keep_from)
+    _, pruned_before = _state(cur, "raw")
+    if pruned_before is not None and cutoff <= pruned_before:
+        return pruned_before, 0
+
+    # Publish the new boundary first so core.video_stats_history switches tiers atomically.
+    _set_state(cur, "raw", pruned_before=cutoff)
+    cur.execute("SELECT core.drop_video_stats_partitions_before(%s);", (cutoff,))
+    cur.execute("DELETE FROM core.video_stats_snapshots WHERE pulled_at < %s;", (cutoff,))
+    return cutoff, cur.rowcount
+
+
+def prune_hourly_rollups(cur, *, now: datetime, horizon: timedelta) -> Tuple[Optional[datetime], int]:
+    """Delete hourly rows older than `horizon` once their days are in core.video_stats_daily."""
+    daily_through, _ = _state(cur, "daily")
+    if daily_through is None:
+        return None, 0
+    cutoff = min(_utc_trunc(cur, "day", now - horizon), daily_through)
+    _, pruned_before = _state(cur, "hourly")
+    if pruned_before is not None and cutoff <= pruned_before:
+        return pruned_before, 0
+
+    _set_state(cur, "hourly", pruned_before=cutoff)
+    cur.execute("DELETE FROM core.video_stats_hourly WHERE bucket_start < %s;", (cutoff,))
+    return cutoff, cur.rowcount
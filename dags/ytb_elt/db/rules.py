@@ -0,0 +1,38 @@
+from dataclasses import replace as dc_replace
+
+from ytb_elt.logic.alerts import AlertRule, default_rules_for
+
+
+def load_alert_rule(cur, *, watchlist_id: str, video_type: str) -> AlertRule:
+    """
+    Load per-watchlist alert rules from Postgres if present (core.alert_rules),
+    else fallback to code defaults.
+    """
+    rule = default_rules_for(video_type, watchlist_id)
+    try:
+        cur.execute(
+            """
+            SELECT baseline_window_videos, baseline_hours, multiplier, abs_floor_vph,
+                   min_age_minutes, max_age_hours, daily_cap_per_channel
+            FROM core.alert_rules
+            WHERE watchlist_id=%s AND video_type=%s;
+            """,
+            (watchlist_id, video_type),
+        )
+        row = cur.fetchone()
+        if not row:
+            return rule
+        (baseline_window_videos, baseline_hours, multiplier, abs_floor_vph, min_age_minutes, max_age_hours, daily_cap_per_channel) = row
+        return dc_replace(
+            rule,
+            baseline_window_videos=int(baseline_window_videos),
+            baseline_hours=float(baseline_hours),
+            multiplier=float(multiplier),
+            abs_floor_vph=float(abs_floor_vph),
+            min_age_minutes=int(min_age_minutes),
+            max_age_hours=float(max_age_hours),
+            daily_cap_per_channel=int(daily_cap_per_channel),
+        )
+    except Exception:
+        # If the table doesn't exist yet (or any other issue), keep defaults.
+        return rule
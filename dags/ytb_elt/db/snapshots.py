@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Values of the SNAPSHOT_WRITE_MODE Airflow Variable (migrations/014_snapshot_last_confirmed.sql).
+WRITE_MODE_FULL = "full"
+WRITE_MODE_CHANGES = "changes"
+WRITE_MODES = (WRITE_MODE_FULL, WRITE_MODE_CHANGES)
+
+# In "changes" mode an unchanged video still gets a new row once its latest one is this old.
+KEYFRAME_INTERVAL = timedelta(hours=24)
+
+_INSERT_SQL = """
+INSERT INTO core.video_stats_snapshots(video_id, pulled_at, view_count, like_count, comment_count)
+VALUES (%(video_id)s, %(pulled_at)s, %(view_count)s, %(like_count)s, %(comment_count)s)
+ON CONFLICT (video_id, pulled_at) DO NOTHING;
+"""
+
+# One round trip: confirm the previous row if nothing changed, otherwise insert.
+_CONFIRM_OR_INSERT_SQL = """
+WITH prev AS (
+  SELECT id, pulled_at, view_count, like_count, comment_count
+  FROM core.video_stats_snapshots
+  WHERE video_id = %(video_id)s AND pulled_at <= %(pulled_at)s
+  ORDER BY pulled_at DESC
+  LIMIT 1
+),
+confirmed AS (
+  UPDATE core.video_stats_snapshots s
+  SET last_confirmed_at = %(pulled_at)s
+  FROM prev
+  WHERE s.id = prev.id
+    AND s.pulled_at = prev.pulled_at
+    -- A row at this very pulled_at means this pull was already recorded (task retry).
+    AND prev.pulled_at < %(pulled_at)s
+    AND prev.pulled_at > %(pulled_at)s - %(keyframe)s
+    AND prev.view_count IS NOT DISTINCT FROM %(view_count)s
+    AND prev.like_count IS NOT DISTINCT FROM %(like_count)s
+    AND prev.comment_count IS NOT DISTINCT FROM %(comment_count)s
+  RETURNING 1
+),
+inserted AS (
+  INSERT INTO core.video_stats_snapshots(video_id, pulled_at, view_count, like_count, comment_count)
+  SELECT %(video_id)s, %(pulled_at)s, %(view_count)s, %(like_count)s, %(comment_count)s
+  WHERE NOT EXISTS (SELECT 1 FROM confirmed)
+  ON CONFLICT (video_id, pulled_at) DO NOTHING
+  RETURNING 1
+)
+SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM confirmed);
+"""
+
+
+def write_snapshot(
+    cur,
+    *,
+    video_id: str,
+    pulled_at: datetime,
+    view_count: Optional[int],
+    like_count: Optional[int],
+    comment_count: Optional[int],
+    changes_only: bool = False,
+    keyframe_interval: timedelta = KEYFRAME_INTERVAL,
+) -> Optional[str]:
+    """
+    Record one pull of a video's counts. Returns "inserted" for a new row, "confirmed" when
+    `changes_only` extended the previous row's last_confirmed_at instead, or None when a row
+    for (video_id, pulled_at) already existed.
+    """
+    params = {
+        "video_id": video_id,
+        "pulled_at": pulled_at,
+        "view_count": view_count,
+        "like_count": like_count,
+        "comment_count": comment_count,
+        "keyframe": keyframe_interval,
+    }
+    if not changes_only:
+        cur.execute(_INSERT_SQL, params)
+        return "inserted" if cur.rowcount == 1 else None
+
+    cur.execute(_CONFIRM_OR_INSERT_SQL, params)
+    inserted, confirmed = cur.fetchone()
+    if inserted:
+        return "inserted"
+    return "confirmed" if confirmed else None
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Optional
+
+# The DO UPDATE only fires when some metadata column actually differs, so re-pulling an
+# unchanged video writes no new tuple (no dead row, WAL record or index churn on core.videos).
+# xmax = 0 on the returned row means it was freshly inserted rather than updated.
+_UPSERT_VIDEO_SQL = """
+INSERT INTO core.videos AS v(video_id, channel_id, title, published_at, duration_seconds, video_type, updated_at)
+VALUES (%s, %s, %s, %s, %s, %s, now())
+ON CONFLICT (video_id) DO UPDATE
+  SET title = EXCLUDED.title,
+      channel_id = EXCLUDED.channel_id,
+      published_at = EXCLUDED.published_at,
+      duration_seconds = EXCLUDED.duration_seconds,
+      video_type = EXCLUDED.video_type,
+      updated_at = now()
+  WHERE (v.title, v.channel_id, v.published_at, v.duration_seconds, v.video_type)
+    IS DISTINCT FROM
+        (EXCLUDED.title, EXCLUDED.channel_id, EXCLUDED.published_at, EXCLUDED.duration_seconds, EXCLUDED.video_type)
+RETURNING (xmax = 0);
+"""
+
+
+def upsert_video(
+    cur,
+    *,
+    video_id: str,
+    channel_id: str,
+    title: str,
+    published_at: datetime,
+    duration_seconds: int,
+    video_type: str,
+) -> Optional[str]:
+    """
+    Insert or update one core.videos row. Returns "inserted", "updated", or None when the
+    stored metadata already matched (nothing written).
+    """
+    cur.execute(_UPSERT_VIDEO_SQL, (video_id, channel_id, title, published_at, duration_seconds, video_type))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return "inserted" if row[0] else "updated"
@@ -1,5 +1,32 @@
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+
 def compute_views_per_hour(delta_views: int, delta_seconds: float) -> float:
     if delta_seconds <= 0:
         raise ValueError("delta_seconds must be > 0")
     return float(delta_views) / (float(delta_seconds) / 3600.0)
 
+
+def latest_observations(
+    rows: Sequence[Tuple[datetime, Optional[datetime], int]],
+) -> Optional[Tuple[Tuple[datetime, int], Tuple[datetime, int]]]:
+    """
+    The (newer, older) (time, views) pair VPH is computed from, given a video's newest
+    snapshot rows as (pulled_at, last_confirmed_at, views), newest first.
+
+    A row with last_confirmed_at held the same views from pulled_at until then, so when the
+    newest row was confirmed the pair spans that unchanged run (VPH 0). Otherwise the older
+    observation is the previous row's last confirmation, or its pulled_at. With full writes
+    (no confirmations) this is simply the last two rows. None if there is no pair yet.
+    """
+    if not rows:
+        return None
+    pulled_at, confirmed_at, views = rows[0]
+    if confirmed_at is not None:
+        return (confirmed_at, views), (pulled_at, views)
+    if len(rows) < 2:
+        return None
+    prev_pulled_at, prev_confirmed_at, prev_views = rows[1]
+    prev_t = prev_confirmed_at if prev_confirmed_at is not None else prev_pulled_at
+    return (pulled_at, views), (prev_t, prev_views)
@@ -0,0 +1,83 @@
+"""
+Vectorised counterparts of ytb_elt.logic.metrics / ytb_elt.logic.alerts.
+
+Each function takes column arrays (one entry per candidate video) and must stay in exact
+parity with the scalar versions; see tests/v0_unit_test.py.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from ytb_elt.logic.alerts import AlertRule
+
+
+def views_per_hour(delta_views, delta_seconds) -> np.ndarray:
+    """
+    Array version of compute_views_per_hour.
+    Entries where the scalar function raises (delta_seconds <= 0) or inputs are missing are NaN.
+    """
+    dv = np.asarray(delta_views, dtype=np.float64)
+    ds = np.asarray(delta_seconds, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vph = dv / (ds / 3600.0)
+    return np.where(ds > 0, vph, np.nan)
+
+
+def latest_views_per_hour(delta_views, delta_seconds) -> np.ndarray:
+    """
+    VPH as the alerts DAG derives it from the last two snapshots: like views_per_hour,
+    but a negative views delta yields NaN rather than a negative rate.
+    """
+    dv = np.asarray(delta_views, dtype=np.float64)
+    return np.where(dv < 0, np.nan, views_per_hour(dv, delta_seconds))
+
+
+def velocity_spike_mask(
+    *,
+    video_age_minutes,
+    video_age_hours,
+    vph,
+    baseline_vph,
+    rule: AlertRule,
+) -> np.ndarray:
+    """
+    Array version of should_trigger_velocity_spike. NaN vph never triggers.
+    Inputs broadcast against each other, so a single baseline may be passed as a scalar.
+    """
+    age_m = np.asarray(video_age_minutes, dtype=np.float64)
+    age_h = np.asarray(video_age_hours, dtype=np.float64)
+    v = np.asarray(vph, dtype=np.float64)
+    base = np.asarray(baseline_vph, dtype=np.float64)
+
+    # Written as negated "reject" conditions so NaN comparisons behave like the scalar code.
+    return (
+        ~np.isnan(v)
+        & ~(age_m < rule.min_age_minutes)
+        & ~(age_h > rule.max_age_hours)
+        & ~(v < rule.abs_floor_vph)
+        & ~(base <= 0)
+        & ~(v < (rule.multiplier * base))
+    )
+
+
+def score_velocity_spikes(
+    *,
+    video_age_minutes,
+    delta_views,
+    delta_seconds,
+    baseline_vph,
+    rule: AlertRule,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score all candidates in one pass. Returns (trigger_mask, vph).
+    """
+    age_m = np.asarray(video_age_minutes, dtype=np.float64)
+    vph = latest_views_per_hour(delta_views, delta_seconds)
+    mask = velocity_spike_mask(
+        video_age_minutes=age_m,
+        video_age_hours=age_m / 60.0,
+        vph=vph,
+        baseline_vph=baseline_vph,
+        rule=rule,
+    )
+    return mask, vph
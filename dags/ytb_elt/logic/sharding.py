@@ -0,0 +1,20 @@
+import heapq
+from typing import List, Mapping
+
+
+def balance_shards(weights: Mapping[str, float], shards: int) -> List[List[str]]:
+    """
+    Split keys into at most `shards` groups with similar total weight (greedy
+    longest-processing-time: heaviest key first, onto the currently lightest shard).
+    Deterministic for the same input; empty shards are dropped and keys within a shard sorted.
+    """
+    n = max(1, min(int(shards), len(weights)))
+    if not weights:
+        return []
+    loads = [(0.0, i) for i in range(n)]
+    out: List[List[str]] = [[] for _ in range(n)]
+    for key in sorted(weights, key=lambda k: (-weights[k], k)):
+        load, i = heapq.heappop(loads)
+        out[i].append(key)
+        heapq.heappush(loads, (load + float(weights[key]), i))
+    return [sorted(s) for s in out if s]
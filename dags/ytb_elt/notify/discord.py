@@ -1,10 +1,17 @@
 import json
 import logging
+from typing import Any, Dict, List, Sequence, Tuple
 
 import requests
 
+from ytb_elt.notify.message import Notification
+
 logger = logging.getLogger(__name__)
 
+# Discord limits: 10 embeds per message, 6000 characters across all embeds.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
 
 def send_discord_webhook(*, webhook_url: str, content: str) -> None:
     """
@@ -23,3 +30,43 @@ def send_discord_webhook(*, webhook_url: str, content: str) -> None:
         logger.error("Discord webhook failed: %s %s", resp.status_code, resp.text[:3000])
         resp.raise_for_status()
 
+
+def _embed(n: Notification) -> Dict[str, Any]:
+    embed: Dict[str, Any] = {"title": n.title[:256]}
+    if n.url:
+        embed["url"] = n.url
+    if n.description:
+        embed["description"] = n.description[:4096]
+    if n.fields:
+        embed["fields"] = [{"name": k[:256], "value": v[:1024], "inline": True} for k, v in n.fields[:25]]
+    return embed
+
+
+def _embed_chars(embed: Dict[str, Any]) -> int:
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    for f in embed.get("fields", []):
+        size += len(f["name"]) + len(f["value"])
+    return size
+
+
+def discord_messages(notifications: Sequence[Notification]) -> List[Tuple[Dict[str, Any], List[Notification]]]:
+    """
+    Coalesce notifications into as few webhook messages as Discord's embed limits allow.
+    Returns [(payload, notifications_in_payload)].
+    """
+    messages: List[Tuple[Dict[str, Any], List[Notification]]] = []
+    embeds: List[Dict[str, Any]] = []
+    batch: List[Notification] = []
+    chars = 0
+    for n in notifications:
+        embed = _embed(n)
+        size = _embed_chars(embed)
+        if embeds and (len(embeds) >= MAX_EMBEDS_PER_MESSAGE or chars + size > MAX_EMBED_CHARS_PER_MESSAGE):
+            messages.append(({"embeds": embeds}, batch))
+            embeds, batch, chars = [], [], 0
+        embeds.append(embed)
+        batch.append(n)
+        chars += size
+    if embeds:
+        messages.append(({"embeds": embeds}, batch))
+    return messages
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ytb_elt.notify.discord import discord_messages
+from ytb_elt.notify.message import Notification
+from ytb_elt.notify.slack import slack_messages
+
+logger = logging.getLogger(__name__)
+
+# kind -> formatter returning [(payload, notifications_in_payload)]
+FORMATTERS = {
+    "discord": discord_messages,
+    "slack": slack_messages,
+}
+
+
+@dataclass
+class DeliveryResult:
+    kind: str
+    webhook_url: str
+    notifications: List[Notification]
+    ok: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class _Bucket:
+    """Per-webhook rate-limit state learned from response headers."""
+
+    next_allowed_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class NotificationDispatcher:
+    """
+    Queues notifications per webhook and delivers them on flush():
+    - notifications for the same webhook are coalesced into as few messages as the channel allows
+    - different webhooks are sent concurrently over one pooled HTTP session
+    - each webhook has its own rate-limit bucket (Discord X-RateLimit-* headers, 429 retry_after)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 8,
+        timeout: float = 10.0,
+        max_attempts: int = 4,
+        max_retry_after_s: float = 60.0,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_retry_after_s = max_retry_after_s
+        self._sleep = sleep
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self._queues: Dict[Tuple[str, str], List[Notification]] = {}
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def __enter__(self) -> "NotificationDispatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+
+    def enqueue(self, kind: str, webhook_url: str, notification: Notification) -> None:
+        if kind not in FORMATTERS:
+            raise ValueError(f"unknown notification kind: {kind!r}")
+        if not webhook_url:
+            raise ValueError("webhook_url is required")
+        self._queues.setdefault((kind, webhook_url), []).append(notification)
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def flush(self) -> List[DeliveryResult]:
+        """
+        Deliver everything queued so far. Never raises for delivery errors; inspect the results.
+        """
+        queues, self._queues = self._queues, {}
+        if not queues:
+            return []
+
+        results: List[DeliveryResult] = []
+        workers = max(1, min(self.max_workers, len(queues)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify") as pool:
+            futures = [pool.submit(self._drain, kind, url, notes) for (kind, url), notes in queues.items()]
+            for fut in futures:
+                results.extend(fut.result())
+        return results
+
+    def _drain(self, kind: str, webhook_url: str, notifications: List[Notification]) -> List[DeliveryResult]:
+        out: List[DeliveryResult] = []
+        bucket = self._buckets.setdefault(webhook_url, _Bucket())
+        # One webhook's messages go out sequentially so its bucket is respected.
+        with bucket.lock:
+            for payload, batch in FORMATTERS[kind](notifications):
+                error = self._post(webhook_url, payload, bucket)
+                out.append(DeliveryResult(kind=kind, webhook_url=webhook_url, notifications=batch, ok=error is None, error=error))
+        return out
+
+    def _post(self, webhook_url: str, payload: dict, bucket: _Bucket) -> Optional[str]:
+        """Returns None on success, else an error description."""
+        error = "not attempted"
+        for attempt in range(1, self.max_attempts + 1):
+            wait = bucket.next_allowed_at - time.monotonic()
+            if wait > 0:
+                self._sleep(wait)
+
+            try:
+                resp = self.session.post(webhook_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                self._sleep(0.5 * (2 ** (attempt - 1)))
+                continue
+
+            self._update_bucket(bucket, resp)
+            if resp.status_code == 429:
+                retry_after = _retry_after_seconds(resp)
+                error = f"429 rate limited (retry_after={retry_after:.2f}s)"
+                if retry_after > self.max_retry_after_s:
+                    break
+                bucket.next_allowed_at = max(bucket.next_allowed_at, time.monotonic() + retry_after)
+                continue
+            if resp.status_code >= 500:
+                error = f"{resp.status_code} {resp.text[:300]}"
+                self._sleep(0.5 * (2 ** (attempt - 1)))
+                continue
+            if resp.status_code >= 400:
+                error = f"{resp.status_code} {resp.text[:300]}"
+                break
+            return None
+
+        logger.error("Webhook delivery failed: %s", error)
+        return error
+
+    @staticmethod
+    def _update_bucket(bucket: _Bucket, resp: requests.Response) -> None:
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        reset_after = resp.headers.get("X-RateLimit-Reset-After")
+        if remaining is None or reset_after is None:
+            return
+        try:
+            if int(remaining) <= 0:
+                bucket.next_allowed_at = max(bucket.next_allowed_at, time.monotonic() + float(reset_after))
+        except ValueError:
+            pass
+
+
+def _retry_after_seconds(resp: requests.Response) -> float:
+    # Discord puts retry_after (seconds, float) in the JSON body; Slack uses the Retry-After header.
+    try:
+        body = resp.json()
+        if isinstance(body, dict) and body.get("retry_after") is not None:
+            return float(body["retry_after"])
+    except ValueError:
+        pass
+    try:
+        return float(resp.headers.get("Retry-After", "1"))
+    except ValueError:
+        return 1.0
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Notification:
+    """
+    Channel-agnostic alert message. Formatters in ytb_elt.notify.discord / .slack turn a batch
+    of these into webhook payloads; `key` is opaque to the notifiers and echoed back in
+    delivery results so callers can map outcomes to their own rows.
+    """
+
+    title: str
+    url: str = ""
+    description: str = ""
+    fields: Tuple[Tuple[str, str], ...] = ()
+    key: Optional[str] = None
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON-serialisable form (used for core.alert_outbox.payload); `key` is not included."""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "description": self.description,
+            "fields": [list(f) for f in self.fields],
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], *, key: Optional[str] = None) -> "Notification":
+        return cls(
+            title=payload.get("title") or "",
+            url=payload.get("url") or "",
+            description=payload.get("description") or "",
+            fields=tuple((str(k), str(v)) for k, v in (payload.get("fields") or [])),
+            key=key,
+        )
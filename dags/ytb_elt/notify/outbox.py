@@ -0,0 +1,147 @@
+import json
+import logging
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from ytb_elt.notify.dispatcher import NotificationDispatcher
+from ytb_elt.notify.message import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def record_alert(
+    cur,
+    *,
+    watchlist_id: str,
+    channel_id: str,
+    video_id: str,
+    rule_type: str,
+    kind: str,
+    webhook_url: str,
+    notification: Notification,
+) -> bool:
+    """
+    Record an alert in core.alerts_sent and queue its delivery in core.alert_outbox, atomically
+    (single statement). Returns False if the alert was already recorded (dedupe), unless every
+    delivery of the recorded alert was parked as 'failed': then nobody was notified, so the
+    alert is re-armed and queued again.
+    """
+    cur.execute(
+        """
+        WITH ins AS (
+          INSERT INTO core.alerts_sent AS a(watchlist_id, channel_id, video_id, rule_type, sent_at)
+          VALUES (%s, %s, %s, %s, now())
+          ON CONFLICT (watchlist_id, video_id, rule_type) DO UPDATE
+            SET sent_at = now()
+            WHERE EXISTS (SELECT 1 FROM core.alert_outbox o WHERE o.alert_id = a.id AND o.status = 'failed')
+              AND NOT EXISTS (SELECT 1 FROM core.alert_outbox o WHERE o.alert_id = a.id AND o.status <> 'failed')
+          RETURNING id, watchlist_id
+        )
+        INSERT INTO core.alert_outbox(alert_id, watchlist_id, kind, webhook_url, payload)
+        SELECT id, watchlist_id, %s, %s, %s::jsonb
+        FROM ins;
+        """,
+        (watchlist_id, channel_id, video_id, rule_type, kind, webhook_url, json.dumps(notification.to_payload())),
+    )
+    return cur.rowcount == 1
+
+
+def _claim_due(cur, batch_size: int, claim_ttl: timedelta) -> List[Tuple[int, str, str, dict, int]]:
+    # Due rows, plus claims whose worker never reported back.
+    cur.execute(
+        """
+        UPDATE core.alert_outbox o
+        SET status = 'in_flight', claimed_until = now() + %s, updated_at = now()
+        FROM (
+          SELECT id
+          FROM core.alert_outbox
+          WHERE (status IN ('pending', 'retrying') AND next_attempt_at <= now())
+             OR (status = 'in_flight' AND claimed_until < now())
+          ORDER BY next_attempt_at, id
+          LIMIT %s
+          FOR UPDATE SKIP LOCKED
+        ) due
+        WHERE o.id = due.id
+        RETURNING o.id, o.kind, o.webhook_url, o.payload, o.attempts;
+        """,
+        (claim_ttl, batch_size),
+    )
+    return cur.fetchall()
+
+
+def deliver_outbox(
+    conn,
+    *,
+    dispatcher: NotificationDispatcher,
+    batch_size: int = 100,
+    max_batches: int = 20,
+    max_attempts: int = 5,
+    base_backoff: timedelta = timedelta(minutes=1),
+    claim_ttl: timedelta = timedelta(minutes=15),
+) -> Dict[str, int]:
+    """
+    Drain due outbox rows in batches. Each batch is claimed ('in_flight' until now() + claim_ttl)
+    in one short transaction, delivered with no transaction open, and its results recorded in a
+    second short one; claim_ttl must outlast a batch's delivery including retry_after waits.
+    Failed rows are retried with exponential backoff, then parked as 'failed'.
+    Returns counters: {"sent": n, "retrying": n, "failed": n}.
+    """
+    counts = {"sent": 0, "retrying": 0, "failed": 0}
+    conn.autocommit = False
+    for _ in range(max_batches):
+        with conn:
+            with conn.cursor() as cur:
+                rows = _claim_due(cur, batch_size, claim_ttl)
+        if not rows:
+            break
+
+        attempts_by_id: Dict[str, int] = {}
+        for outbox_id, kind, webhook_url, payload, attempts in rows:
+            key = str(outbox_id)
+            attempts_by_id[key] = attempts
+            payload = payload if isinstance(payload, dict) else json.loads(payload)
+            dispatcher.enqueue(kind, webhook_url, Notification.from_payload(payload, key=key))
+        results = dispatcher.flush()
+
+        with conn:
+            with conn.cursor() as cur:
+                sent_ids: List[int] = []
+                for result in results:
+                    for n in result.notifications:
+                        if result.ok:
+                            sent_ids.append(int(n.key))
+                            continue
+                        attempts = attempts_by_id[n.key] + 1
+                        status = "failed" if attempts >= max_attempts else "retrying"
+                        counts[status] += 1
+                        cur.execute(
+                            """
+                            UPDATE core.alert_outbox
+                            SET status = %s,
+                                attempts = %s,
+                                last_error = %s,
+                                next_attempt_at = now() + %s,
+                                claimed_until = NULL,
+                                updated_at = now()
+                            WHERE id = %s AND status = 'in_flight';
+                            """,
+                            (status, attempts, (result.error or "")[:2000], base_backoff * (2 ** (attempts - 1)), int(n.key)),
+                        )
+
+                if sent_ids:
+                    cur.execute(
+                        """
+                        UPDATE core.alert_outbox
+                        SET status = 'sent', attempts = attempts + 1, last_error = NULL, sent_at = now(),
+                            claimed_until = NULL, updated_at = now()
+                        WHERE id = ANY(%s) AND status = 'in_flight';
+                        """,
+                        (sent_ids,),
+                    )
+                    counts["sent"] += len(sent_ids)
+
+        if len(rows) < batch_size:
+            break
+
+    logger.info("Outbox delivery: %s", counts)
+    return counts
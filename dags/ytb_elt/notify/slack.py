@@ -1,11 +1,16 @@
 import json
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import requests
 
+from ytb_elt.notify.message import Notification
+
 logger = logging.getLogger(__name__)
 
+# Slack allows 50 blocks per message; each notification uses a section + divider.
+MAX_NOTIFICATIONS_PER_MESSAGE = 20
+
 
 def send_slack_webhook(*, webhook_url: str, text: str, blocks: Optional[list] = None) -> None:
     if not webhook_url:
@@ -22,3 +27,28 @@ def send_slack_webhook(*, webhook_url: str, text: str, blocks: Optional[list] =
         logger.error("Slack webhook failed: %s %s", resp.status_code, resp.text[:3000])
         resp.raise_for_status()
 
+
+def _section(n: Notification) -> Dict[str, Any]:
+    title = f"<{n.url}|{n.title}>" if n.url else n.title
+    lines = [f"*{title}*"]
+    if n.description:
+        lines.append(n.description)
+    lines.extend(f"{k}: {v}" for k, v in n.fields)
+    return {"type": "section", "text": {"type": "mrkdwn", "text": "\n".join(lines)[:3000]}}
+
+
+def slack_messages(notifications: Sequence[Notification]) -> List[Tuple[Dict[str, Any], List[Notification]]]:
+    """
+    Coalesce notifications into Block Kit messages (with a plain-text fallback).
+    Returns [(payload, notifications_in_payload)].
+    """
+    messages: List[Tuple[Dict[str, Any], List[Notification]]] = []
+    for i in range(0, len(notifications), MAX_NOTIFICATIONS_PER_MESSAGE):
+        chunk = list(notifications[i : i + MAX_NOTIFICATIONS_PER_MESSAGE])
+        blocks: List[Dict[str, Any]] = []
+        for n in chunk:
+            blocks.append(_section(n))
+            blocks.append({"type": "divider"})
+        text = chunk[0].title if len(chunk) == 1 else f"{len(chunk)} alerts: " + "; ".join(n.title for n in chunk)
+        messages.append(({"text": text[:3000], "blocks": blocks[:-1]}, chunk))
+    return messages
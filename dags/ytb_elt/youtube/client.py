@@ -44,6 +44,30 @@ class YouTubeClient:
         uploads = (((item.get("contentDetails") or {}).get("relatedPlaylists") or {}).get("uploads"))
         return title, uploads
 
+    def list_upload_video_ids_page(
+        self, uploads_playlist_id: str, *, page_token: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """
+        One playlistItems page (up to 50 items): ([(video_id, published_at)], next_page_token).
+        next_page_token is None on the last page.
+        """
+        url = (
+            "https://youtube.googleapis.com/youtube/v3/playlistItems"
+            f"?part=contentDetails&part=snippet&maxResults=50&playlistId={uploads_playlist_id}&key={self.api_key}"
+        )
+        if page_token:
+            url += f"&pageToken={page_token}"
+        data = self._get(url)
+        out: List[Tuple[str, str]] = []
+        for item in data.get("items") or []:
+            cd = item.get("contentDetails") or {}
+            sn = item.get("snippet") or {}
+            vid = cd.get("videoId")
+            published_at = sn.get("publishedAt")
+            if vid and published_at:
+                out.append((vid, published_at))
+        return out, data.get("nextPageToken") or None
+
     def list_recent_upload_video_ids(self, uploads_playlist_id: str, *, limit: int = 200) -> List[Tuple[str, str]]:
         """
         Returns [(video_id, published_at)] newest-first.
@@ -51,23 +75,10 @@ class YouTubeClient:
         out: List[Tuple[str, str]] = []
         page_token = None
         while True:
-            url = (
-                "https://youtube.googleapis.com/youtube/v3/playlistItems"
-                f"?part=contentDetails&part=snippet&maxResults=50&playlistId={uploads_playlist_id}&key={self.api_key}"
-            )
-            if page_token:
-                url += f"&pageToken={page_token}"
-            data = self._get(url)
-            for item in data.get("items") or []:
-                cd = item.get("contentDetails") or {}
-                sn = item.get("snippet") or {}
-                vid = cd.get("videoId")
-                published_at = sn.get("publishedAt")
-                if vid and published_at:
-                    out.append((vid, published_at))
-                if len(out) >= limit:
-                    return out[:limit]
-            page_token = data.get("nextPageToken")
+            page, page_token = self.list_upload_video_ids_page(uploads_playlist_id, page_token=page_token)
+            out.extend(page)
+            if len(out) >= limit:
+                return out[:limit]
             if not page_token:
                 return out
 
@@ -0,0 +1,14 @@
+-- Run-scoped record of the videos that received a new snapshot in an ingest run.
+-- The alerts DAG reads it to evaluate only freshly ingested videos.
+
+CREATE TABLE IF NOT EXISTS core.ingest_run_videos (
+  run_id text NOT NULL,
+  channel_id text NOT NULL,
+  video_id text NOT NULL,
+  pulled_at timestamptz NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (run_id, video_id)
+);
+
+CREATE INDEX IF NOT EXISTS ingest_run_videos_created_idx
+  ON core.ingest_run_videos(created_at);
@@ -0,0 +1,25 @@
+-- Alert delivery outbox: the detection pass writes one row per new alert in the same statement
+-- that records core.alerts_sent; a separate delivery task drains it with batching and retries.
+
+CREATE TABLE IF NOT EXISTS core.alert_outbox (
+  id bigserial PRIMARY KEY,
+  alert_id bigint NOT NULL REFERENCES core.alerts_sent(id) ON DELETE CASCADE,
+  watchlist_id text NOT NULL REFERENCES core.watchlists(watchlist_id) ON DELETE CASCADE,
+  kind text NOT NULL DEFAULT 'discord' CHECK (kind IN ('discord','slack')),
+  webhook_url text NOT NULL,
+  payload jsonb NOT NULL,
+  status text NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','retrying','sent','failed')),
+  attempts integer NOT NULL DEFAULT 0,
+  next_attempt_at timestamptz NOT NULL DEFAULT now(),
+  last_error text,
+  sent_at timestamptz,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS alert_outbox_due_idx
+  ON core.alert_outbox(next_attempt_at)
+  WHERE status IN ('pending','retrying');
+
+-- Rows carry webhook URLs; keep them away from PostgREST roles when applied to Supabase.
+ALTER TABLE core.alert_outbox ENABLE ROW LEVEL SECURITY;
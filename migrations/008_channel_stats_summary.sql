@@ -0,0 +1,50 @@
+-- Per-channel status summary maintained by the ingest DAG, so the tracked-channels list is
+-- O(tracked channels) instead of scanning each channel's full snapshot history.
+
+CREATE TABLE IF NOT EXISTS core.channel_stats_summary (
+  channel_id text PRIMARY KEY REFERENCES core.channels(channel_id) ON DELETE CASCADE,
+  last_snapshot_at timestamptz,
+  videos_count bigint NOT NULL DEFAULT 0,
+  -- Totals over the videos included in the channel's most recent pull.
+  latest_views_total bigint,
+  latest_likes_total bigint,
+  latest_comments_total bigint,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- One-time backfill from existing history.
+INSERT INTO core.channel_stats_summary(
+  channel_id, last_snapshot_at, videos_count,
+  latest_views_total, latest_likes_total, latest_comments_total
+)
+SELECT
+  c.channel_id,
+  l.last_snapshot_at,
+  COALESCE(vc.videos_count, 0),
+  l.views_total,
+  l.likes_total,
+  l.comments_total
+FROM core.channels c
+LEFT JOIN (
+  SELECT channel_id, count(*) AS videos_count
+  FROM core.videos
+  GROUP BY channel_id
+) vc ON vc.channel_id = c.channel_id
+LEFT JOIN (
+  SELECT
+    v.channel_id,
+    max(s.pulled_at) AS last_snapshot_at,
+    sum(s.view_count) AS views_total,
+    sum(s.like_count) AS likes_total,
+    sum(s.comment_count) AS comments_total
+  FROM core.videos v
+  JOIN LATERAL (
+    SELECT pulled_at, view_count, like_count, comment_count
+    FROM core.video_stats_snapshots s
+    WHERE s.video_id = v.video_id
+    ORDER BY pulled_at DESC
+    LIMIT 1
+  ) s ON true
+  GROUP BY v.channel_id
+) l ON l.channel_id = c.channel_id
+ON CONFLICT (channel_id) DO NOTHING;
@@ -0,0 +1,4 @@
+-- Case-insensitive handle lookups for the web app's channel resolver (app/resolver.py).
+
+CREATE INDEX IF NOT EXISTS channels_handle_lower_idx
+  ON core.channels (lower(handle));
@@ -0,0 +1,30 @@
+-- Publish every new core.alerts_sent row on NOTIFY channel ytb_alerts (JSON payload), so the
+-- web app can push alerts to open dashboards over one shared LISTEN connection.
+-- Titles are truncated to keep payloads well under the 8000-byte NOTIFY limit.
+
+CREATE OR REPLACE FUNCTION core.notify_alert_inserted()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify(
+    'ytb_alerts',
+    json_build_object(
+      'id', NEW.id,
+      'watchlist_id', NEW.watchlist_id,
+      'channel_id', NEW.channel_id,
+      'channel_title', (SELECT left(COALESCE(c.title, ''), 200) FROM core.channels c WHERE c.channel_id = NEW.channel_id),
+      'video_id', NEW.video_id,
+      'video_title', (SELECT left(COALESCE(v.title, ''), 300) FROM core.videos v WHERE v.video_id = NEW.video_id),
+      'rule_type', NEW.rule_type,
+      'sent_at', NEW.sent_at
+    )::text
+  );
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS alerts_sent_notify ON core.alerts_sent;
+CREATE TRIGGER alerts_sent_notify
+  AFTER INSERT ON core.alerts_sent
+  FOR EACH ROW EXECUTE FUNCTION core.notify_alert_inserted();
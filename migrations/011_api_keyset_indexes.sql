@@ -0,0 +1,4 @@
+-- Keyset pagination for GET /api/alerts: (watchlist_id) equality + (sent_at, id) row comparison.
+
+CREATE INDEX IF NOT EXISTS alerts_sent_watchlist_sent_id_idx
+  ON core.alerts_sent(watchlist_id, sent_at DESC, id DESC);
@@ -0,0 +1,114 @@
+-- Range-partition core.video_stats_snapshots by month on pulled_at.
+--
+-- Retention becomes DETACH + DROP of whole months (core.drop_video_stats_partitions_before)
+-- instead of DELETE + vacuum, and each partition's indexes stay small.
+--
+-- There is deliberately no DEFAULT partition: on Postgres 13 it disables ordered Append, which is
+-- what lets "latest snapshot of a video" (ORDER BY pulled_at DESC LIMIT n) stop in the newest
+-- partition instead of probing every month. The ingest DAG calls
+-- core.ensure_video_stats_partitions() every run so upcoming months always exist.
+
+CREATE OR REPLACE FUNCTION core.ensure_video_stats_partitions(p_from timestamptz, p_to timestamptz)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  m date := date_trunc('month', p_from AT TIME ZONE 'UTC')::date;
+  last_month date := date_trunc('month', p_to AT TIME ZONE 'UTC')::date;
+  part text;
+  created integer := 0;
+BEGIN
+  WHILE m <= last_month LOOP
+    part := 'video_stats_snapshots_p' || to_char(m, 'YYYYMM');
+    IF to_regclass('core.' || part) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE core.%I PARTITION OF core.video_stats_snapshots FOR VALUES FROM (%L) TO (%L)',
+        part,
+        m::timestamp AT TIME ZONE 'UTC',
+        (m + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+      );
+      created := created + 1;
+    END IF;
+    m := (m + interval '1 month')::date;
+  END LOOP;
+  RETURN created;
+END;
+$$;
+
+-- Drops monthly partitions that end at or before p_cutoff; returns the dropped table names.
+CREATE OR REPLACE FUNCTION core.drop_video_stats_partitions_before(p_cutoff timestamptz)
+RETURNS SETOF text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  r record;
+BEGIN
+  FOR r IN
+    SELECT c.relname, to_date(right(c.relname, 6), 'YYYYMM') AS month_start
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'core.video_stats_snapshots'::regclass
+      AND c.relname ~ '^video_stats_snapshots_p[0-9]{6}$'
+    ORDER BY 2
+  LOOP
+    EXIT WHEN (r.month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC' > p_cutoff;
+    EXECUTE format('ALTER TABLE core.video_stats_snapshots DETACH PARTITION core.%I', r.relname);
+    EXECUTE format('DROP TABLE core.%I', r.relname);
+    RETURN NEXT r.relname;
+  END LOOP;
+END;
+$$;
+
+-- One-time conversion of the existing heap table (no-op once partitioned). Runs as a single
+-- transaction via the migration runner; existing rows are copied into their monthly partitions.
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'core.video_stats_snapshots'::regclass
+  ) THEN
+    RETURN;
+  END IF;
+
+  ALTER TABLE core.video_stats_snapshots RENAME TO video_stats_snapshots_unpartitioned;
+  ALTER TABLE core.video_stats_snapshots_unpartitioned
+    RENAME CONSTRAINT video_stats_snapshots_pkey TO video_stats_snapshots_unpartitioned_pkey;
+  ALTER TABLE core.video_stats_snapshots_unpartitioned
+    RENAME CONSTRAINT video_stats_snapshots_uniq TO video_stats_snapshots_unpartitioned_uniq;
+  ALTER INDEX core.video_stats_snapshots_video_pulled_idx
+    RENAME TO video_stats_snapshots_unpartitioned_video_pulled_idx;
+
+  -- Partitioned unique constraints must include the partition key, hence PK (id, pulled_at).
+  CREATE TABLE core.video_stats_snapshots (
+    id bigint NOT NULL DEFAULT nextval('core.video_stats_snapshots_id_seq'),
+    video_id text NOT NULL REFERENCES core.videos(video_id) ON DELETE CASCADE,
+    pulled_at timestamptz NOT NULL,
+    view_count bigint,
+    like_count bigint,
+    comment_count bigint,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    CONSTRAINT video_stats_snapshots_pkey PRIMARY KEY (id, pulled_at),
+    CONSTRAINT video_stats_snapshots_uniq UNIQUE (video_id, pulled_at)
+  ) PARTITION BY RANGE (pulled_at);
+
+  ALTER SEQUENCE core.video_stats_snapshots_id_seq OWNED BY core.video_stats_snapshots.id;
+
+  CREATE INDEX video_stats_snapshots_video_pulled_idx
+    ON core.video_stats_snapshots(video_id, pulled_at DESC);
+
+  -- Keep RLS when this runs against Supabase (20260216011030_ytwatch_rls_policies.sql).
+  IF (SELECT relrowsecurity FROM pg_class WHERE oid = 'core.video_stats_snapshots_unpartitioned'::regclass) THEN
+    ALTER TABLE core.video_stats_snapshots ENABLE ROW LEVEL SECURITY;
+  END IF;
+
+  PERFORM core.ensure_video_stats_partitions(
+    COALESCE((SELECT min(pulled_at) FROM core.video_stats_snapshots_unpartitioned), now()),
+    now() + interval '2 months'
+  );
+
+  INSERT INTO core.video_stats_snapshots(id, video_id, pulled_at, view_count, like_count, comment_count, created_at)
+  SELECT id, video_id, pulled_at, view_count, like_count, comment_count, created_at
+  FROM core.video_stats_snapshots_unpartitioned;
+
+  DROP TABLE core.video_stats_snapshots_unpartitioned;
+END;
+$$;
@@ -0,0 +1,78 @@
+-- Hourly and daily rollups of core.video_stats_snapshots, maintained by the rollup_video_stats DAG
+-- (dags/ytb_elt/db/rollups.py). Raw rows older than a horizon are pruned once rolled up, and
+-- core.video_stats_history stitches raw -> hourly -> daily into one snapshot-shaped relation.
+
+CREATE TABLE IF NOT EXISTS core.video_stats_hourly (
+  video_id text NOT NULL REFERENCES core.videos(video_id) ON DELETE CASCADE,
+  bucket_start timestamptz NOT NULL,
+  samples integer NOT NULL,
+  first_pulled_at timestamptz NOT NULL,
+  last_pulled_at timestamptz NOT NULL,
+  first_views bigint,
+  last_views bigint,
+  max_views bigint,
+  first_likes bigint,
+  last_likes bigint,
+  max_likes bigint,
+  first_comments bigint,
+  last_comments bigint,
+  max_comments bigint,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (video_id, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS core.video_stats_daily (
+  video_id text NOT NULL REFERENCES core.videos(video_id) ON DELETE CASCADE,
+  bucket_start timestamptz NOT NULL,
+  samples integer NOT NULL,
+  first_pulled_at timestamptz NOT NULL,
+  last_pulled_at timestamptz NOT NULL,
+  first_views bigint,
+  last_views bigint,
+  max_views bigint,
+  first_likes bigint,
+  last_likes bigint,
+  max_likes bigint,
+  first_comments bigint,
+  last_comments bigint,
+  max_comments bigint,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (video_id, bucket_start)
+);
+
+-- Progress per tier:
+--   rolled_through  everything before this has been aggregated into the tier ('hourly', 'daily')
+--   pruned_before   the tier's own rows before this were deleted ('raw', 'hourly')
+CREATE TABLE IF NOT EXISTS core.snapshot_rollup_state (
+  tier text PRIMARY KEY CHECK (tier IN ('raw', 'hourly', 'daily')),
+  rolled_through timestamptz,
+  pruned_before timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION core.snapshot_tier_start(p_tier text)
+RETURNS timestamptz
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT COALESCE(
+    (SELECT pruned_before FROM core.snapshot_rollup_state WHERE tier = p_tier),
+    '-infinity'::timestamptz
+  );
+$$;
+
+-- Same shape as core.video_stats_snapshots. Each tier only covers the range the finer tier
+-- no longer has, so points never overlap. Rolled-up rows report the bucket's last sample.
+CREATE OR REPLACE VIEW core.video_stats_history AS
+SELECT s.video_id, s.pulled_at, s.view_count, s.like_count, s.comment_count, 'raw'::text AS resolution
+FROM core.video_stats_snapshots s
+WHERE s.pulled_at >= core.snapshot_tier_start('raw')
+UNION ALL
+SELECT h.video_id, h.last_pulled_at, h.last_views, h.last_likes, h.last_comments, 'hour'::text
+FROM core.video_stats_hourly h
+WHERE h.bucket_start < core.snapshot_tier_start('raw')
+  AND h.bucket_start >= core.snapshot_tier_start('hourly')
+UNION ALL
+SELECT d.video_id, d.last_pulled_at, d.last_views, d.last_likes, d.last_comments, 'day'::text
+FROM core.video_stats_daily d
+WHERE d.bucket_start < core.snapshot_tier_start('hourly');
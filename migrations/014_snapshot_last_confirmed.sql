@@ -0,0 +1,31 @@
+-- Change-only snapshot writes (SNAPSHOT_WRITE_MODE=changes in the ingest DAG).
+--
+-- When a pull returns the same counts as a video's previous snapshot, no new row is written;
+-- the previous row's last_confirmed_at is moved to the new pull time instead. A row therefore
+-- stands for "these counts from pulled_at through last_confirmed_at" (NULL: a single sample).
+-- An unchanged video still gets a fresh row once a day (keyframe), which keeps runs inside the
+-- raw retention horizon and gives every daily rollup bucket at least one row.
+
+ALTER TABLE core.video_stats_snapshots ADD COLUMN IF NOT EXISTS last_confirmed_at timestamptz;
+
+-- Same as migrations/013, plus the end point of each run in the raw tier so readers see
+-- the last confirmation rather than a gap. Rollup tiers keep change points only: an hour
+-- without a row means the counts did not change.
+CREATE OR REPLACE VIEW core.video_stats_history AS
+SELECT s.video_id, s.pulled_at, s.view_count, s.like_count, s.comment_count, 'raw'::text AS resolution
+FROM core.video_stats_snapshots s
+WHERE s.pulled_at >= core.snapshot_tier_start('raw')
+UNION ALL
+SELECT s.video_id, s.last_confirmed_at, s.view_count, s.like_count, s.comment_count, 'raw'::text
+FROM core.video_stats_snapshots s
+WHERE s.last_confirmed_at IS NOT NULL
+  AND s.pulled_at >= core.snapshot_tier_start('raw')
+UNION ALL
+SELECT h.video_id, h.last_pulled_at, h.last_views, h.last_likes, h.last_comments, 'hour'::text
+FROM core.video_stats_hourly h
+WHERE h.bucket_start < core.snapshot_tier_start('raw')
+  AND h.bucket_start >= core.snapshot_tier_start('hourly')
+UNION ALL
+SELECT d.video_id, d.last_pulled_at, d.last_views, d.last_likes, d.last_comments, 'day'::text
+FROM core.video_stats_daily d
+WHERE d.bucket_start < core.snapshot_tier_start('hourly');
@@ -0,0 +1,13 @@
+-- Short-lived leases so overlapping ingest runs split channels instead of duplicating them.
+-- A key ('channel:<id>') is held by one run until released or until expires_at passes, after
+-- which any run may reclaim it (see dags/ytb_elt/db/leases.py).
+
+CREATE TABLE IF NOT EXISTS core.ingest_leases (
+  lease_key text PRIMARY KEY,
+  holder text NOT NULL,
+  acquired_at timestamptz NOT NULL DEFAULT now(),
+  expires_at timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ingest_leases_holder_idx
+  ON core.ingest_leases(holder);
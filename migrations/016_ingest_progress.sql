@@ -0,0 +1,15 @@
+-- Run-scoped progress ledger: units of work (a channel, or one videos.list batch of it) an
+-- ingest run has finished, so task retries and cleared reruns resume instead of starting over.
+-- payload carries whatever the stage needs to resume (e.g. fetched video IDs, batch totals).
+
+CREATE TABLE IF NOT EXISTS core.ingest_progress (
+  run_id text NOT NULL,
+  stage text NOT NULL,
+  unit_key text NOT NULL,
+  payload jsonb,
+  completed_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (run_id, stage, unit_key)
+);
+
+CREATE INDEX IF NOT EXISTS ingest_progress_completed_idx
+  ON core.ingest_progress(completed_at);
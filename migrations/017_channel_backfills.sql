@@ -0,0 +1,29 @@
+-- Full-history backfill of a channel's uploads playlist (dags/yt_backfill_v0.py).
+-- page_token is the playlistItems cursor after the last page bulk-loaded, so an interrupted or
+-- quota-throttled backfill continues where it stopped; completed_at is set once the playlist ends.
+
+CREATE TABLE IF NOT EXISTS core.channel_backfills (
+  channel_id text PRIMARY KEY REFERENCES core.channels(channel_id) ON DELETE CASCADE,
+  requested_at timestamptz NOT NULL DEFAULT now(),
+  page_token text,
+  pages_done integer NOT NULL DEFAULT 0,
+  videos_loaded bigint NOT NULL DEFAULT 0,
+  completed_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS channel_backfills_pending_idx
+  ON core.channel_backfills(requested_at)
+  WHERE completed_at IS NULL;
+
+-- YouTube Data API units spent per quota day by non-ingest consumers, so they can be capped
+-- below the project's daily quota and leave the rest to the scheduled ingest
+-- (dags/ytb_elt/db/quota.py).
+
+CREATE TABLE IF NOT EXISTS core.api_quota_usage (
+  quota_day date NOT NULL,
+  consumer text NOT NULL,
+  units integer NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (quota_day, consumer)
+);
@@ -0,0 +1,20 @@
+-- Outbox rows are claimed in a short transaction ('in_flight' until claimed_until) and the
+-- webhooks are called after it commits, so slow deliveries hold neither row locks nor an open
+-- transaction. A claim whose worker died is picked up again once claimed_until has passed.
+
+ALTER TABLE core.alert_outbox
+  ADD COLUMN IF NOT EXISTS claimed_until timestamptz;
+
+ALTER TABLE core.alert_outbox
+  DROP CONSTRAINT IF EXISTS alert_outbox_status_check;
+ALTER TABLE core.alert_outbox
+  ADD CONSTRAINT alert_outbox_status_check
+  CHECK (status IN ('pending','retrying','in_flight','sent','failed'));
+
+CREATE INDEX IF NOT EXISTS alert_outbox_in_flight_idx
+  ON core.alert_outbox(claimed_until)
+  WHERE status = 'in_flight';
+
+-- Lets record_alert tell whether an already-recorded alert ever got (or is still getting) out.
+CREATE INDEX IF NOT EXISTS alert_outbox_alert_idx
+  ON core.alert_outbox(alert_id);
@@ -0,0 +1,14 @@
+-- Keyset pagination for GET /api/videos/{video_id}/snapshots over core.video_stats_history
+-- (migrations/014_snapshot_last_confirmed.sql). The page query reads each branch of the view newest
+-- first and stops after one page, so every branch needs a (video_id, <its time column>) index.
+-- Raw pulled_at is already served by the (video_id, pulled_at) key.
+
+CREATE INDEX IF NOT EXISTS video_stats_snapshots_video_confirmed_idx
+  ON core.video_stats_snapshots(video_id, last_confirmed_at)
+  WHERE last_confirmed_at IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS video_stats_hourly_video_last_pulled_idx
+  ON core.video_stats_hourly(video_id, last_pulled_at);
+
+CREATE INDEX IF NOT EXISTS video_stats_daily_video_last_pulled_idx
+  ON core.video_stats_daily(video_id, last_pulled_at);
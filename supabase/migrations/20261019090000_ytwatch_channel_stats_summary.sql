@@ -0,0 +1,88 @@
+-- Per-channel status summary (mirrors migrations/008_channel_stats_summary.sql).
+-- Maintained by the ingest DAG; get_tracked_channels_status reads it instead of
+-- scanning every tracked channel's snapshot history.
+
+create table if not exists core.channel_stats_summary (
+  channel_id text primary key references core.channels(channel_id) on delete cascade,
+  last_snapshot_at timestamptz,
+  videos_count bigint not null default 0,
+  latest_views_total bigint,
+  latest_likes_total bigint,
+  latest_comments_total bigint,
+  updated_at timestamptz not null default now()
+);
+
+-- One-time backfill from existing history, so the tracked-channels list is correct before the
+-- next ingest run rewrites each channel's row.
+insert into core.channel_stats_summary(
+  channel_id, last_snapshot_at, videos_count,
+  latest_views_total, latest_likes_total, latest_comments_total
+)
+select
+  c.channel_id,
+  l.last_snapshot_at,
+  coalesce(vc.videos_count, 0),
+  l.views_total,
+  l.likes_total,
+  l.comments_total
+from core.channels c
+left join (
+  select channel_id, count(*) as videos_count
+  from core.videos
+  group by channel_id
+) vc on vc.channel_id = c.channel_id
+left join (
+  select
+    v.channel_id,
+    max(s.pulled_at) as last_snapshot_at,
+    sum(s.view_count) as views_total,
+    sum(s.like_count) as likes_total,
+    sum(s.comment_count) as comments_total
+  from core.videos v
+  join lateral (
+    select pulled_at, view_count, like_count, comment_count
+    from core.video_stats_snapshots s
+    where s.video_id = v.video_id
+    order by pulled_at desc
+    limit 1
+  ) s on true
+  group by v.channel_id
+) l on l.channel_id = c.channel_id
+on conflict (channel_id) do nothing;
+
+-- Pipeline table: deny direct selects; web app uses RPCs (SECURITY DEFINER).
+alter table core.channel_stats_summary enable row level security;
+
+create or replace function core.get_tracked_channels_status()
+returns table (
+  channel_id text,
+  title text,
+  handle text,
+  thumbnail_url text,
+  subscriber_count bigint,
+  last_snapshot_at timestamptz,
+  videos_count bigint
+)
+language plpgsql
+security definer
+set search_path = core, public
+as $$
+begin
+  perform core._require_auth();
+
+  return query
+  select
+    c.channel_id,
+    c.title,
+    c.handle,
+    c.thumbnail_url,
+    c.subscriber_count,
+    ss.last_snapshot_at,
+    coalesce(ss.videos_count, 0) as videos_count
+  from core.watchlist_channels wc
+  join core.channels c on c.channel_id = wc.channel_id
+  left join core.channel_stats_summary ss on ss.channel_id = c.channel_id
+  where wc.watchlist_id = auth.uid()::text
+  order by coalesce(c.title, c.channel_id);
+end;
+$$;
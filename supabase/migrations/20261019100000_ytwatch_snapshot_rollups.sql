@@ -0,0 +1,112 @@
+-- Hourly/daily snapshot rollups and the stitched history view
+-- (mirrors migrations/013_snapshot_rollups.sql; maintained by the rollup_video_stats DAG).
+
+create table if not exists core.video_stats_hourly (
+  video_id text not null references core.videos(video_id) on delete cascade,
+  bucket_start timestamptz not null,
+  samples integer not null,
+  first_pulled_at timestamptz not null,
+  last_pulled_at timestamptz not null,
+  first_views bigint,
+  last_views bigint,
+  max_views bigint,
+  first_likes bigint,
+  last_likes bigint,
+  max_likes bigint,
+  first_comments bigint,
+  last_comments bigint,
+  max_comments bigint,
+  updated_at timestamptz not null default now(),
+  primary key (video_id, bucket_start)
+);
+
+create table if not exists core.video_stats_daily (
+  video_id text not null references core.videos(video_id) on delete cascade,
+  bucket_start timestamptz not null,
+  samples integer not null,
+  first_pulled_at timestamptz not null,
+  last_pulled_at timestamptz not null,
+  first_views bigint,
+  last_views bigint,
+  max_views bigint,
+  first_likes bigint,
+  last_likes bigint,
+  max_likes bigint,
+  first_comments bigint,
+  last_comments bigint,
+  max_comments bigint,
+  updated_at timestamptz not null default now(),
+  primary key (video_id, bucket_start)
+);
+
+-- Progress per tier:
+--   rolled_through  everything before this has been aggregated into the tier ('hourly', 'daily')
+--   pruned_before   the tier's own rows before this were deleted ('raw', 'hourly')
+create table if not exists core.snapshot_rollup_state (
+  tier text primary key check (tier in ('raw', 'hourly', 'daily')),
+  rolled_through timestamptz,
+  pruned_before timestamptz,
+  updated_at timestamptz not null default now()
+);
+
+create or replace function core.snapshot_tier_start(p_tier text)
+returns timestamptz
+language sql
+stable
+as $$
+  select coalesce(
+    (select pruned_before from core.snapshot_rollup_state where tier = p_tier),
+    '-infinity'::timestamptz
+  );
+$$;
+
+-- Same shape as core.video_stats_snapshots. Each tier only covers the range the finer tier
+-- no longer has, so points never overlap. Rolled-up rows report the bucket's last sample.
+create or replace view core.video_stats_history as
+select s.video_id, s.pulled_at, s.view_count, s.like_count, s.comment_count, 'raw'::text as resolution
+from core.video_stats_snapshots s
+where s.pulled_at >= core.snapshot_tier_start('raw')
+union all
+select h.video_id, h.last_pulled_at, h.last_views, h.last_likes, h.last_comments, 'hour'::text
+from core.video_stats_hourly h
+where h.bucket_start < core.snapshot_tier_start('raw')
+  and h.bucket_start >= core.snapshot_tier_start('hourly')
+union all
+select d.video_id, d.last_pulled_at, d.last_views, d.last_likes, d.last_comments, 'day'::text
+from core.video_stats_daily d
+where d.bucket_start < core.snapshot_tier_start('hourly');
+
+-- Pipeline tables: deny direct selects; web app uses RPCs (SECURITY DEFINER).
+alter table core.video_stats_hourly enable row level security;
+alter table core.video_stats_daily enable row level security;
+alter table core.snapshot_rollup_state enable row level security;
+-- Views run with the owner's rights, which would bypass RLS on the tables above.
+revoke all on core.video_stats_history from anon, authenticated;
+
+-- View-count history of one video from a tracked channel, at whatever tier still covers it.
+create or replace function core.get_video_stats_history(p_video_id text, p_since timestamptz default '-infinity')
+returns table (
+  pulled_at timestamptz,
+  view_count bigint,
+  like_count bigint,
+  comment_count bigint,
+  resolution text
+)
+language plpgsql
+security definer
+set search_path = core, public
+as $$
+begin
+  perform core._require_auth();
+
+  return query
+  select h.pulled_at, h.view_count, h.like_count, h.comment_count, h.resolution
+  from core.video_stats_history h
+  join core.videos v on v.video_id = h.video_id
+  join core.watchlist_channels wc
+    on wc.channel_id = v.channel_id and wc.watchlist_id = auth.uid()::text
+  where h.video_id = p_video_id
+    and h.pulled_at >= p_since
+  order by h.pulled_at;
+end;
+$$;
@@ -0,0 +1,123 @@
+-- Change-only snapshot writes (mirrors migrations/014_snapshot_last_confirmed.sql).
+-- Unchanged pulls move the previous row's last_confirmed_at instead of adding a row.
+
+alter table core.video_stats_snapshots add column if not exists last_confirmed_at timestamptz;
+
+-- Raw tier also reports the end of each unchanged run.
+create or replace view core.video_stats_history as
+select s.video_id, s.pulled_at, s.view_count, s.like_count, s.comment_count, 'raw'::text as resolution
+from core.video_stats_snapshots s
+where s.pulled_at >= core.snapshot_tier_start('raw')
+union all
+select s.video_id, s.last_confirmed_at, s.view_count, s.like_count, s.comment_count, 'raw'::text
+from core.video_stats_snapshots s
+where s.last_confirmed_at is not null
+  and s.pulled_at >= core.snapshot_tier_start('raw')
+union all
+select h.video_id, h.last_pulled_at, h.last_views, h.last_likes, h.last_comments, 'hour'::text
+from core.video_stats_hourly h
+where h.bucket_start < core.snapshot_tier_start('raw')
+  and h.bucket_start >= core.snapshot_tier_start('hourly')
+union all
+select d.video_id, d.last_pulled_at, d.last_views, d.last_likes, d.last_comments, 'day'::text
+from core.video_stats_daily d
+where d.bucket_start < core.snapshot_tier_start('hourly');
+
+revoke all on core.video_stats_history from anon, authenticated;
+
+-- Same VPH rule as the alerts DAG (ytb_elt.logic.metrics.latest_observations).
+create or replace function core.get_top_movers(limit_rows int default 20)
+returns table (
+  channel_id text,
+  channel_title text,
+  video_type text,
+  video_id text,
+  title text,
+  published_at timestamptz,
+  pulled_at_now timestamptz,
+  views_now bigint,
+  views_per_hour numeric
+)
+language plpgsql
+security definer
+set search_path = core, public
+as $$
+begin
+  perform core._require_auth();
+
+  return query
+  with tracked_channels as (
+    select wc.channel_id
+    from core.watchlist_channels wc
+    where wc.watchlist_id = auth.uid()::text
+  ),
+  candidates as (
+    select v.video_id, v.channel_id, v.title, v.published_at, v.video_type
+    from core.videos v
+    join tracked_channels tc on tc.channel_id = v.channel_id
+    where v.published_at >= now() - interval '7 days'
+  ),
+  last_two as (
+    select
+      s.video_id,
+      s.pulled_at,
+      s.last_confirmed_at,
+      s.view_count,
+      row_number() over (partition by s.video_id order by s.pulled_at desc) as rn
+    from core.video_stats_snapshots s
+    join candidates c on c.video_id = s.video_id
+    where s.view_count is not null
+  ),
+  last_rows as (
+    select
+      c.channel_id,
+      c.video_type,
+      c.video_id,
+      c.title,
+      c.published_at,
+      max(case when l.rn = 1 then l.pulled_at end) as p1,
+      max(case when l.rn = 1 then l.last_confirmed_at end) as c1,
+      max(case when l.rn = 1 then l.view_count end) as v1,
+      max(case when l.rn = 2 then coalesce(l.last_confirmed_at, l.pulled_at) end) as p0,
+      max(case when l.rn = 2 then l.view_count end) as v0
+    from candidates c
+    join last_two l on l.video_id = c.video_id and l.rn in (1, 2)
+    group by c.channel_id, c.video_type, c.video_id, c.title, c.published_at
+  ),
+  -- A confirmed newest row spans an unchanged run (VPH 0); otherwise measure from the end
+  -- of the previous row's run.
+  pairs as (
+    select
+      r.channel_id,
+      r.video_type,
+      r.video_id,
+      r.title,
+      r.published_at,
+      coalesce(r.c1, r.p1) as t1,
+      r.v1,
+      case when r.c1 is not null then r.p1 else r.p0 end as t0,
+      case when r.c1 is not null then r.v1 else r.v0 end as v0
+    from last_rows r
+  )
+  select
+    p.channel_id,
+    coalesce(ch.title, p.channel_id) as channel_title,
+    p.video_type,
+    p.video_id,
+    p.title,
+    p.published_at,
+    p.t1 as pulled_at_now,
+    p.v1 as views_now,
+    case
+      when p.t0 is null or p.t1 is null then null
+      when p.v0 is null or p.v1 is null then null
+      when extract(epoch from (p.t1 - p.t0)) <= 0 then null
+      when (p.v1 - p.v0) < 0 then null
+      else ((p.v1 - p.v0)::numeric / (extract(epoch from (p.t1 - p.t0)) / 3600.0))
+    end as views_per_hour
+  from pairs p
+  left join core.channels ch on ch.channel_id = p.channel_id
+  order by views_per_hour desc nulls last
+  limit greatest(limit_rows, 1);
+end;
+$$;
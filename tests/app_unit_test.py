@@ -0,0 +1,371 @@
+import asyncio
+import json
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.bulk_import import import_channels, parse_inputs
+from app.cache import DataVersion, TTLCache, etag_matches, make_etag
+from app.live import AlertBroadcaster
+from app.pagination import InvalidCursor, clamp_limit, decode_cursor, encode_cursor, page
+from app.ratelimit import MemoryTokenBuckets, RateLimiter
+from app.resolver import ChannelResolver
+from app.timeseries import lttb, series_payload, series_spec
+
+
+class _Clock:
+    def __init__(self, t: float = 0.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    clock = _Clock()
+    c = TTLCache(max_entries=2, ttl_s=10, clock=clock)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "a" is now most recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+
+    clock.t = 11
+    assert c.get("a") is None
+    stats = c.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 2
+
+
+def test_data_version_bumps_and_etags():
+    v = DataVersion(fallback_ttl_s=60, clock=_Clock(0))
+    v.live = True
+    s0 = v.current("default")
+    v.bump("other")
+    assert v.current("default") == s0
+    v.bump("default")
+    s1 = v.current("default")
+    assert s1 != s0
+    v.bump()  # "*"
+    assert v.current("default") != s1
+
+    etag = make_etag("index", "default", s1)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"x", {etag}', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag("index", "default", s0), etag)
+
+
+def test_data_version_rolls_over_without_listener():
+    clock = _Clock(0)
+    v = DataVersion(fallback_ttl_s=60, clock=clock)
+    s0 = v.current("default")
+    clock.t = 61
+    assert v.current("default") != s0
+
+
+class _FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.log.append(sql.split()[0])
+
+    def fetchone(self):
+        return None
+
+
+class _FakeConn:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return _FakeCursor(self.log)
+
+
+class _FakeYouTube:
+    def __init__(self):
+        self.calls = []
+
+    def resolve_channel_by_handle(self, handle):
+        self.calls.append(("handle", handle))
+        if handle != "mrbeast":
+            return None
+        return {
+            "id": "UCX6OQ3DkcsbYNE6H8uQQuVA",
+            "snippet": {"title": "MrBeast", "customUrl": "@MrBeast"},
+            "contentDetails": {"relatedPlaylists": {"uploads": "UUX6OQ3DkcsbYNE6H8uQQuVA"}},
+        }
+
+    def resolve_channel_by_id(self, channel_id):
+        self.calls.append(("id", channel_id))
+        return None
+
+
+def test_channel_resolver_search_then_track_is_served_locally():
+    sql_log = []
+
+    @contextmanager
+    def connection():
+        yield _FakeConn(sql_log)
+
+    yt = _FakeYouTube()
+    r = ChannelResolver(max_entries=16)
+
+    first = r.by_handle(yt, "@MrBeast", connection=connection)
+    assert first.source == "youtube" and first.uploads_playlist_id.startswith("UU")
+    assert sql_log == ["SELECT", "INSERT"]  # L2 miss, then write-back to core.channels
+
+    again = r.by_handle(yt, "mrbeast", connection=connection)
+    tracked = r.by_id(yt, first.result.channel_id, connection=connection)
+    assert again.source == "memory" and tracked.source == "memory"
+    assert yt.calls == [("handle", "mrbeast")]
+
+    assert r.by_handle(yt, "@nobody", connection=connection) is None
+    assert r.by_handle(yt, "@nobody", connection=connection) is None  # negative-cached
+    assert yt.calls.count(("handle", "nobody")) == 1
+
+    stats = r.stats()
+    assert stats["youtube"] == 1 and stats["memory"] == 3 and stats["not_found"] == 1
+    assert stats["local_hit_rate"] == 0.6
+
+
+def test_token_bucket_burst_refill_and_retry_after():
+    clock = _Clock()
+    b = MemoryTokenBuckets(rate_per_s=1.0, burst=3, clock=clock)
+    assert [b.allow("1.2.3.4").allowed for _ in range(4)] == [True, True, True, False]
+    denied = b.allow("1.2.3.4")
+    assert not denied.allowed and denied.retry_after_s == 1.0
+    assert b.allow("5.6.7.8").allowed  # independent key
+
+    clock.t = 1.0
+    assert b.allow("1.2.3.4").allowed
+    clock.t = 100.0
+    assert b.allow("1.2.3.4").remaining == 2.0  # refilled to burst, capped
+
+
+def test_token_bucket_memory_is_flat_under_millions_of_ips():
+    b = MemoryTokenBuckets(rate_per_s=1.0, burst=3, max_keys=20_000, clock=_Clock())
+
+    def ip(i: int) -> str:
+        return f"{(i >> 24) & 255}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+    for i in range(50_000):
+        b.allow(ip(i))
+    baseline = sys.getsizeof(b._buckets)
+    for i in range(50_000, 2_000_000):
+        b.allow(ip(i))
+
+    assert len(b) == 20_000
+    assert b.evictions == 2_000_000 - 20_000
+    assert sys.getsizeof(b._buckets) <= baseline
+
+
+class _BrokenRedisBuckets:
+    def allow(self, key, cost=1.0):
+        raise ConnectionError("redis down")
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def test_rate_limiter_falls_back_to_memory_when_redis_fails():
+    clock = _Clock()
+    limiter = RateLimiter(
+        MemoryTokenBuckets(rate_per_s=1.0, burst=1, clock=clock), _BrokenRedisBuckets(), redis_retry_s=30, clock=clock
+    )
+    assert limiter.allow("ip").allowed
+    assert not limiter.allow("ip").allowed
+    assert limiter.redis_errors == 1  # not retried while inside the back-off window
+    assert limiter.stats()["using_fallback"]
+
+
+def test_alert_broadcaster_fans_out_one_render_and_replays():
+    renders = []
+
+    def render(alert):
+        renders.append(alert["id"])
+        return f"<div>{alert['video_id']}</div>"
+
+    b = AlertBroadcaster(render, replay_size=10)
+
+    def payload(i):
+        return json.dumps({"id": i, "video_id": f"v{i}", "sent_at": "2026-01-01T00:00:00+00:00"})
+
+    async def main():
+        async def never_disconnected():
+            return False
+
+        streams = [b.stream(never_disconnected, keepalive_s=5) for _ in range(3)]
+        for s in streams:
+            assert await s.__anext__() == b"retry: 3000\n\n"
+
+        threading.Thread(target=b.publish, args=(payload(7),)).start()
+        received = await asyncio.wait_for(asyncio.gather(*(s.__anext__() for s in streams)), timeout=1)
+        for s in streams:
+            await s.aclose()
+
+        late = b.stream(never_disconnected, last_event_id=6)
+        await late.__anext__()
+        replayed = await asyncio.wait_for(late.__anext__(), timeout=1)
+        await late.aclose()
+        return received, replayed
+
+    received, replayed = asyncio.run(main())
+    assert received == [b"id: 7\nevent: alert\ndata: <div>v7</div>\n\n"] * 3
+    assert replayed == received[0]
+    assert renders == [7]
+    assert b.stats()["clients"] == 0
+
+
+def test_keyset_cursor_round_trip_and_pages():
+    sent_at = datetime(2026, 10, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor([sent_at, 42])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, (datetime, int)) == (sent_at, 42)
+    assert decode_cursor(None, (datetime, int)) is None
+
+    for bad in ("not-base64!", encode_cursor([1]), encode_cursor(["x", 1]), encode_cursor([sent_at, True])):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad, (datetime, int))
+
+    assert clamp_limit(None) == 50 and clamp_limit(0) == 1 and clamp_limit(10_000) == 200
+
+    rows = [{"id": i, "sent_at": sent_at} for i in (5, 4, 3)]
+    first = page(rows, 2, lambda r: (r["sent_at"], r["id"]))
+    assert [r["id"] for r in first["items"]] == [5, 4]
+    assert decode_cursor(first["next_cursor"], (datetime, int)) == (sent_at, 4)
+    assert page(rows[2:], 2, lambda r: (r["sent_at"], r["id"]))["next_cursor"] is None
+
+
+def test_series_spec_auto_resolution_and_lttb_bounds_payload():
+    assert series_spec("24h").resolution == "15m"
+    assert series_spec("30d").resolution == "1h"
+    assert series_spec("365d").resolution == "1d"
+    assert series_spec("all", "6h").bucket_s == 21600
+    with pytest.raises(ValueError):
+        series_spec("10y")
+
+    # A spike in the middle of a long flat series must survive downsampling.
+    pts = [(float(i), 1000.0 if i == 5000 else float(i // 100)) for i in range(10_000)]
+    kept = lttb(pts, 300)
+    assert len(kept) == 300
+    assert kept[0] == pts[0] and kept[-1] == pts[-1]
+    assert (5000.0, 1000.0) in kept
+    assert [p[0] for p in kept] == sorted(p[0] for p in kept)
+
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    rows = [(datetime.fromtimestamp(start + i * 900, tz=timezone.utc), i * 10) for i in range(2000)] + [(None, 1)]
+    payload = series_payload(rows, series_spec("90d", "15m", points=200))
+    assert payload["buckets"] == 2000 and len(payload["points"]) == 200
+    assert payload["points"][0] == ["2026-01-01T00:00:00+00:00", 0]
+
+
+class _RecordingCursor(_FakeCursor):
+    def __init__(self, log):
+        super().__init__(log)
+        self.rowcount = 0
+
+    def execute(self, sql, params):
+        self.log.append((sql.split()[0], params))
+        self.rowcount = len(params[1]) if "watchlist_channels" in sql else 0
+
+    def fetchall(self):
+        return []
+
+
+class _RecordingConn(_FakeConn):
+    def cursor(self):
+        return _RecordingCursor(self.log)
+
+
+class _BulkYouTube:
+    def __init__(self):
+        self.calls = []
+
+    def resolve_channels_by_ids(self, ids):
+        self.calls.append(("ids", len(ids)))
+        return [_channel_item(i) for i in ids if not i.endswith("missing")]
+
+    def resolve_channel_by_handle(self, handle):
+        self.calls.append(("handle", handle))
+        return _channel_item("UC" + handle.ljust(22, "x")) if handle != "nobody" else None
+
+
+def _channel_item(channel_id):
+    return {
+        "id": channel_id,
+        "snippet": {"title": channel_id},
+        "contentDetails": {"relatedPlaylists": {"uploads": "UU" + channel_id[2:]}},
+    }
+
+
+def test_bulk_import_batches_ids_and_writes_once():
+    ids = [f"UC{i:022d}" for i in range(120)] + ["UC" + "missing".rjust(22, "0")]
+    raw = "\n".join(ids + ["@Fireship", "https://youtube.com/@fireship", "@nobody", "not a channel", ids[0]])
+    plan = parse_inputs(raw)
+    assert len(plan.ids) == 121 and plan.handles == ["@fireship", "@nobody"]
+    assert plan.invalid == ["not", "a", "channel"]
+
+    log = []
+
+    @contextmanager
+    def connection():
+        yield _RecordingConn(log)
+
+    yt = _BulkYouTube()
+    written = []
+    events = list(
+        import_channels(
+            yt,
+            plan,
+            connection=connection,
+            watchlist_id="default",
+            after_write=written.append,
+            db_max_age=timedelta(hours=24),
+            concurrency=3,
+        )
+    )
+
+    assert sorted(c for c in yt.calls if c[0] == "ids") == [("ids", 21), ("ids", 50), ("ids", 50)]
+    assert [e["event"] for e in events] == ["parsed", "local"] + ["resolve"] * 5 + ["done"]
+    done = events[-1]
+    assert done["tracked"] == done["newly_tracked"] == 121
+    assert done["api_calls"] == 5
+    assert sorted(done["not_found"]) == ["@nobody", "UC" + "missing".rjust(22, "0")]
+
+    statements = [s for s, _ in log]
+    assert statements == ["SELECT", "INSERT", "INSERT", "INSERT"]  # lookup, watchlist, channels, tracking
+    assert len(log[2][1][0]) == 121  # one multi-row upsert
+    assert len(written) == 1
+
+
+def test_bulk_import_respects_api_call_cap():
+    plan = parse_inputs(" ".join(f"@channel{i}" for i in range(10)))
+
+    @contextmanager
+    def connection():
+        yield _RecordingConn([])
+
+    run = list(
+        import_channels(
+            _BulkYouTube(),
+            plan,
+            connection=connection,
+            watchlist_id="default",
+            after_write=lambda cur: None,
+            db_max_age=timedelta(hours=24),
+            max_api_calls=4,
+        )
+    )
+    assert run[-1]["api_calls"] == 4 and len(run[-1]["skipped_quota"]) == 6
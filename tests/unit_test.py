@@ -29,6 +29,8 @@ def test_dags_integrity(dagbag):
         # v0 core
         "ingest_youtube_watchlists",
         "compute_and_send_alerts",
+        "rollup_video_stats",
+        "backfill_channel_history",
         # manual
         "bootstrap_watchlists_from_yaml",
     ]
@@ -49,8 +51,10 @@ def test_dags_integrity(dagbag):
         "produce_json": 5,
         "update_db": 3,
         "data_quality": 2,
-        "ingest_youtube_watchlists": 6,
-        "compute_and_send_alerts": 1,
+        "ingest_youtube_watchlists": 8,
+        "compute_and_send_alerts": 2,
+        "rollup_video_stats": 5,
+        "backfill_channel_history": 2,
         "bootstrap_watchlists_from_yaml": 2,
     }
     print("===========")
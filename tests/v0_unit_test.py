@@ -1,8 +1,25 @@
+import json
+from datetime import datetime, timedelta, timezone
+from statistics import median
+
+import numpy as np
+import psycopg2.errors
 import pytest
 
-from ytb_elt.logic.alerts import AlertRule, should_trigger_velocity_spike
+from ytb_elt.backtest.replay import SnapshotHistory, expand_confirmed_runs, replay, rule_grid, sweep
+
+from ytb_elt.db.backfill import copy_rows
+from ytb_elt.db.migrate import load_manifest, run_migrations
+from ytb_elt.logic.alerts import AlertRule, default_rules_for, should_trigger_velocity_spike
 from ytb_elt.logic.duration import parse_youtube_duration_to_seconds
-from ytb_elt.logic.metrics import compute_views_per_hour
+from ytb_elt.logic.metrics import compute_views_per_hour, latest_observations
+from ytb_elt.logic.sharding import balance_shards
+from ytb_elt.logic.scoring import score_velocity_spikes, velocity_spike_mask, views_per_hour
+from ytb_elt.notify.discord import discord_messages
+from ytb_elt.notify.dispatcher import DeliveryResult, NotificationDispatcher
+from ytb_elt.notify.message import Notification
+from ytb_elt.notify.outbox import deliver_outbox
+from ytb_elt.youtube.client import YouTubeClient
 
 
 @pytest.mark.parametrize(
@@ -57,3 +74,500 @@ def test_alert_trigger_decision_false_floor():
         is False
     )
 
+
+def _scalar_vph_or_nan(delta_views, delta_seconds):
+    try:
+        return compute_views_per_hour(delta_views, delta_seconds)
+    except ValueError:
+        return float("nan")
+
+
+def test_vectorised_views_per_hour_parity():
+    rng = np.random.default_rng(7)
+    delta_views = rng.integers(-1_000, 5_000_000, size=5_000)
+    delta_seconds = rng.integers(-60, 7_200, size=5_000).astype(float)
+    delta_seconds[:10] = 0.0
+
+    vph = views_per_hour(delta_views, delta_seconds)
+
+    expected = np.array([_scalar_vph_or_nan(int(dv), float(ds)) for dv, ds in zip(delta_views, delta_seconds)])
+    np.testing.assert_array_equal(vph, expected)
+
+
+@pytest.mark.parametrize("video_type", ["long", "short"])
+def test_vectorised_spike_mask_parity(video_type):
+    rule = default_rules_for(video_type, "w")
+    rng = np.random.default_rng(11)
+    n = 5_000
+    age_minutes = rng.uniform(0, 60 * 30, size=n)
+    vph = rng.uniform(0, 40_000, size=n)
+    baseline = rng.uniform(-100, 10_000, size=n)
+    # Exact threshold boundaries.
+    age_minutes[:3] = [rule.min_age_minutes, rule.max_age_hours * 60.0, 0.0]
+    vph[3:6] = [rule.abs_floor_vph, rule.multiplier * 4000.0, 0.0]
+    baseline[3:6] = [1.0, 4000.0, 0.0]
+
+    mask = velocity_spike_mask(
+        video_age_minutes=age_minutes,
+        video_age_hours=age_minutes / 60.0,
+        vph=vph,
+        baseline_vph=baseline,
+        rule=rule,
+    )
+
+    expected = [
+        should_trigger_velocity_spike(
+            video_age_minutes=float(a),
+            video_age_hours=float(a) / 60.0,
+            vph=float(v),
+            baseline_vph=float(b),
+            rule=rule,
+        )
+        for a, v, b in zip(age_minutes, vph, baseline)
+    ]
+    assert mask.tolist() == expected
+    assert mask.any() and not mask.all()
+
+
+def test_score_velocity_spikes_skips_missing_and_negative_deltas():
+    rule = AlertRule(watchlist_id="w", video_type="long", multiplier=2.0, abs_floor_vph=1000, min_age_minutes=0, max_age_hours=24)
+    mask, vph = score_velocity_spikes(
+        video_age_minutes=[60, 60, 60, 60],
+        delta_views=[5000, -10, 5000, np.nan],
+        delta_seconds=[900, 900, 0, 900],
+        baseline_vph=1000.0,
+        rule=rule,
+    )
+    assert mask.tolist() == [True, False, False, False]
+    assert vph[0] == compute_views_per_hour(5000, 900)
+    assert np.isnan(vph[1:]).all()
+
+
+def _history(published, snapshots):
+    """snapshots: [(pulled_at, video_index, views)] for a single long-form channel."""
+    snapshots = sorted(snapshots)
+    return SnapshotHistory(
+        video_ids=[f"v{i}" for i in range(len(published))],
+        channel_ids=["c"],
+        video_channel=np.zeros(len(published), dtype=np.int32),
+        video_is_short=np.zeros(len(published), dtype=bool),
+        video_published=np.array(published, dtype=np.float64),
+        snap_video=np.array([s[1] for s in snapshots], dtype=np.int32),
+        snap_pulled=np.array([s[0] for s in snapshots], dtype=np.float64),
+        snap_views=np.array([s[2] for s in snapshots], dtype=np.float64),
+    )
+
+
+def test_replay_fires_once_per_spike_and_respects_warmup():
+    t0 = 1_767_225_600.0  # 2026-01-01T00:00:00Z
+    views = {0: [0, 250, 500, 750], 1: [0, 250, 500, 750], 2: [0, 250, 3000, 6000]}
+    snapshots = [(t0 + k * 900, vid, v[k]) for vid, v in views.items() for k in range(4)]
+    history = _history([t0 - 3600] * 3, snapshots)
+    rule = AlertRule(watchlist_id="w", video_type="long", multiplier=2.0, abs_floor_vph=1000, min_age_minutes=0, max_age_hours=24)
+
+    alerts = replay(history, {"long": rule}, video_types=("long",))
+
+    assert [(a.video_id, a.pulled_at.timestamp()) for a in alerts] == [("v2", t0 + 1800)]
+    assert alerts[0].vph == 11000.0
+    assert alerts[0].baseline_vph == 1000.0
+
+    late = datetime.fromtimestamp(t0 + 2700, tz=timezone.utc)
+    assert replay(history, {"long": rule}, video_types=("long",), report_from=late) == []
+
+
+def test_replay_baseline_window_counts_unsnapshotted_videos():
+    t0 = 1_767_225_600.0  # 2026-01-01T00:00:00Z
+    # v0 is the newest upload but has no snapshots yet; v3 is outside the window.
+    published = [t0 - 600, t0 - 3600, t0 - 7200, t0 - 10800]
+    views = {1: [0, 250], 2: [0, 750], 3: [0, 5000]}
+    snapshots = [(t0 + k * 900, vid, v[k]) for vid, v in views.items() for k in range(2)]
+    history = _history(published, snapshots)
+    rule = AlertRule(
+        watchlist_id="w", video_type="long", baseline_window_videos=2, multiplier=2.0, abs_floor_vph=1000, max_age_hours=24
+    )
+
+    alerts = replay(history, {"long": rule}, video_types=("long",))
+
+    # Same as compute_and_send_alerts: vids[:baseline_window_videos] over all videos, newest first.
+    now = t0 + 900
+    vph = {vid: compute_views_per_hour(v[1] - v[0], 900) for vid, v in views.items()}
+    newest_first = sorted(range(len(published)), key=lambda i: -published[i])
+    samples = [
+        vph[i]
+        for i in newest_first[: rule.baseline_window_videos]
+        if i in vph and (now - published[i]) / 3600.0 <= rule.baseline_hours
+    ]
+    assert samples == [1000.0]
+    assert [(a.video_id, a.baseline_vph) for a in alerts] == [("v2", median(samples)), ("v3", median(samples))]
+
+
+def test_latest_observations_understands_confirmed_runs():
+    def t(minute):
+        return datetime(2026, 1, 1, 0, minute, tzinfo=timezone.utc)
+
+    # Full writes: plain last two rows.
+    assert latest_observations([(t(30), None, 900), (t(15), None, 600)]) == ((t(30), 900), (t(15), 600))
+    # Newest row confirmed since: unchanged run, VPH 0 even with a single row.
+    assert latest_observations([(t(15), t(45), 600)]) == ((t(45), 600), (t(15), 600))
+    # New value after a confirmed run: measured from the run's last confirmation.
+    assert latest_observations([(t(45), None, 900), (t(0), t(30), 600)]) == ((t(45), 900), (t(30), 600))
+    assert latest_observations([(t(0), None, 600)]) is None
+    assert latest_observations([]) is None
+
+
+def test_expand_confirmed_runs_matches_full_writes():
+    nan = np.nan
+    # Video 0 unchanged from tick 0 to tick 2700, video 1 changes every tick.
+    video = np.array([0, 1, 1, 1, 1, 0], dtype=np.int32)
+    pulled = np.array([0.0, 0.0, 900.0, 1800.0, 2700.0, 3600.0])
+    views = np.array([10.0, 1.0, 2.0, 3.0, 4.0, 20.0])
+    confirmed = np.array([2700.0, nan, nan, nan, nan, nan])
+
+    v, p, w = expand_confirmed_runs(video, pulled, views, confirmed)
+
+    assert list(zip(p, v, w)) == [
+        (0.0, 0, 10.0), (0.0, 1, 1.0),
+        (900.0, 0, 10.0), (900.0, 1, 2.0),
+        (1800.0, 0, 10.0), (1800.0, 1, 3.0),
+        (2700.0, 0, 10.0), (2700.0, 1, 4.0),
+        (3600.0, 0, 20.0),
+    ]
+
+
+def test_rule_grid_and_sweep():
+    base = {"long": default_rules_for("long", "w"), "short": default_rules_for("short", "w")}
+    grid = rule_grid(base, {"multiplier": [2, 3], "min_age_minutes": [0, 15, 30]})
+    assert len(grid) == 6
+    assert {rs["short"].multiplier for rs in grid} == {2.0, 3.0}
+    assert all(isinstance(rs["long"].min_age_minutes, int) for rs in grid)
+    with pytest.raises(ValueError):
+        rule_grid(base, {"watchlist_id": [1]})
+
+    history = _history([0.0], [(600.0, 0, 10.0)])
+    assert sweep(history, grid[:2], processes=1) == [[], []]
+
+
+def test_balance_shards_spreads_video_volume():
+    weights = {"a": 200, "b": 200, "c": 150, "d": 50, "e": 50, "f": 10}
+    shards = balance_shards(weights, 3)
+
+    assert sorted(c for s in shards for c in s) == sorted(weights)
+    loads = sorted(sum(weights[c] for c in s) for s in shards)
+    assert loads == [200, 210, 250]
+    assert balance_shards(weights, 3) == shards
+    assert balance_shards({"a": 1}, 4) == [["a"]]
+    assert balance_shards({}, 4) == []
+
+
+def _epoch_us(ts):
+    return int(ts.timestamp() * 1_000_000) if ts else None
+
+
+class _ArchiveCursor:
+    """Answers the three queries ytb_elt.archive.export issues from in-memory rows."""
+
+    def __init__(self, snapshots, videos):
+        self._snapshots = snapshots  # (video_id, pulled_at datetime, views, confirmed datetime|None)
+        self._videos = videos
+        self._rows = []
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if "min(pulled_at)" in sql:
+            self._rows = [(min(s[1] for s in self._snapshots) if self._snapshots else None,)]
+        elif "core.video_stats_snapshots" in sql:
+            lo, hi = params
+            picked = sorted((s for s in self._snapshots if lo <= s[1] < hi), key=lambda s: (s[1], s[0]))
+            self._rows = [(v, _epoch_us(t), views, views, 0, _epoch_us(c)) for v, t, views, c in picked]
+        else:
+            self._rows = [(v, ch, "t", _epoch_us(pub), 600, "long") for v, ch, pub in self._videos]
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def fetchmany(self, n):
+        out, self._rows = self._rows[:n], self._rows[n:]
+        return out
+
+
+class _ArchiveConn:
+    def __init__(self, snapshots, videos):
+        self.snapshots, self.videos = snapshots, videos
+
+    def cursor(self, name=None):
+        return _ArchiveCursor(self.snapshots, self.videos)
+
+
+def test_parquet_archive_export_is_incremental_and_feeds_replay(tmp_path):
+    pytest.importorskip("pyarrow")
+    from ytb_elt.archive.export import export_cold_days
+    from ytb_elt.archive.reader import archived_days, read_snapshots
+    from ytb_elt.backtest.replay import load_archived_history
+
+    day0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    snapshots = [
+        ("v0", day0 + timedelta(hours=h), 100 * h, day0 + timedelta(hours=h, minutes=30) if h == 2 else None)
+        for h in range(72)
+    ] + [("v1", day0 + timedelta(hours=1), 5, None)]
+    videos = [("v0", "c", day0 - timedelta(days=1)), ("v1", "other", day0)]
+    conn = _ArchiveConn(snapshots, videos)
+    root = str(tmp_path)
+
+    through, days = export_cold_days(conn, root, now=day0 + timedelta(days=4, hours=1), max_days=1)
+    assert days == [day0.date()] and through == day0 + timedelta(days=1)
+    through, days = export_cold_days(conn, root, now=day0 + timedelta(days=4, hours=1))
+    # Jan 3 is not cold yet (cold_after=2 days); Jan 1 is not exported again.
+    assert [d.day for d in days] == [2] and through == day0 + timedelta(days=2)
+    assert [d.day for d in archived_days(root)] == [1, 2]
+
+    t = read_snapshots(root, start=day0 + timedelta(hours=23), video_ids=["v0"], columns=["view_count"])
+    assert t["view_count"].to_pylist() == [2300] + [100 * h for h in range(24, 48)]
+
+    history = load_archived_history(root, channel_ids=["c"])
+    assert history.video_ids == ["v0"]
+    # 48 hourly rows plus the confirmation at 02:30 expanded onto its own tick.
+    assert history.snap_pulled.size == 49
+    assert history.snap_views[:4].tolist() == [0.0, 100.0, 200.0, 200.0]
+
+
+class _MigrationCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.db["log"].append(sql.strip().split("\n")[0])
+        if "FROM core.schema_migrations_manifest" in sql:
+            if self.db["manifest"] is None and not self.db["created"]:
+                raise psycopg2.errors.UndefinedTable("missing")
+            self._rows = [(self.db["manifest"],)] if self.db["manifest"] else []
+        elif "CREATE TABLE IF NOT EXISTS core.schema_migrations_manifest" in sql:
+            self.db["created"] = True
+        elif sql.startswith("SELECT version"):
+            self._rows = [(v,) for v in self.db["versions"]]
+        elif "INSERT INTO core.schema_migrations(" in sql:
+            self.db["versions"].append(params[0])
+        elif "INSERT INTO core.schema_migrations_manifest" in sql:
+            self.db["manifest"] = params[0]
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+class _MigrationConn:
+    def __init__(self, db):
+        self.db = db
+        self.autocommit = False
+
+    def cursor(self):
+        return _MigrationCursor(self.db)
+
+
+def test_run_migrations_fast_path_and_lock(tmp_path):
+    (tmp_path / "001_a.sql").write_text("CREATE TABLE a();")
+    (tmp_path / "002_b.sql").write_text("CREATE TABLE b();")
+    migrations, manifest = load_manifest(str(tmp_path))
+    # Database migrated by the old runner: 001 recorded, no manifest yet.
+    db = {"log": [], "manifest": None, "created": False, "versions": [migrations[0].version]}
+
+    assert run_migrations(_MigrationConn(db), str(tmp_path)) == [migrations[1].version]
+    assert db["log"].count("CREATE TABLE b();") == 1 and "CREATE TABLE a();" not in db["log"]
+    assert db["log"][1] == "SELECT pg_advisory_lock(%s);" and db["log"][-1] == "SELECT pg_advisory_unlock(%s);"
+    assert db["manifest"] == manifest
+
+    # Nothing changed on disk: one SELECT, no lock.
+    db["log"].clear()
+    assert run_migrations(_MigrationConn(db), str(tmp_path)) == []
+    assert db["log"] == ["SELECT manifest FROM core.schema_migrations_manifest;"]
+
+
+class _CopyCursor:
+    def copy_expert(self, sql, buf):
+        self.sql = sql
+        self.data = buf.read()
+
+
+def test_copy_rows_escapes_text_format():
+    cur = _CopyCursor()
+    copy_rows(cur, "t", ("a", "b", "c"), [("x\ty", None, 3), ("back\\slash\nline", "", 0)])
+    assert cur.sql == "COPY t (a, b, c) FROM STDIN"
+    assert cur.data == "x\\ty\t\\N\t3\nback\\\\slash\\nline\t\t0\n"
+
+
+def test_upload_pages_resume_from_token(monkeypatch):
+    pages = {
+        None: {"items": [_playlist_item("v1"), _playlist_item("v2")], "nextPageToken": "p2"},
+        "p2": {"items": [_playlist_item("v3")]},
+    }
+    seen = []
+
+    def fake_get(url, **_kw):
+        token = url.split("&pageToken=")[1] if "&pageToken=" in url else None
+        seen.append(token)
+        return pages[token]
+
+    yt = YouTubeClient("k")
+    monkeypatch.setattr(yt, "_get", fake_get)
+
+    page, token = yt.list_upload_video_ids_page("UU1")
+    assert [v for v, _ in page] == ["v1", "v2"] and token == "p2"
+    page, token = yt.list_upload_video_ids_page("UU1", page_token=token)
+    assert [v for v, _ in page] == ["v3"] and token is None
+    assert [v for v, _ in yt.list_recent_upload_video_ids("UU1", limit=2)] == ["v1", "v2"]
+    assert seen == [None, "p2", None]
+
+
+def _playlist_item(video_id):
+    return {"contentDetails": {"videoId": video_id}, "snippet": {"publishedAt": "2026-01-01T00:00:00Z"}}
+
+
+class _FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.headers = headers or {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = {url: list(rs) for url, rs in responses.items()}
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        queued = self.responses.get(url) or []
+        return queued.pop(0) if queued else _FakeResponse(204)
+
+
+def test_discord_messages_coalesce_within_embed_limit():
+    notes = [Notification(title=f"spike {i}", url="https://youtu.be/x", fields=(("Views", "1"),)) for i in range(23)]
+    messages = discord_messages(notes)
+    assert [len(p["embeds"]) for p, _batch in messages] == [10, 10, 3]
+    assert [n for _p, batch in messages for n in batch] == notes
+
+
+def test_dispatcher_honours_retry_after_and_reports_per_webhook():
+    sleeps = []
+    session = _FakeSession(
+        {
+            "https://discord.test/a": [_FakeResponse(429, {"retry_after": 1.5}), _FakeResponse(204)],
+            "https://discord.test/b": [_FakeResponse(400, {"message": "bad"})],
+        }
+    )
+    dispatcher = NotificationDispatcher(session=session, sleep=sleeps.append)
+    for i in range(12):
+        dispatcher.enqueue("discord", "https://discord.test/a", Notification(title=f"a{i}", key=str(i)))
+    dispatcher.enqueue("discord", "https://discord.test/b", Notification(title="b"))
+    slack_note = Notification(title="s", url="https://youtu.be/s", fields=(("Views", "1"),))
+    dispatcher.enqueue("slack", "https://hooks.slack.test/c", slack_note)
+
+    results = dispatcher.flush()
+
+    by_url = {}
+    for r in results:
+        by_url.setdefault(r.webhook_url, []).append(r)
+    assert [len(r.notifications) for r in by_url["https://discord.test/a"]] == [10, 2]
+    assert all(r.ok for r in by_url["https://discord.test/a"])
+    assert not by_url["https://discord.test/b"][0].ok
+    assert by_url["https://hooks.slack.test/c"][0].ok
+    assert sum(1 for url, _ in session.posts if url == "https://discord.test/a") == 3
+    assert any(s > 1.0 for s in sleeps)
+    assert dispatcher.pending() == 0
+
+
+def test_notification_payload_round_trip():
+    n = Notification(title="[Spike] c: v", url="https://youtu.be/v", fields=(("Views", "1,000"),), key="42")
+    payload = json.loads(json.dumps(n.to_payload()))
+    assert "key" not in payload
+    assert Notification.from_payload(payload, key="42") == n
+
+
+class _OutboxCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        assert self.conn.in_tx, "outbox SQL outside a transaction"
+        self._rows = []
+        if "RETURNING o.id" in sql:
+            self._rows = self.conn.due.pop(0)
+            self.conn.log.append(("claim", [r[0] for r in self._rows]))
+        elif "status = 'sent'" in sql:
+            self.conn.log.append(("sent", params[0]))
+        else:
+            self.conn.log.append((params[0], [params[-1]]))
+
+    def fetchall(self):
+        return self._rows
+
+
+class _OutboxConn:
+    def __init__(self, due):
+        self.due = due
+        self.log = []
+        self.in_tx = False
+        self.autocommit = True
+
+    def __enter__(self):
+        self.in_tx = True
+        return self
+
+    def __exit__(self, *exc):
+        self.in_tx = False
+        return False
+
+    def cursor(self):
+        return _OutboxCursor(self)
+
+
+class _RecordingDispatcher:
+    def __init__(self, conn):
+        self.conn = conn
+        self.queued = []
+
+    def enqueue(self, kind, webhook_url, notification):
+        self.queued.append((kind, webhook_url, notification))
+
+    def flush(self):
+        assert not self.conn.in_tx, "webhooks called with the claim transaction open"
+        queued, self.queued = self.queued, []
+        return [
+            DeliveryResult(kind=k, webhook_url=u, notifications=[n], ok=u.endswith("/ok"), error=None if u.endswith("/ok") else "400")
+            for k, u, n in queued
+        ]
+
+
+def test_deliver_outbox_sends_between_claim_and_result_transactions():
+    payload = Notification(title="t").to_payload()
+    conn = _OutboxConn([[(1, "discord", "https://d.test/ok", payload, 0), (2, "discord", "https://d.test/bad", payload, 4)]])
+
+    counts = deliver_outbox(conn, dispatcher=_RecordingDispatcher(conn), batch_size=10)
+
+    assert counts == {"sent": 1, "retrying": 0, "failed": 1}
+    assert conn.log == [("claim", [1, 2]), ("failed", [2]), ("sent", [1])]